@@ -0,0 +1,99 @@
+"""Compares the throughput of concurrent lookups of PathDictionaryController and AsyncPathDictionaryController.
+
+A network round trip to MongoDB is simulated by delaying every operation of an in-memory MongoDB stand-in.
+Requires mongomock.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_async_path_dictionary_controller [round_trip_ms] [concurrent_requests]
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import mongomock
+from evalquiz_proto.shared.async_path_dictionary_controller import (
+    AsyncPathDictionaryController,
+)
+from evalquiz_proto.shared.path_dictionary_controller import PathDictionaryController
+
+
+class DelayedCollection:
+    """Delays every operation of a collection by a simulated round trip."""
+
+    def __init__(self, collection: Any, round_trip: float) -> None:
+        self.collection = collection
+        self.round_trip = round_trip
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        operation = getattr(self.collection, name)
+
+        def delayed_operation(*args: Any, **kwargs: Any) -> Any:
+            time.sleep(self.round_trip)
+            return operation(*args, **kwargs)
+
+        return delayed_operation
+
+
+def delay(controller: PathDictionaryController, round_trip: float) -> None:
+    controller.local_paths = DelayedCollection(controller.local_paths, round_trip)  # type: ignore[assignment]
+    controller.versions = DelayedCollection(controller.versions, round_trip)  # type: ignore[assignment]
+
+
+async def request_sync(
+    controller: PathDictionaryController, hash: str
+) -> tuple[str, Path]:
+    """A request handler that uses PathDictionaryController from the event loop."""
+    return (
+        controller.get_material_name(hash),
+        controller.get_file_path_from_hash(hash),
+    )
+
+
+async def request_async(
+    controller: AsyncPathDictionaryController, hash: str
+) -> tuple[str, Path]:
+    """A request handler that uses AsyncPathDictionaryController."""
+    return (
+        await controller.get_material_name(hash),
+        await controller.get_file_path_from_hash(hash),
+    )
+
+
+def main() -> None:
+    round_trip = (float(sys.argv[1]) if len(sys.argv) > 1 else 1.0) / 1000
+    concurrent_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    mongodb_client: Any = mongomock.MongoClient()
+    hashes = [f"hash_{i}" for i in range(concurrent_requests)]
+    PathDictionaryController(mongodb_client).load_files(
+        [(Path(f"/materials/{hash}.md"), hash, hash) for hash in hashes]
+    )
+    controller = PathDictionaryController(mongodb_client, cache_size=1)
+    delay(controller, round_trip)
+    async_controller = AsyncPathDictionaryController(mongodb_client, cache_size=1)
+    delay(async_controller.path_dictionary_controller, round_trip)
+
+    async def run_sync() -> None:
+        await asyncio.gather(*[request_sync(controller, hash) for hash in hashes])
+
+    async def run_async() -> None:
+        await asyncio.gather(
+            *[request_async(async_controller, hash) for hash in hashes]
+        )
+
+    print(f"{'controller':<32} {'requests/s':>12}")
+    for name, run in [
+        ("PathDictionaryController", run_sync),
+        ("AsyncPathDictionaryController", run_async),
+    ]:
+        start = time.perf_counter()
+        asyncio.run(run())
+        duration = time.perf_counter() - start
+        print(f"{name:<32} {concurrent_requests / duration:>12.1f}")
+    asyncio.run(async_controller.close())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Compares request latency of MaterialServerStub with a fresh channel per request and with pooled channels.
+
+The server runs in the same process on localhost, so the measured difference is the connection setup
+of TCP and HTTP/2 without network latency. Remote servers add at least one round trip per connection.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_channel_pool [request_count]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from grpclib.client import Channel
+from grpclib.server import Server
+from evalquiz_proto.shared.channel_pool import ChannelPool
+from evalquiz_proto.shared.generated import (
+    MaterialServerBase,
+    MaterialServerStub,
+    String,
+)
+
+PORT = 50071
+
+
+class MaterialServer(MaterialServerBase):
+    async def get_material_name(self, string: String) -> String:
+        return String(value="Lecture " + string.value)
+
+
+async def request_with_fresh_channel(url: str) -> None:
+    host, port = url.split(":")
+    channel = Channel(host, int(port))
+    try:
+        await MaterialServerStub(channel).get_material_name(String(value="1"))
+    finally:
+        channel.close()
+
+
+async def measure(request_count: int, concurrency: int, pooled: bool) -> list[float]:
+    """Measures the latency of request_count GetMaterialName requests.
+
+    Args:
+        request_count (int): The amount of requests.
+        concurrency (int): The amount of requests in flight.
+        pooled (bool): Requests use a ChannelPool, if set to True.
+
+    Returns:
+        list[float]: Latencies in seconds.
+    """
+    url = f"127.0.0.1:{PORT}"
+    pool = ChannelPool()
+    latencies: list[float] = []
+
+    async def request() -> None:
+        start = time.perf_counter()
+        if pooled:
+            await pool.material_server_stub(url).get_material_name(String(value="1"))
+        else:
+            await request_with_fresh_channel(url)
+        latencies.append(time.perf_counter() - start)
+
+    for _ in range(request_count // concurrency):
+        await asyncio.gather(*(request() for _ in range(concurrency)))
+    await pool.close()
+    return latencies
+
+
+async def run(request_count: int) -> None:
+    server = Server([MaterialServer()])
+    await server.start("127.0.0.1", PORT)
+    print(
+        f"{'mode':<8} {'concurrency':>11} {'p50 ms':>8} {'p99 ms':>8} {'requests/s':>11}"
+    )
+    for concurrency in (1, 16):
+        for pooled in (False, True):
+            start = time.perf_counter()
+            latencies = await measure(request_count, concurrency, pooled)
+            duration = time.perf_counter() - start
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{'pooled' if pooled else 'fresh':<8} {concurrency:>11} "
+                f"{quantiles[49] * 1000:>8.2f} {quantiles[98] * 1000:>8.2f} "
+                f"{len(latencies) / duration:>11.0f}"
+            )
+    server.close()
+    await server.wait_closed()
+
+
+def main() -> None:
+    request_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    asyncio.run(run(request_count))
+
+
+if __name__ == "__main__":
+    main()
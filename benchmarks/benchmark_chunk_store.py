@@ -0,0 +1,110 @@
+"""Compares storage and transfer of versioned material as whole files and as deduplicated chunks.
+
+Every version of a slide deck replaces one slide and inserts another one.
+Requires mongomock.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_chunk_store [deck_size_in_mb] [version_count]
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncIterator, cast
+
+import mongomock
+from evalquiz_proto.shared.chunk_store import ChunkStore
+from evalquiz_proto.shared.generated import (
+    ChunkData,
+    ChunkManifest,
+    ChunkRequest,
+    MaterialServerStub,
+    String,
+)
+
+SLIDE_SIZE = 2**17
+
+
+class ChunkServerStub:
+    """Serves GetChunkManifest and GetChunks from a ChunkStore and counts the transferred bytes."""
+
+    def __init__(self, chunk_store: ChunkStore) -> None:
+        self.chunk_store = chunk_store
+        self.transferred_bytes = 0
+
+    async def get_chunk_manifest(self, string: String) -> ChunkManifest:
+        return self.chunk_store.get_manifest(string.value)
+
+    async def get_chunks(self, chunk_request: ChunkRequest) -> AsyncIterator[ChunkData]:
+        async for chunk_data in self.chunk_store.create_chunk_stream(chunk_request):
+            self.transferred_bytes += len(chunk_data.data)
+            yield chunk_data
+
+
+def create_versions(deck_size: int, version_count: int) -> list[bytes]:
+    """Creates versions of a slide deck, every version replaces one slide and inserts another one.
+
+    Args:
+        deck_size (int): The size of the first version in bytes.
+        version_count (int): The amount of versions.
+
+    Returns:
+        list[bytes]: The versions.
+    """
+    generator = random.Random(0)
+    slides = [
+        generator.randbytes(SLIDE_SIZE) for _ in range(max(1, deck_size // SLIDE_SIZE))
+    ]
+    versions = [b"".join(slides)]
+    for _ in range(version_count - 1):
+        slides[generator.randrange(len(slides))] = generator.randbytes(SLIDE_SIZE)
+        slides.insert(generator.randrange(len(slides)), generator.randbytes(SLIDE_SIZE))
+        versions.append(b"".join(slides))
+    return versions
+
+
+def stored_chunk_bytes(chunk_store: ChunkStore) -> int:
+    return sum(
+        mongodb_document["size"]
+        for mongodb_document in chunk_store.chunks.find({}, {"size": 1})
+    )
+
+
+async def run(versions: list[bytes], directory: Path) -> None:
+    remote_chunk_store = ChunkStore(mongomock.MongoClient())
+    chunk_store = ChunkStore(mongomock.MongoClient())
+    stub = ChunkServerStub(remote_chunk_store)
+    chunking_duration = 0.0
+    print(
+        f"{'version':>7} {'whole files MB':>15} {'chunks MB':>10} "
+        f"{'whole transfer MB':>18} {'chunk transfer MB':>18}"
+    )
+    for index, version in enumerate(versions):
+        local_path = directory / f"{index}.pptx"
+        local_path.write_bytes(version)
+        start = time.perf_counter()
+        manifest = await remote_chunk_store.add_file_async(local_path)
+        chunking_duration += time.perf_counter() - start
+        await chunk_store.pull_file_async(cast(MaterialServerStub, stub), manifest.hash)
+        whole_bytes = sum(len(version) for version in versions[: index + 1])
+        print(
+            f"{index + 1:>7} {whole_bytes / 10**6:>15.1f} "
+            f"{stored_chunk_bytes(remote_chunk_store) / 10**6:>10.1f} "
+            f"{whole_bytes / 10**6:>18.1f} {stub.transferred_bytes / 10**6:>18.1f}"
+        )
+    total_size = sum(len(version) for version in versions)
+    print(f"chunking throughput: {total_size / 10**6 / chunking_duration:.1f} MB/s")
+
+
+def main() -> None:
+    deck_size = int(float(sys.argv[1]) * 10**6) if len(sys.argv) > 1 else 8 * 10**6
+    version_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(create_versions(deck_size, version_count), Path(directory)))
+
+
+if __name__ == "__main__":
+    main()
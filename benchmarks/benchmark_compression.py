@@ -0,0 +1,131 @@
+"""Compares compression ratio and throughput of the supported compression codecs per mimetype.
+
+Materials are generated from a fixed vocabulary, a PPTX material is approximated by a deflated zip file.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_compression [material_size_in_mb]
+"""
+
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+import zipfile
+from typing import AsyncIterator
+
+from evalquiz_proto.shared.compression import (
+    compress_chunks,
+    compression_codecs,
+    decompress_chunks,
+)
+from evalquiz_proto.shared.path_dictionary_controller import (
+    DEFAULT_CONTENT_PARTITION_SIZE,
+)
+
+vocabulary = (
+    "the a of gradient descent converges learning rate loss function model "
+    "parameter matrix vector eigenvalue theorem proof lemma definition example "
+    "exercise neural network layer activation regularization dataset training"
+).split()
+
+
+def create_text(size: int, line_template: str, seed: int = 0) -> bytes:
+    """Creates a text material from random sentences.
+
+    Args:
+        size (int): The approximate size of the material in bytes.
+        line_template (str): Template of a line with the placeholders `index` and `sentence`.
+        seed (int, optional): Seed of the random sentences. Defaults to 0.
+
+    Returns:
+        bytes: The material.
+    """
+    generator = random.Random(seed)
+    lines = []
+    length = 0
+    index = 0
+    while length < size:
+        sentence = " ".join(generator.choices(vocabulary, k=generator.randint(6, 16)))
+        line = line_template.format(index=index, sentence=sentence)
+        lines.append(line)
+        length += len(line)
+        index += 1
+    return "".join(lines).encode()
+
+
+def create_materials(size: int) -> dict[str, bytes]:
+    """Creates materials of all benchmarked mimetypes.
+
+    Args:
+        size (int): The approximate size of each material in bytes.
+
+    Returns:
+        dict[str, bytes]: Materials by mimetype.
+    """
+    markdown = create_text(size, "## Section {index}\n\n{sentence}.\n\n")
+    cells = [
+        {"cell_type": "markdown", "metadata": {}, "source": [line]}
+        for line in create_text(size // 2, "{sentence}.\n").decode().splitlines()
+    ]
+    ipynb = json.dumps({"cells": cells, "nbformat": 4}, indent=1).encode()
+    pptx = io.BytesIO()
+    with zipfile.ZipFile(pptx, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("ppt/slides/slide1.xml", markdown)
+    return {
+        "text/markdown": markdown,
+        "application/x-tex": create_text(
+            size, "\\subsection{{Section {index}}}\n{sentence}.\n\n"
+        ),
+        "text/x-rst": create_text(
+            size, "Section {index}\n----------\n\n{sentence}.\n\n"
+        ),
+        "application/x-ipynb+json": ipynb,
+        "application/vnd.openxmlformats-officedocument.presentationml.presentation": pptx.getvalue(),
+    }
+
+
+async def iterate(material: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(material), DEFAULT_CONTENT_PARTITION_SIZE):
+        yield material[start : start + DEFAULT_CONTENT_PARTITION_SIZE]
+
+
+async def collect(binary_iterator: AsyncIterator[bytes]) -> list[bytes]:
+    return [chunk async for chunk in binary_iterator]
+
+
+def main() -> None:
+    material_size = int(float(sys.argv[1]) * 10**6) if len(sys.argv) > 1 else 16 * 10**6
+    print(
+        f"{'mimetype':<28} {'codec':<6} {'ratio':>7} {'compress MB/s':>14} {'decompress MB/s':>16}"
+    )
+    for mimetype, material in create_materials(material_size).items():
+        for compression in compression_codecs:
+            start = time.perf_counter()
+            compressed_chunks = asyncio.run(
+                collect(
+                    compress_chunks(
+                        iterate(material), compression, DEFAULT_CONTENT_PARTITION_SIZE
+                    )
+                )
+            )
+            compress_duration = time.perf_counter() - start
+            start = time.perf_counter()
+
+            async def iterate_compressed() -> AsyncIterator[bytes]:
+                for compressed_chunk in compressed_chunks:
+                    yield compressed_chunk
+
+            asyncio.run(collect(decompress_chunks(iterate_compressed(), compression)))
+            decompress_duration = time.perf_counter() - start
+            ratio = len(material) / sum(len(chunk) for chunk in compressed_chunks)
+            print(
+                f"{mimetype[-28:]:<28} {compression:<6} {ratio:>7.2f} "
+                f"{len(material) / 10**6 / compress_duration:>14.1f} "
+                f"{len(material) / 10**6 / decompress_duration:>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Compares peak memory and throughput of FileHasher configurations against hashing the whole file at once.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_file_hasher [file_size_in_mb]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from blake3 import blake3
+from evalquiz_proto.shared.file_hasher import FileHasher
+
+
+def hash_whole_file(local_path: Path) -> str:
+    """Hashes a file the way InternalLectureMaterial did before FileHasher was introduced.
+
+    Args:
+        local_path (Path): The path of the file to be hashed.
+
+    Returns:
+        str: Hexadecimal representation of the hash.
+    """
+    with open(local_path, "rb") as local_file:
+        return blake3(local_file.read()).hexdigest()
+
+
+def measure(
+    hash_function: Callable[[Path], str], local_path: Path
+) -> tuple[float, int]:
+    """Measures throughput and peak Python heap allocation of a hash function.
+
+    Args:
+        hash_function (Callable[[Path], str]): The hash function to be measured.
+        local_path (Path): The path of the file to be hashed.
+
+    Returns:
+        tuple[float, int]: Throughput in MB/s and peak allocation in bytes.
+    """
+    file_size = local_path.stat().st_size
+    tracemalloc.start()
+    start = time.perf_counter()
+    hash_function(local_path)
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (file_size / 10**6 / duration, peak)
+
+
+def main() -> None:
+    file_size = int(sys.argv[1]) * 10**6 if len(sys.argv) > 1 else 512 * 10**6
+    candidates: dict[str, Callable[[Path], str]] = {
+        "whole file read": hash_whole_file,
+        "chunked 64 KiB": FileHasher(chunk_size=2**16).hash_file,
+        "chunked 1 MiB": FileHasher(chunk_size=2**20).hash_file,
+        "chunked 16 MiB": FileHasher(chunk_size=2**24).hash_file,
+        "mmap": FileHasher(use_mmap=True).hash_file,
+        "mmap multithreaded": FileHasher(
+            use_mmap=True, max_threads=blake3.AUTO
+        ).hash_file,
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        local_path = Path(directory) / "material.bin"
+        with open(local_path, "wb") as local_file:
+            for _ in range(file_size // 2**20):
+                local_file.write(bytes(range(256)) * 2**12)
+        print(f"{'method':<20} {'MB/s':>10} {'peak MB':>10}")
+        for name, hash_function in candidates.items():
+            throughput, peak = measure(hash_function, local_path)
+            print(f"{name:<20} {throughput:>10.1f} {peak / 10**6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
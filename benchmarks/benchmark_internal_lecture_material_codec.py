@@ -0,0 +1,75 @@
+"""Compares encoding and decoding of InternalLectureMaterial MongoDB documents with jsonpickle and the compact codec.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_internal_lecture_material_codec [material_count]
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import bson
+import jsonpickle
+from evalquiz_proto.shared.internal_lecture_material import InternalLectureMaterial
+
+
+def create_materials(material_count: int) -> list[InternalLectureMaterial]:
+    """Creates materials without touching the filesystem.
+
+    Args:
+        material_count (int): The amount of materials to create.
+
+    Returns:
+        list[InternalLectureMaterial]: The created materials.
+    """
+    materials = []
+    for i in range(material_count):
+        hash = f"{i:064x}"
+        material = InternalLectureMaterial.from_mongodb_document(
+            {
+                "_id": hash,
+                "reference": f"Lecture {i}",
+                "url": f"https://example.org/lectures/{i}.pptx",
+                "file_type": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+                "page_filter": {"lower_bound": 1, "upper_bound": 10},
+                "local_path": f"/var/lib/evalquiz/materials/{hash}.pptx",
+                "schema_version": 2,
+            }
+        )
+        materials.append(material)
+    return materials
+
+
+def encode_with_jsonpickle(material: InternalLectureMaterial) -> dict[str, Any]:
+    """Encodes a material the way InternalLectureMaterial did before the compact codec was introduced."""
+    return {
+        "_id": material.hash,
+        "internal_lecture_material": jsonpickle.encode(material),
+    }
+
+
+def main() -> None:
+    material_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    materials = create_materials(material_count)
+    codecs: dict[str, Callable[[InternalLectureMaterial], dict[str, Any]]] = {
+        "jsonpickle": encode_with_jsonpickle,
+        "compact": InternalLectureMaterial.to_mongodb_document,
+    }
+    print(f"{'codec':<12} {'encode s':>10} {'decode s':>10} {'BSON bytes':>12}")
+    for name, encode in codecs.items():
+        start = time.perf_counter()
+        documents = [encode(material) for material in materials]
+        encode_duration = time.perf_counter() - start
+        start = time.perf_counter()
+        for document in documents:
+            InternalLectureMaterial.from_mongodb_document(document)
+        decode_duration = time.perf_counter() - start
+        document_size = len(bson.encode(documents[0]))
+        print(
+            f"{name:<12} {encode_duration:>10.2f} {decode_duration:>10.2f} {document_size:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Compares the decode latency of local_paths documents per lookup for both schema versions.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_local_path_decoding [document_count]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import jsonpickle
+from evalquiz_proto.shared.path_dictionary_controller import LocalPathEntry
+
+
+def main() -> None:
+    document_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    local_paths = [
+        Path(f"/var/lib/evalquiz/materials/{i:064x}.pptx")
+        for i in range(document_count)
+    ]
+    documents = {
+        "jsonpickle (schema 1)": [
+            {"_id": str(i), "name": "", "local_path": jsonpickle.encode(local_path)}
+            for i, local_path in enumerate(local_paths)
+        ],
+        "plain string (schema 2)": [
+            LocalPathEntry(local_path, "").to_mongodb_document(str(i))
+            for i, local_path in enumerate(local_paths)
+        ],
+    }
+    print(f"{'schema':<25} {'µs per lookup':>15}")
+    for name, schema_documents in documents.items():
+        start = time.perf_counter()
+        for document in schema_documents:
+            LocalPathEntry.from_mongodb_document(document)
+        duration = time.perf_counter() - start
+        print(f"{name:<25} {duration / document_count * 10**6:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
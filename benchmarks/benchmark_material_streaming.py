@@ -0,0 +1,93 @@
+"""Compares throughput and peak RSS of streaming a material as MaterialUploadData messages.
+
+Every mode runs in a separate process, so peak RSS values do not influence each other.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_material_streaming [file_size_in_mb]
+"""
+
+import asyncio
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncIterator, Union, cast
+
+from evalquiz_proto.shared.async_file_io import AsyncFileIO
+from evalquiz_proto.shared.generated import MaterialUploadData
+from evalquiz_proto.shared.path_dictionary_controller import (
+    DEFAULT_CONTENT_PARTITION_SIZE,
+)
+
+PREVIOUS_CONTENT_PARTITION_SIZE = 5 * 10**8
+
+
+async def read_whole_partitions(
+    local_path: Path, content_partition_size: int
+) -> AsyncIterator[bytes]:
+    """Streams a file the way PathDictionaryController did before AsyncFileIO was introduced.
+
+    Args:
+        local_path (Path): The path of the file to be streamed.
+        content_partition_size (int): The maximum size of a chunk in bytes.
+
+    Returns:
+        AsyncIterator[bytes]: Iterator with binary chunks.
+    """
+    with open(local_path, "rb") as local_file:
+        while content_partition := local_file.read(content_partition_size):
+            yield content_partition
+
+
+async def stream(mode: str, local_path: Path) -> None:
+    """Serializes every chunk into a MaterialUploadData message, like a GetMaterial handler would.
+
+    Args:
+        mode (str): The streaming mode to be measured.
+        local_path (Path): The path of the file to be streamed.
+    """
+    file_io = AsyncFileIO()
+    chunks: AsyncIterator[Union[bytes, memoryview]]
+    if mode == "previous":
+        chunks = read_whole_partitions(local_path, PREVIOUS_CONTENT_PARTITION_SIZE)
+    elif mode == "read_chunks":
+        chunks = file_io.read_chunks(local_path, DEFAULT_CONTENT_PARTITION_SIZE)
+    else:
+        chunks = file_io.read_mapped_chunks(local_path, DEFAULT_CONTENT_PARTITION_SIZE)
+    async for chunk in chunks:
+        # betterproto serializes any bytes-like object without copying it beforehand.
+        bytes(MaterialUploadData(data=cast(bytes, chunk)))
+    file_io.shutdown()
+
+
+def measure(mode: str, local_path: Path) -> None:
+    file_size = local_path.stat().st_size
+    start = time.perf_counter()
+    asyncio.run(stream(mode, local_path))
+    duration = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(f"{mode:<20} {file_size / 10**6 / duration:>10.1f} {peak_rss / 10**6:>12.1f}")
+
+
+def main() -> None:
+    if len(sys.argv) > 2:
+        measure(sys.argv[1], Path(sys.argv[2]))
+        return
+    file_size = int(sys.argv[1]) * 10**6 if len(sys.argv) > 1 else 1024 * 10**6
+    with tempfile.TemporaryDirectory() as directory:
+        local_path = Path(directory) / "material.bin"
+        with open(local_path, "wb") as local_file:
+            for _ in range(file_size // 2**20):
+                local_file.write(bytes(range(256)) * 2**12)
+        print(f"{'mode':<20} {'MB/s':>10} {'peak RSS MB':>12}")
+        for mode in ["previous", "read_chunks", "read_mapped_chunks"]:
+            subprocess.run(
+                [sys.executable, "-m", __spec__.name, mode, str(local_path)],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Compares the latency of mimetype lookups by suffix and by file contents.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_mimetype_resolver [lookup_count]
+"""
+
+import mimetypes
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, Optional
+
+from evalquiz_proto.shared.mimetype_resolver import (
+    MimetypeResolver,
+    mimetype_extension_mappings,
+)
+
+suffixes = [".md", ".pptx", ".docx", ".pdf", ".html", ".csv", ".rtf", ".PDF", ""]
+
+
+def previous_guess_type(suffix: str) -> Optional[str]:
+    """Guesses a mimetype the way MimetypeResolver did before the suffix tables were introduced."""
+    if suffix in mimetype_extension_mappings:
+        return mimetype_extension_mappings[suffix]
+    type, _ = mimetypes.guess_type(Path("test/misc" + suffix), strict=False)
+    return type
+
+
+def create_materials(directory: Path) -> list[Path]:
+    """Creates hash-renamed materials without suffix, whose mimetype is only detected by contents.
+
+    Args:
+        directory (Path): The directory to create the materials in.
+
+    Returns:
+        list[Path]: Paths of the created materials.
+    """
+    pdf_path = directory / "pdf"
+    pdf_path.write_bytes(b"%PDF-1.7\n" + bytes(2**16))
+    epub_path = directory / "epub"
+    with zipfile.ZipFile(epub_path, "w") as zip_file:
+        zip_file.writestr("mimetype", "application/epub+zip")
+        zip_file.writestr("EPUB/content.opf", "<package></package>")
+    docx_path = directory / "docx"
+    with zipfile.ZipFile(docx_path, "w") as zip_file:
+        zip_file.writestr("[Content_Types].xml", "<Types></Types>")
+        zip_file.writestr("word/document.xml", "<document></document>")
+    pptx_path = directory / "pptx"
+    with zipfile.ZipFile(pptx_path, "w") as zip_file:
+        zip_file.writestr("[Content_Types].xml", "<Types></Types>")
+        zip_file.writestr("docProps/thumbnail.jpeg", bytes(2**14))
+        zip_file.writestr("ppt/presentation.xml", "<presentation></presentation>")
+    return [pdf_path, epub_path, docx_path, pptx_path]
+
+
+def measure(name: str, lookup: Callable[[], object], lookup_count: int) -> None:
+    start = time.perf_counter()
+    for _ in range(lookup_count):
+        lookup()
+    duration = time.perf_counter() - start
+    print(f"{name:<40} {duration / lookup_count * 10**6:>15.2f}")
+
+
+def main() -> None:
+    lookup_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10**4
+    print(f"{'lookup':<40} {'µs per lookup':>15}")
+    for suffix in suffixes:
+        measure(
+            f"previous suffix lookup {suffix!r}",
+            lambda: previous_guess_type(suffix),
+            lookup_count,
+        )
+        measure(
+            f"suffix table lookup {suffix!r}",
+            lambda: MimetypeResolver.fixed_guess_type(suffix),
+            lookup_count,
+        )
+    with tempfile.TemporaryDirectory() as directory:
+        for local_path in create_materials(Path(directory)):
+            measure(
+                f"content sniffing {local_path.name}",
+                lambda: MimetypeResolver.sniff_file_type(local_path),
+                lookup_count,
+            )
+
+
+if __name__ == "__main__":
+    main()
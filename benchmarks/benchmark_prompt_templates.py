@@ -0,0 +1,72 @@
+"""Compares compiling generation prompts with cached prefixes to rendering every prompt completely,
+and reports the share of prompt tokens that is covered by reused prefixes.
+
+Usage:
+    python -m evalquiz_proto.benchmarks.benchmark_prompt_templates [question_count]
+"""
+
+import sys
+import time
+
+from evalquiz_proto.shared.generated import (
+    Batch,
+    Capability,
+    CourseSettings,
+    QuestionType,
+)
+from evalquiz_proto.shared.prompt_templates import RESULT_FORMATS, PromptCompiler
+
+course_settings = CourseSettings(
+    course_goals=[Capability(keywords=[f"goal {i}", "algorithms"]) for i in range(10)],
+    required_capabilites=[Capability(keywords=[f"requirement {i}"]) for i in range(10)],
+    advantageous_capabilities=[
+        Capability(keywords=[f"advantage {i}"]) for i in range(10)
+    ],
+)
+
+batches = [
+    Batch(
+        capabilites=[
+            Capability(keywords=[f"topic {i}", f"keyword {j}"]) for j in range(5)
+        ]
+    )
+    for i in range(10)
+]
+
+
+def main() -> None:
+    question_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10**4
+    question_types = [QuestionType.MULTIPLE_CHOICE, QuestionType.MULTIPLE_RESPONSE]
+    questions_per_batch = question_count // len(batches)
+    print(f"{'compilation':<30} {'µs per prompt':>15}")
+    for name in ["rendered per prompt", "cached per prompt", "prefix per batch"]:
+        prompt_compiler = PromptCompiler()
+        start = time.perf_counter()
+        for batch in batches:
+            compiled_prefix = prompt_compiler.get_generation_prefix(
+                batch, course_settings
+            )
+            for question_index in range(questions_per_batch):
+                question_type = question_types[question_index % len(question_types)]
+                if name == "prefix per batch":
+                    prompt_compiler.compile(
+                        compiled_prefix, RESULT_FORMATS[question_type]
+                    )
+                    continue
+                if name == "rendered per prompt":
+                    prompt_compiler.prefixes.clear()
+                prompt_compiler.compile_generation_prompt(
+                    batch, question_type, course_settings
+                )
+        duration = time.perf_counter() - start
+        print(
+            f"{name:<30} {duration / (questions_per_batch * len(batches)) * 10**6:>15.2f}"
+        )
+    prompt_tokens = prompt_compiler.prefix_tokens + prompt_compiler.suffix_tokens
+    print(f"prompt tokens: {prompt_tokens}")
+    print(f"reused prefix tokens: {prompt_compiler.prefix_tokens / prompt_tokens:.1%}")
+    print(f"rendered prefix tokens: {prompt_compiler.rendered_prefix_tokens}")
+
+
+if __name__ == "__main__":
+    main()
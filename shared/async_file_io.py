@@ -0,0 +1,302 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import mmap
+import os
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+from blake3 import blake3
+
+T = TypeVar("T")
+
+
+class AsyncFileIO:
+    """Carries out blocking file operations on a bounded thread pool, so the event loop is never blocked by disk I/O.
+    Reads are prefetched ahead of the consumer and writes are carried out behind the producer,
+    so disk and network transfer overlap.
+    """
+
+    def __init__(self, max_workers: int = 4, buffer_count: int = 4) -> None:
+        """Constructor of AsyncFileIO.
+
+        Args:
+            max_workers (int, optional): The maximum amount of threads carrying out file operations. Defaults to 4.
+            buffer_count (int, optional): The maximum amount of chunks read ahead or waiting to be written per stream. Defaults to 4.
+
+        Raises:
+            ValueError: If buffer_count is not positive.
+        """
+        if buffer_count <= 0:
+            raise ValueError("buffer_count has to be positive.")
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="async_file_io"
+        )
+        self.buffer_count = buffer_count
+
+    async def run(self, function: Callable[..., T], *args: object) -> T:
+        """Runs a blocking function on the thread pool.
+
+        Args:
+            function (Callable[..., T]): The blocking function.
+            *args (object): Positional arguments of function.
+
+        Returns:
+            T: Return value of function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def read_chunks(
+        self,
+        local_path: Path,
+        chunk_size: int,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """Streams binary data of a file, up to buffer_count chunks are read ahead.
+
+        Args:
+            local_path (Path): The path of the file to be streamed.
+            chunk_size (int): The maximum size of a chunk in bytes.
+            offset (int, optional): Position in the file to start streaming from. Defaults to 0.
+            length (Optional[int], optional): The maximum amount of bytes to stream, the file is streamed until its end if None. Defaults to None.
+
+        Returns:
+            AsyncIterator[bytes]: Iterator with binary chunks.
+        """
+        end = None if length is None else offset + length
+        file_descriptor = await self.run(os.open, local_path, os.O_RDONLY)
+        pending_reads: deque[asyncio.Future[bytes]] = deque()
+        try:
+            while True:
+                while len(pending_reads) < self.buffer_count and (
+                    end is None or offset < end
+                ):
+                    read_size = (
+                        chunk_size if end is None else min(chunk_size, end - offset)
+                    )
+                    pending_reads.append(
+                        asyncio.ensure_future(
+                            self.run(self._read, file_descriptor, read_size, offset)
+                        )
+                    )
+                    offset += read_size
+                if not pending_reads:
+                    break
+                chunk = await pending_reads.popleft()
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            for pending_read in pending_reads:
+                pending_read.cancel()
+            await asyncio.gather(*pending_reads, return_exceptions=True)
+            await self.run(os.close, file_descriptor)
+
+    async def read_mapped_chunks(
+        self, local_path: Path, chunk_size: int
+    ) -> AsyncIterator[memoryview]:
+        """Streams a memory-mapped file as memoryview slices without copying its contents.
+        Pages of up to buffer_count chunks are faulted in ahead of the consumer on the thread pool.
+        A yielded memoryview is only valid until the next chunk is requested, it is released afterwards.
+
+        Args:
+            local_path (Path): The path of the file to be streamed.
+            chunk_size (int): The maximum size of a chunk in bytes.
+
+        Returns:
+            AsyncIterator[memoryview]: Iterator with binary chunks.
+        """
+        mapped_file = await self.run(self._map, local_path)
+        if mapped_file is None:
+            return
+        file_size = len(mapped_file)
+        pending_prefaults: deque[asyncio.Future[None]] = deque()
+        prefault_offset = 0
+        try:
+            for offset in range(0, file_size, chunk_size):
+                while (
+                    len(pending_prefaults) < self.buffer_count
+                    and prefault_offset < file_size
+                ):
+                    pending_prefaults.append(
+                        asyncio.ensure_future(
+                            self.run(
+                                self._prefault, mapped_file, prefault_offset, chunk_size
+                            )
+                        )
+                    )
+                    prefault_offset += chunk_size
+                await pending_prefaults.popleft()
+                with memoryview(mapped_file)[offset : offset + chunk_size] as chunk:
+                    yield chunk
+                self._release_pages(mapped_file, offset, chunk_size)
+        finally:
+            for pending_prefault in pending_prefaults:
+                pending_prefault.cancel()
+            await asyncio.gather(*pending_prefaults, return_exceptions=True)
+            try:
+                mapped_file.close()
+            except BufferError:
+                # A consumer still holds a view, the mapping is closed on garbage collection.
+                pass
+
+    @staticmethod
+    def _map(local_path: Path) -> Optional[mmap.mmap]:
+        """Blocking memory mapping of a whole file for reading.
+
+        Args:
+            local_path (Path): The path of the file to be mapped.
+
+        Returns:
+            Optional[mmap.mmap]: The mapped file or None, if the file is empty and cannot be mapped.
+        """
+        with open(local_path, "rb") as local_file:
+            if os.fstat(local_file.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(local_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _prefault(mapped_file: mmap.mmap, offset: int, size: int) -> None:
+        """Blocking read of one byte per page, so accessing the range afterwards does not block on disk I/O.
+
+        Args:
+            mapped_file (mmap.mmap): The mapped file.
+            offset (int): Start of the range.
+            size (int): Length of the range.
+        """
+        if hasattr(mapped_file, "madvise"):
+            page_offset = offset - offset % mmap.PAGESIZE
+            mapped_file.madvise(
+                mmap.MADV_WILLNEED, page_offset, size + offset - page_offset
+            )
+        with memoryview(mapped_file)[offset : offset + size : mmap.PAGESIZE] as pages:
+            bytes(pages)
+
+    @staticmethod
+    def _release_pages(mapped_file: mmap.mmap, offset: int, size: int) -> None:
+        """Unmaps the pages that are fully contained in a consumed range, so they no longer count towards the resident memory.
+        The file contents remain in the page cache of the operating system.
+
+        Args:
+            mapped_file (mmap.mmap): The mapped file.
+            offset (int): Start of the consumed range.
+            size (int): Length of the consumed range.
+        """
+        if not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        start = offset - offset % mmap.PAGESIZE
+        end = min(offset + size, len(mapped_file))
+        end -= end % mmap.PAGESIZE
+        if end > start:
+            mapped_file.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    async def write_chunks(
+        self,
+        file_descriptor: int,
+        binary_iterator: AsyncIterator[bytes],
+        hasher: Optional[blake3] = None,
+    ) -> None:
+        """Writes a stream to an open file, up to buffer_count chunks are buffered while the previous chunk is written.
+        If binary_iterator raises an exception, all chunks received before are written and the exception is propagated.
+
+        Args:
+            file_descriptor (int): File descriptor of the file opened for writing.
+            binary_iterator (AsyncIterator[bytes]): Yields binary data to be written.
+            hasher (Optional[blake3], optional): Is updated with all written data, if set. Defaults to None.
+        """
+        queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(self.buffer_count)
+        writer = asyncio.ensure_future(
+            self._write_from_queue(file_descriptor, queue, hasher)
+        )
+        try:
+            try:
+                async for data in binary_iterator:
+                    if not await self._put_unless_done(queue, data, writer):
+                        break
+            finally:
+                # Chunks that have been received are written, even if binary_iterator is interrupted.
+                await self._put_unless_done(queue, None, writer)
+                await writer
+        finally:
+            if not writer.done():
+                writer.cancel()
+                await asyncio.gather(writer, return_exceptions=True)
+
+    @staticmethod
+    async def _put_unless_done(
+        queue: asyncio.Queue[Optional[bytes]],
+        data: Optional[bytes],
+        writer: asyncio.Future[None],
+    ) -> bool:
+        """Puts data into queue, waiting for free space is aborted if writer terminates.
+
+        Args:
+            queue (asyncio.Queue[Optional[bytes]]): Chunks to be written, terminated by None.
+            data (Optional[bytes]): The chunk to be written or None.
+            writer (asyncio.Future[None]): The task consuming queue.
+
+        Returns:
+            bool: True, if data has been put into queue.
+        """
+        if writer.done():
+            return False
+        if not queue.full():
+            queue.put_nowait(data)
+            return True
+        put = asyncio.ensure_future(queue.put(data))
+        await asyncio.wait((put, writer), return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            return False
+        return True
+
+    async def _write_from_queue(
+        self,
+        file_descriptor: int,
+        queue: asyncio.Queue[Optional[bytes]],
+        hasher: Optional[blake3],
+    ) -> None:
+        """Writes chunks from queue in order until None is received.
+
+        Args:
+            file_descriptor (int): File descriptor of the file opened for writing.
+            queue (asyncio.Queue[Optional[bytes]]): Chunks to be written, terminated by None.
+            hasher (Optional[blake3]): Is updated with all written data, if set.
+        """
+        while (data := await queue.get()) is not None:
+            await self.run(self._write, file_descriptor, data, hasher)
+
+    def _read(self, file_descriptor: int, size: int, offset: int) -> bytes:
+        """Blocking read of a chunk at the given offset.
+
+        Args:
+            file_descriptor (int): File descriptor of the file opened for reading.
+            size (int): The maximum amount of bytes to read.
+            offset (int): Position in the file to start reading from.
+
+        Returns:
+            bytes: The read chunk, empty if offset is at or beyond the end of the file.
+        """
+        return os.pread(file_descriptor, size, offset)
+
+    def _write(
+        self, file_descriptor: int, data: bytes, hasher: Optional[blake3]
+    ) -> None:
+        """Blocking write of a whole chunk.
+
+        Args:
+            file_descriptor (int): File descriptor of the file opened for writing.
+            data (bytes): The chunk to be written.
+            hasher (Optional[blake3]): Is updated with data, if set.
+        """
+        view = memoryview(data)
+        while view:
+            view = view[os.write(file_descriptor, view) :]
+        if hasher is not None:
+            hasher.update(data)
+
+    def shutdown(self) -> None:
+        """Waits for pending file operations and releases the thread pool."""
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,313 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar
+
+from pymongo import MongoClient
+from evalquiz_proto.shared.async_file_io import AsyncFileIO
+from evalquiz_proto.shared.chunk_store import ChunkStore
+from evalquiz_proto.shared.generated import MaterialServerStub, PageFilter
+from evalquiz_proto.shared.hash_cache import HashCache
+from evalquiz_proto.shared.lru_cache import LRUCache
+from evalquiz_proto.shared.path_dictionary_controller import (
+    DEFAULT_CONTENT_PARTITION_SIZE,
+    DEFAULT_MAX_STALENESS,
+    DEFAULT_PAGE_SIZE,
+    LocalPathEntry,
+    PathDictionaryController,
+)
+
+T = TypeVar("T")
+
+
+class AsyncPathDictionaryController:
+    """Async variant of PathDictionaryController with the same methods, that never blocks the event loop.
+    Every MongoDB round trip is carried out on a bounded thread pool, so concurrent requests are served in parallel.
+    Instances share their state with PathDictionaryController instances on the same database.
+    """
+
+    def __init__(
+        self,
+        mongodb_client: MongoClient[dict[str, Any]],
+        mongodb_database: str = "local_path_db",
+        hash_cache: Optional[HashCache] = None,
+        file_io: Optional[AsyncFileIO] = None,
+        cache_size: int = 4096,
+        max_staleness: float = DEFAULT_MAX_STALENESS,
+        max_workers: int = 16,
+        chunk_store: Optional[ChunkStore] = None,
+    ) -> None:
+        """Constructor of AsyncPathDictionaryController.
+
+        Args:
+            mongodb_client (MongoClient[dict[str, Any]]): A pymongo client to enable communication with a MongoDB server.
+            mongodb_database (str, optional): The database that all operations are performed on. Defaults to "local_path_db".
+            hash_cache (Optional[HashCache], optional): Hashes calculated during uploads are added to hash_cache, if set. Defaults to None.
+            file_io (Optional[AsyncFileIO], optional): Carries out file operations off the event loop. Defaults to a new AsyncFileIO.
+            cache_size (int, optional): The maximum amount of cached local_paths documents. Defaults to 4096.
+            max_staleness (float, optional): The version counter is checked at most once in max_staleness seconds. Defaults to DEFAULT_MAX_STALENESS.
+            max_workers (int, optional): The maximum amount of concurrent MongoDB operations. Defaults to 16.
+            chunk_store (Optional[ChunkStore], optional): Content-addressed files are additionally stored as deduplicated chunks in chunk_store, if set. Defaults to None.
+        """
+        self.database_executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="path_dictionary_controller"
+        )
+        self.path_dictionary_controller = PathDictionaryController(
+            mongodb_client,
+            mongodb_database,
+            hash_cache,
+            file_io,
+            cache_size,
+            max_staleness,
+            self.database_executor,
+            chunk_store,
+        )
+
+    @property
+    def cache(self) -> LRUCache[str, LocalPathEntry]:
+        """The lookup cache of the wrapped PathDictionaryController, including hit and miss counters."""
+        return self.path_dictionary_controller.cache
+
+    async def watch_changes(self) -> None:
+        """See `PathDictionaryController.watch_changes(...)`."""
+        await self._run(self.path_dictionary_controller.watch_changes)
+
+    async def _run(self, function: Callable[..., T], *args: Any) -> T:
+        """Runs a blocking method of the wrapped PathDictionaryController on the thread pool.
+
+        Args:
+            function (Callable[..., T]): The blocking method.
+            *args (Any): Positional arguments of function.
+
+        Returns:
+            T: Return value of function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.database_executor, function, *args)
+
+    async def get_file_path_from_hash(self, hash: str) -> Path:
+        """See `PathDictionaryController.get_file_path_from_hash(...)`."""
+        return await self._run(
+            self.path_dictionary_controller.get_file_path_from_hash, hash
+        )
+
+    async def get_file_paths_from_hashes(self, hashes: list[str]) -> dict[str, Path]:
+        """See `PathDictionaryController.get_file_paths_from_hashes(...)`."""
+        return await self._run(
+            self.path_dictionary_controller.get_file_paths_from_hashes, hashes
+        )
+
+    async def get_file_from_hash_async(
+        self, hash: str, content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE
+    ) -> tuple[str, AsyncIterator[bytes]]:
+        """See `PathDictionaryController.get_file_from_hash_async(...)`."""
+        return await self.path_dictionary_controller.get_file_from_hash_async(
+            hash, content_partition_size
+        )
+
+    async def get_file_view_from_hash_async(
+        self, hash: str, content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE
+    ) -> tuple[str, AsyncIterator[memoryview]]:
+        """See `PathDictionaryController.get_file_view_from_hash_async(...)`."""
+        return await self.path_dictionary_controller.get_file_view_from_hash_async(
+            hash, content_partition_size
+        )
+
+    async def get_file_range_from_hash_async(
+        self,
+        hash: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
+    ) -> tuple[str, AsyncIterator[bytes]]:
+        """See `PathDictionaryController.get_file_range_from_hash_async(...)`."""
+        return await self.path_dictionary_controller.get_file_range_from_hash_async(
+            hash, offset, length, content_partition_size
+        )
+
+    async def get_page_range_from_hash_async(
+        self,
+        hash: str,
+        page_filter: PageFilter,
+        offset: int = 0,
+        length: Optional[int] = None,
+        content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
+    ) -> tuple[str, AsyncIterator[bytes]]:
+        """See `PathDictionaryController.get_page_range_from_hash_async(...)`."""
+        return await self.path_dictionary_controller.get_page_range_from_hash_async(
+            hash, page_filter, offset, length, content_partition_size
+        )
+
+    async def get_page_offsets_async(self, hash: str) -> Optional[list[int]]:
+        """See `PathDictionaryController.get_page_offsets_async(...)`."""
+        return await self.path_dictionary_controller.get_page_offsets_async(hash)
+
+    async def load_file(
+        self,
+        local_path: Path,
+        hash: str,
+        name: str = "",
+        page_offsets: Optional[list[int]] = None,
+    ) -> None:
+        """See `PathDictionaryController.load_file(...)`."""
+        await self._run(
+            self.path_dictionary_controller.load_file,
+            local_path,
+            hash,
+            name,
+            page_offsets,
+        )
+
+    async def load_files(self, files: list[tuple[Path, str, str]]) -> dict[str, str]:
+        """See `PathDictionaryController.load_files(...)`."""
+        return await self._run(self.path_dictionary_controller.load_files, files)
+
+    async def migrate_local_paths(self, batch_size: int = 1000) -> int:
+        """See `PathDictionaryController.migrate_local_paths(...)`."""
+        return await self._run(
+            self.path_dictionary_controller.migrate_local_paths, batch_size
+        )
+
+    async def unload_material(self, hash: str) -> None:
+        """See `PathDictionaryController.unload_material(...)`."""
+        await self._run(self.path_dictionary_controller.unload_material, hash)
+
+    async def unload_materials(self, hashes: list[str]) -> None:
+        """See `PathDictionaryController.unload_materials(...)`."""
+        await self._run(self.path_dictionary_controller.unload_materials, hashes)
+
+    async def add_file_async(
+        self,
+        local_path: Path,
+        hash: str,
+        binary_iterator: AsyncIterator[bytes],
+        overwrite: bool = True,
+        name: str = "",
+    ) -> None:
+        """See `PathDictionaryController.add_file_async(...)`."""
+        await self.path_dictionary_controller.add_file_async(
+            local_path, hash, binary_iterator, overwrite, name
+        )
+
+    async def add_content_addressed_file_async(
+        self,
+        directory: Path,
+        mimetype: str,
+        binary_iterator: AsyncIterator[bytes],
+        name: str = "",
+        expected_hash: Optional[str] = None,
+    ) -> str:
+        """See `PathDictionaryController.add_content_addressed_file_async(...)`."""
+        return await self.path_dictionary_controller.add_content_addressed_file_async(
+            directory, mimetype, binary_iterator, name, expected_hash
+        )
+
+    async def pull_content_addressed_file_async(
+        self,
+        directory: Path,
+        material_server_stub: MaterialServerStub,
+        hash: str,
+        name: str = "",
+    ) -> str:
+        """See `PathDictionaryController.pull_content_addressed_file_async(...)`."""
+        return await self.path_dictionary_controller.pull_content_addressed_file_async(
+            directory, material_server_stub, hash, name
+        )
+
+    async def restore_content_addressed_file_async(
+        self, directory: Path, hash: str, name: str = ""
+    ) -> str:
+        """See `PathDictionaryController.restore_content_addressed_file_async(...)`."""
+        return (
+            await self.path_dictionary_controller.restore_content_addressed_file_async(
+                directory, hash, name
+            )
+        )
+
+    async def add_resumable_file_async(
+        self,
+        directory: Path,
+        upload_id: str,
+        offset: int,
+        mimetype: str,
+        binary_iterator: AsyncIterator[bytes],
+        name: str = "",
+    ) -> str:
+        """See `PathDictionaryController.add_resumable_file_async(...)`."""
+        return await self.path_dictionary_controller.add_resumable_file_async(
+            directory, upload_id, offset, mimetype, binary_iterator, name
+        )
+
+    async def get_upload_offset(self, upload_id: str) -> int:
+        """See `PathDictionaryController.get_upload_offset(...)`."""
+        return await self._run(
+            self.path_dictionary_controller.get_upload_offset, upload_id
+        )
+
+    async def discard_upload(self, upload_id: str) -> None:
+        """See `PathDictionaryController.discard_upload(...)`."""
+        await self._run(self.path_dictionary_controller.discard_upload, upload_id)
+
+    async def copy_and_load_file(
+        self,
+        source_local_path: Path,
+        destination_local_path: Path,
+        hash: str,
+        name: str = "",
+    ) -> None:
+        """See `PathDictionaryController.copy_and_load_file(...)`."""
+        await self._run(
+            self.path_dictionary_controller.copy_and_load_file,
+            source_local_path,
+            destination_local_path,
+            hash,
+            name,
+        )
+
+    async def delete_file(self, hash: str) -> None:
+        """See `PathDictionaryController.delete_file(...)`."""
+        await self._run(self.path_dictionary_controller.delete_file, hash)
+
+    async def get_material_hashes(self) -> list[str]:
+        """See `PathDictionaryController.get_material_hashes(...)`."""
+        return await self._run(self.path_dictionary_controller.get_material_hashes)
+
+    async def get_material_hashes_page(
+        self, after: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE
+    ) -> list[str]:
+        """See `PathDictionaryController.get_material_hashes_page(...)`."""
+        return await self._run(
+            self.path_dictionary_controller.get_material_hashes_page, after, page_size
+        )
+
+    async def iterate_material_hashes(
+        self, after: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE
+    ) -> AsyncIterator[list[str]]:
+        """See `PathDictionaryController.iterate_material_hashes(...)`."""
+        while material_hashes_page := await self.get_material_hashes_page(
+            after, page_size
+        ):
+            yield material_hashes_page
+            after = material_hashes_page[-1]
+
+    async def get_material_name(self, hash: str) -> str:
+        """See `PathDictionaryController.get_material_name(...)`."""
+        return await self._run(self.path_dictionary_controller.get_material_name, hash)
+
+    async def get_material_names(self, hashes: list[str]) -> dict[str, str]:
+        """See `PathDictionaryController.get_material_names(...)`."""
+        return await self._run(
+            self.path_dictionary_controller.get_material_names, hashes
+        )
+
+    async def close(self) -> None:
+        """Closes the change stream of the wrapped PathDictionaryController and waits for pending MongoDB operations.
+        Both are carried out on the default executor, so the event loop is not blocked while waiting.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._close)
+
+    def _close(self) -> None:
+        """Blocking part of `close()`."""
+        self.path_dictionary_controller.close()
+        self.database_executor.shutdown(wait=True)
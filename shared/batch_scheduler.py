@@ -0,0 +1,315 @@
+import asyncio
+import heapq
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Optional, Union
+
+from evalquiz_proto.shared.exceptions import PipelineExecutionException
+from evalquiz_proto.shared.generated import (
+    Batch,
+    BatchStatus,
+    CacheStatistics,
+    InternalConfig,
+    ModuleStatus,
+    PipelineModule,
+    PipelineResult,
+    PipelineStatus,
+)
+from evalquiz_proto.shared.result_cache import ResultCache
+
+
+class TokenBucket:
+    """Limits the rate of requests, e.g. to a language model, while allowing bursts of up to capacity requests.
+    Waiting requests are served in order of arrival.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        """Constructor of TokenBucket.
+
+        Args:
+            rate (float): The amount of requests per second.
+            capacity (float, optional): The maximum amount of requests in a burst. Defaults to 1.0.
+
+        Raises:
+            ValueError: If rate is not positive or capacity is smaller than 1.
+        """
+        if rate <= 0:
+            raise ValueError("rate has to be positive.")
+        if capacity < 1:
+            raise ValueError("capacity has to be at least 1.")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Waits until a request is permitted."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass(frozen=True)
+class BatchStep:
+    """A PipelineModule that is applied to every batch, the output of a step is the input of the next step.
+
+    Attributes:
+        pipeline_module (PipelineModule): The module that is reported in BatchStatus.
+        function (Callable[[Any], Any]): Coroutine function for I/O-bound steps, e.g. language model requests.
+            For cpu_bound steps a picklable function, e.g. material conversion.
+        cpu_bound (bool): function is run in a process pool, if set to True.
+        model (Optional[str]): Requests of the step are limited by the rate limit of model, if set.
+    """
+
+    pipeline_module: PipelineModule
+    function: Callable[[Any], Any]
+    cpu_bound: bool = False
+    model: Optional[str] = None
+
+
+class BatchScheduler:
+    """Runs the batches of an InternalConfig concurrently through a sequence of BatchSteps.
+
+    Batches are started in order of descending priority, at most max_concurrent_batches at once.
+    Steps with a model wait for the TokenBucket of their model, CPU-bound steps run in a process pool.
+    A failing batch is marked as FAILED with a PipelineExecutionException, the other batches continue.
+    The hits and misses of the result caches that the steps use are reported per run in PipelineStatus.
+    """
+
+    def __init__(
+        self,
+        batch_steps: list[BatchStep],
+        max_concurrent_batches: int = 8,
+        rate_limits: Optional[dict[str, TokenBucket]] = None,
+        cpu_executor: Optional[Executor] = None,
+        generation_result_cache: Optional[ResultCache] = None,
+        evaluation_result_cache: Optional[ResultCache] = None,
+    ) -> None:
+        """Constructor of BatchScheduler.
+
+        Args:
+            batch_steps (list[BatchStep]): Steps that are applied to every batch in order, the last step returns a Batch.
+            max_concurrent_batches (int, optional): The maximum amount of batches that run at once. Defaults to 8.
+            rate_limits (Optional[dict[str, TokenBucket]], optional): Rate limits by model. Defaults to no rate limits.
+            cpu_executor (Optional[Executor], optional): Executor of CPU-bound steps. Defaults to a ProcessPoolExecutor per run.
+            generation_result_cache (Optional[ResultCache], optional): Cache of GenerationResults used by the steps. Defaults to None.
+            evaluation_result_cache (Optional[ResultCache], optional): Cache of EvaluationResults used by the steps. Defaults to None.
+
+        Raises:
+            ValueError: If max_concurrent_batches is not positive.
+        """
+        if max_concurrent_batches <= 0:
+            raise ValueError("max_concurrent_batches has to be positive.")
+        self.batch_steps = batch_steps
+        self.max_concurrent_batches = max_concurrent_batches
+        self.rate_limits = rate_limits or {}
+        self.cpu_executor = cpu_executor
+        self.generation_result_cache = generation_result_cache
+        self.evaluation_result_cache = evaluation_result_cache
+
+    async def run_batches(
+        self,
+        batches: list[Batch],
+        priorities: Optional[list[int]] = None,
+        on_status: Optional[Callable[[int, BatchStatus], None]] = None,
+    ) -> list[Union[Any, PipelineExecutionException]]:
+        """Runs all batches through the steps.
+
+        Args:
+            batches (list[Batch]): The batches.
+            priorities (Optional[list[int]], optional): Priority per batch, batches with higher priority start first. Defaults to the order of batches.
+            on_status (Optional[Callable[[int, BatchStatus], None]], optional): Called with batch index and BatchStatus on every transition. Defaults to None.
+
+        Raises:
+            ValueError: If the amount of priorities does not match the amount of batches.
+
+        Returns:
+            list[Union[Any, PipelineExecutionException]]: Output of the last step or the exception of the failed step per batch.
+        """
+        if priorities is not None and len(priorities) != len(batches):
+            raise ValueError("Every batch needs a priority.")
+        pending_batches = [
+            (-(priorities[index] if priorities is not None else 0), index)
+            for index in range(len(batches))
+        ]
+        heapq.heapify(pending_batches)
+        results: list[Union[Any, PipelineExecutionException]] = list(batches)
+        cpu_executor = self.cpu_executor
+        if cpu_executor is None and any(
+            batch_step.cpu_bound for batch_step in self.batch_steps
+        ):
+            cpu_executor = ProcessPoolExecutor()
+
+        async def work() -> None:
+            while pending_batches:
+                _, index = heapq.heappop(pending_batches)
+                results[index] = await self._run_batch(
+                    index, batches[index], cpu_executor, on_status
+                )
+
+        try:
+            await asyncio.gather(
+                *(work() for _ in range(min(self.max_concurrent_batches, len(batches))))
+            )
+        finally:
+            if cpu_executor is not None and cpu_executor is not self.cpu_executor:
+                cpu_executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    async def _run_batch(
+        self,
+        index: int,
+        batch: Batch,
+        cpu_executor: Optional[Executor],
+        on_status: Optional[Callable[[int, BatchStatus], None]],
+    ) -> Union[Any, PipelineExecutionException]:
+        """Runs a batch through the steps and reports its transitions.
+
+        Returns:
+            Union[Any, PipelineExecutionException]: Output of the last step or the exception of the failed step.
+        """
+
+        def report(
+            pipeline_module: PipelineModule,
+            module_status: ModuleStatus,
+            error_message: Optional[str] = None,
+        ) -> None:
+            if on_status is not None:
+                on_status(
+                    index,
+                    BatchStatus(
+                        error_message=error_message,
+                        pipeline_module=pipeline_module,
+                        module_status=module_status,
+                    ),
+                )
+
+        value: Any = batch
+        for batch_step in self.batch_steps:
+            report(batch_step.pipeline_module, ModuleStatus.RUNNING)
+            try:
+                if batch_step.model is not None and (
+                    rate_limit := self.rate_limits.get(batch_step.model)
+                ):
+                    await rate_limit.acquire()
+                if batch_step.cpu_bound:
+                    loop = asyncio.get_running_loop()
+                    value = await loop.run_in_executor(
+                        cpu_executor, batch_step.function, value
+                    )
+                else:
+                    value = await batch_step.function(value)
+            except Exception as error:
+                if isinstance(error, PipelineExecutionException):
+                    pipeline_execution_exception = error
+                else:
+                    pipeline_execution_exception = PipelineExecutionException(
+                        f"{batch_step.pipeline_module.name} failed on batch {index}: {error!r}"
+                    )
+                    pipeline_execution_exception.__cause__ = error
+                report(
+                    batch_step.pipeline_module,
+                    ModuleStatus.FAILED,
+                    str(pipeline_execution_exception),
+                )
+                return pipeline_execution_exception
+            report(batch_step.pipeline_module, ModuleStatus.SUCCESS)
+        return value
+
+    async def iterate_config(
+        self, internal_config: InternalConfig, priorities: Optional[list[int]] = None
+    ) -> AsyncIterator[PipelineStatus]:
+        """Runs the batches of internal_config and yields a PipelineStatus snapshot on every transition, e.g. for `IterateConfig`.
+        The last snapshot contains internal_config with the output batches, failed batches keep their input.
+        Snapshots contain the CacheStatistics of the result caches since the start of the run.
+
+        Args:
+            internal_config (InternalConfig): The pipeline configuration.
+            priorities (Optional[list[int]], optional): Priority per batch, batches with higher priority start first. Defaults to the order of batches.
+
+        Returns:
+            AsyncIterator[PipelineStatus]: Iterator with snapshots.
+        """
+        batch_statuses = [BatchStatus() for _ in internal_config.batches]
+        transitions: asyncio.Queue[None] = asyncio.Queue()
+        initial_cache_statistics = {
+            result_cache: result_cache.get_statistics()
+            for result_cache in (
+                self.generation_result_cache,
+                self.evaluation_result_cache,
+            )
+            if result_cache is not None
+        }
+
+        def get_cache_statistics(
+            result_cache: Optional[ResultCache],
+        ) -> Optional[CacheStatistics]:
+            if result_cache is None:
+                return None
+            cache_statistics = result_cache.get_statistics()
+            initial_statistics = initial_cache_statistics[result_cache]
+            return CacheStatistics(
+                hits=cache_statistics.hits - initial_statistics.hits,
+                misses=cache_statistics.misses - initial_statistics.misses,
+            )
+
+        def create_snapshot(result: Optional[PipelineResult] = None) -> PipelineStatus:
+            return PipelineStatus(
+                result=result,
+                batch_status=list(batch_statuses),
+                generation_cache_statistics=get_cache_statistics(
+                    self.generation_result_cache
+                ),
+                evaluation_cache_statistics=get_cache_statistics(
+                    self.evaluation_result_cache
+                ),
+            )
+
+        def on_status(index: int, batch_status: BatchStatus) -> None:
+            batch_statuses[index] = batch_status
+            transitions.put_nowait(None)
+
+        run = asyncio.create_task(
+            self.run_batches(internal_config.batches, priorities, on_status)
+        )
+        try:
+            yield create_snapshot()
+            while not run.done() or not transitions.empty():
+                transition = asyncio.create_task(transitions.get())
+                await asyncio.wait(
+                    {run, transition}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not transition.done():
+                    transition.cancel()
+                    continue
+                while not transitions.empty():
+                    transitions.get_nowait()
+                yield create_snapshot()
+            results = await run
+        finally:
+            run.cancel()
+        output_batches = [
+            result if isinstance(result, Batch) else batch
+            for batch, result in zip(internal_config.batches, results)
+        ]
+        yield create_snapshot(
+            PipelineResult(
+                internal_config=InternalConfig(
+                    material_server_urls=internal_config.material_server_urls,
+                    batches=output_batches,
+                    course_settings=internal_config.course_settings,
+                    generation_settings=internal_config.generation_settings,
+                    evaluation_settings=internal_config.evaluation_settings,
+                )
+            )
+        )
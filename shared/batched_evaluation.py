@@ -0,0 +1,333 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, Optional
+
+import betterproto
+from evalquiz_proto.shared.batch_scheduler import TokenBucket
+from evalquiz_proto.shared.exceptions import (
+    ResultSectionNotFoundException,
+    ResultSectionNotParsableException,
+)
+from evalquiz_proto.shared.generated import (
+    Batch,
+    EvaluationResult,
+    EvaluationResultType,
+    LanguageModelEvaluation,
+    Metric,
+)
+from evalquiz_proto.shared.prompt_templates import (
+    CompiledPrefix,
+    PromptCompiler,
+    render_generation_result,
+)
+
+Completion = Callable[[str, str], Awaitable[str]]
+"""Coroutine function that completes a prompt (second argument) with a model (first argument)."""
+
+_RESULT_SECTION_PATTERN = re.compile(r"<result>(.*?)</result>", re.DOTALL)
+_INDEXED_RESULT_SECTION_PATTERN = re.compile(
+    r"<result index=\"(\d+)\">(.*?)</result>", re.DOTALL
+)
+
+
+def parse_evaluation_result(
+    text: str, evaluation_result_type: EvaluationResultType
+) -> EvaluationResult:
+    """Parses the content of a result section into an EvaluationResult.
+
+    Args:
+        text (str): The content of the result section.
+        evaluation_result_type (EvaluationResultType): The expected type of the result.
+
+    Raises:
+        ResultSectionNotParsableException: If text does not match evaluation_result_type.
+
+    Returns:
+        EvaluationResult: The parsed EvaluationResult.
+    """
+    text = text.strip()
+    field_name, _ = betterproto.which_one_of(
+        evaluation_result_type, "evaluation_result_type"
+    )
+    if field_name == "value_range":
+        value_range = evaluation_result_type.value_range
+        try:
+            value = float(text)
+        except ValueError as error:
+            raise ResultSectionNotParsableException(
+                f"{text!r} is not a number."
+            ) from error
+        if not value_range.lower_bound <= value <= value_range.upper_bound:
+            raise ResultSectionNotParsableException(
+                f"{value} is not in [{value_range.lower_bound}, {value_range.upper_bound}]."
+            )
+        return EvaluationResult(float_value=value)
+    if field_name == "categorical":
+        if text not in evaluation_result_type.categorical.categories:
+            raise ResultSectionNotParsableException(f"{text!r} is not a category.")
+        return EvaluationResult(str_value=text)
+    return EvaluationResult(str_value=text)
+
+
+class BatchedEvaluator:
+    """Evaluates LanguageModelEvaluation metrics on multiple questions per model call.
+
+    The prefix of a metric on a batch, see `PromptCompiler.get_evaluation_prefix(...)`, is sent once per call,
+    followed by up to max_questions_per_call questions, as long as the prompt stays within max_prompt_tokens.
+    The model answers with one `<result index="i"></result>` section per question.
+    Results of valid sections are kept, only questions whose section is missing, repeated or not parsable
+    are evaluated in a single call each, with a `<result></result>` section.
+    Failed evaluations are collected per question, so that a failure does not discard the results of other questions.
+    """
+
+    def __init__(
+        self,
+        complete: Completion,
+        max_questions_per_call: int = 10,
+        max_prompt_tokens: int = 4000,
+        prompt_compiler: Optional[PromptCompiler] = None,
+        rate_limit: Optional[TokenBucket] = None,
+    ) -> None:
+        """Constructor of BatchedEvaluator.
+
+        Args:
+            complete (Completion): Completes prompts with a language model.
+            max_questions_per_call (int, optional): The maximum amount of questions per call. Defaults to 10.
+            max_prompt_tokens (int, optional): The token budget of a prompt, a question that exceeds it on its own is sent alone. Defaults to 4000.
+            prompt_compiler (Optional[PromptCompiler], optional): Compiles and counts the tokens of prompts. Defaults to a new PromptCompiler.
+            rate_limit (Optional[TokenBucket], optional): Limits the rate of calls. Defaults to None.
+
+        Raises:
+            ValueError: If max_questions_per_call or max_prompt_tokens is not positive.
+        """
+        if max_questions_per_call <= 0:
+            raise ValueError("max_questions_per_call has to be positive.")
+        if max_prompt_tokens <= 0:
+            raise ValueError("max_prompt_tokens has to be positive.")
+        self.complete = complete
+        self.max_questions_per_call = max_questions_per_call
+        self.max_prompt_tokens = max_prompt_tokens
+        self.prompt_compiler = prompt_compiler or PromptCompiler()
+        self.rate_limit = rate_limit
+        self.calls = 0
+        self.fallback_calls = 0
+
+    async def evaluate(
+        self,
+        batch: Batch,
+        metrics: list[Metric],
+        evaluations: Optional[list[tuple[int, Metric]]] = None,
+    ) -> dict[tuple[int, str], Exception]:
+        """Evaluates questions of a batch and sets the results in `Question.evaluation_results`.
+
+        Args:
+            batch (Batch): The batch, its questions are modified.
+            metrics (list[Metric]): Metrics of the EvaluationSettings, metrics without LanguageModelEvaluation are skipped.
+            evaluations (Optional[list[tuple[int, Metric]]], optional): Question indices and metrics of the evaluations,
+                e.g. the return value of `EvaluationResultCache.fill_from_cache(...)`. Defaults to all evaluations of questions with GenerationResult.
+
+        Returns:
+            dict[tuple[int, str], Exception]: Exceptions of failed evaluations by question index and metric reference,
+                e.g. ResultSectionNotFoundException or ResultSectionNotParsableException if the response of a single evaluation is not parsable,
+                or the exception of the model call. Their results are not set.
+        """
+        questions = batch.question_to_generate
+        if evaluations is None:
+            evaluations = [
+                (index, metric)
+                for index, question in enumerate(questions)
+                if question.generation_result is not None
+                for metric in metrics
+            ]
+        rendered_questions_by_metric: dict[str, dict[int, str]] = {}
+        metrics_by_reference: dict[str, Metric] = {}
+        for index, metric in evaluations:
+            field_name, _ = betterproto.which_one_of(metric.evaluation, "evaluation")
+            generation_result = questions[index].generation_result
+            if field_name != "language_model_evaluation" or generation_result is None:
+                continue
+            rendered_questions_by_metric.setdefault(metric.reference, {})[index] = (
+                render_generation_result(generation_result)
+            )
+            metrics_by_reference[metric.reference] = metric
+        packs: list[tuple[str, list[int]]] = []
+        calls = []
+        for reference, rendered_questions in rendered_questions_by_metric.items():
+            metric = metrics_by_reference[reference]
+            compiled_prefix = self.prompt_compiler.get_evaluation_prefix(batch, metric)
+            for packed_indices in self._pack(compiled_prefix, rendered_questions):
+                packs.append((reference, packed_indices))
+                calls.append(
+                    self._evaluate_packed(
+                        batch,
+                        reference,
+                        metric.evaluation.language_model_evaluation,
+                        compiled_prefix,
+                        {index: rendered_questions[index] for index in packed_indices},
+                    )
+                )
+        failures: dict[tuple[int, str], Exception] = {}
+        for (reference, packed_indices), outcome in zip(
+            packs, await asyncio.gather(*calls, return_exceptions=True)
+        ):
+            if isinstance(outcome, Exception):
+                for index in packed_indices:
+                    failures[(index, reference)] = outcome
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                for index, error in outcome.items():
+                    failures[(index, reference)] = error
+        return failures
+
+    def _pack(
+        self, compiled_prefix: CompiledPrefix, rendered_questions: dict[int, str]
+    ) -> list[list[int]]:
+        """Packs questions into calls in order, bounded by max_questions_per_call and max_prompt_tokens.
+
+        Returns:
+            list[list[int]]: Question indices per call.
+        """
+        prefix_tokens = compiled_prefix.token_count
+        packed_indices: list[list[int]] = []
+        prompt_tokens = prefix_tokens
+        for index, rendered_question in rendered_questions.items():
+            question_tokens = self.prompt_compiler.count_tokens(
+                self._render_question(index, rendered_question)
+            )
+            if (
+                not packed_indices
+                or len(packed_indices[-1]) >= self.max_questions_per_call
+                or prompt_tokens + question_tokens > self.max_prompt_tokens
+            ):
+                packed_indices.append([])
+                prompt_tokens = prefix_tokens
+            packed_indices[-1].append(index)
+            prompt_tokens += question_tokens
+        return packed_indices
+
+    async def _evaluate_packed(
+        self,
+        batch: Batch,
+        reference: str,
+        language_model_evaluation: LanguageModelEvaluation,
+        compiled_prefix: CompiledPrefix,
+        rendered_questions: dict[int, str],
+    ) -> dict[int, Exception]:
+        """Evaluates packed questions in a call and falls back to single calls for questions without valid result section.
+
+        Returns:
+            dict[int, Exception]: Exceptions of failed single evaluations by question index.
+        """
+        questions = batch.question_to_generate
+        evaluation_result_type = language_model_evaluation.evaluation_result_type
+        evaluation_results: dict[int, EvaluationResult] = {}
+        if len(rendered_questions) > 1:
+            prompt = self.prompt_compiler.compile(
+                compiled_prefix,
+                f"Evaluate each of the following {len(rendered_questions)} questions. "
+                + 'Answer with one <result index="i"></result> section per question, containing the evaluation of question i.\n\n'
+                + "\n\n".join(
+                    self._render_question(index, rendered_question)
+                    for index, rendered_question in rendered_questions.items()
+                ),
+            )
+            response = await self._complete(language_model_evaluation.model, prompt)
+            evaluation_results = self._parse_packed_response(
+                response, set(rendered_questions), evaluation_result_type
+            )
+            for index, evaluation_result in evaluation_results.items():
+                questions[index].evaluation_results[reference] = evaluation_result
+            self.fallback_calls += len(rendered_questions) - len(evaluation_results)
+        fallback_indices = [
+            index for index in rendered_questions if index not in evaluation_results
+        ]
+        outcomes = await asyncio.gather(
+            *(
+                self._evaluate_single(
+                    batch,
+                    reference,
+                    language_model_evaluation,
+                    compiled_prefix,
+                    index,
+                    rendered_questions[index],
+                )
+                for index in fallback_indices
+            ),
+            return_exceptions=True,
+        )
+        failures: dict[int, Exception] = {}
+        for index, outcome in zip(fallback_indices, outcomes):
+            if isinstance(outcome, Exception):
+                failures[index] = outcome
+            elif isinstance(outcome, BaseException):
+                raise outcome
+        return failures
+
+    async def _evaluate_single(
+        self,
+        batch: Batch,
+        reference: str,
+        language_model_evaluation: LanguageModelEvaluation,
+        compiled_prefix: CompiledPrefix,
+        index: int,
+        rendered_question: str,
+    ) -> None:
+        """Evaluates a single question in a call."""
+        prompt = self.prompt_compiler.compile(
+            compiled_prefix,
+            "Evaluate the following question. Answer with a <result></result> section, containing the evaluation.\n\n"
+            + rendered_question,
+        )
+        response = await self._complete(language_model_evaluation.model, prompt)
+        match = _RESULT_SECTION_PATTERN.search(response)
+        if match is None:
+            raise ResultSectionNotFoundException(
+                f"No result section in the evaluation of question {index}."
+            )
+        batch.question_to_generate[index].evaluation_results[reference] = (
+            parse_evaluation_result(
+                match.group(1), language_model_evaluation.evaluation_result_type
+            )
+        )
+
+    async def _complete(self, model: str, prompt: str) -> str:
+        """Completes a prompt within the rate limit."""
+        if self.rate_limit is not None:
+            await self.rate_limit.acquire()
+        self.calls += 1
+        return await self.complete(model, prompt)
+
+    @staticmethod
+    def _parse_packed_response(
+        response: str,
+        indices: set[int],
+        evaluation_result_type: EvaluationResultType,
+    ) -> dict[int, EvaluationResult]:
+        """Demultiplexes the indexed result sections of a packed response.
+        Sections of unknown indices are ignored, questions with repeated or unparsable sections are omitted.
+
+        Returns:
+            dict[int, EvaluationResult]: EvaluationResults by question index of the questions with a valid section.
+        """
+        evaluation_results: dict[int, EvaluationResult] = {}
+        invalid_indices: set[int] = set()
+        for match in _INDEXED_RESULT_SECTION_PATTERN.finditer(response):
+            index = int(match.group(1))
+            if index not in indices or index in invalid_indices:
+                continue
+            if index in evaluation_results:
+                del evaluation_results[index]
+                invalid_indices.add(index)
+                continue
+            try:
+                evaluation_results[index] = parse_evaluation_result(
+                    match.group(2), evaluation_result_type
+                )
+            except ResultSectionNotParsableException:
+                invalid_indices.add(index)
+        return evaluation_results
+
+    @staticmethod
+    def _render_question(index: int, rendered_question: str) -> str:
+        return f'<question index="{index}">\n{rendered_question}\n</question>'
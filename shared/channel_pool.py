@@ -0,0 +1,360 @@
+import asyncio
+import time
+from types import TracebackType
+from typing import Any, Awaitable, Callable, Optional, Type, TypeVar, cast
+from urllib.parse import urlsplit
+
+from betterproto.grpc.grpclib_client import ServiceStub
+from grpclib.client import Channel, Stream
+from grpclib.config import Configuration
+from evalquiz_proto.shared.generated import MaterialServerStub, PipelineServerStub
+
+ServiceStubType = TypeVar("ServiceStubType", bound=ServiceStub)
+
+DEFAULT_PORT = 50051
+"""Port of urls without port and scheme, the default port of grpclib."""
+
+
+def parse_url(url: str) -> tuple[str, int, bool]:
+    """Parses the url of a remote, e.g. an entry of `InternalConfig.material_server_urls`.
+    Urls are either given as `host:port` or with an `http` or `https` scheme.
+
+    Args:
+        url (str): Url of the remote.
+
+    Raises:
+        ValueError: If the scheme is neither `http` nor `https` or the url has no host.
+
+    Returns:
+        tuple[str, int, bool]: Host, port and whether TLS is used.
+    """
+    split_url = urlsplit(url if "://" in url else "//" + url)
+    if split_url.scheme not in ("", "http", "https"):
+        raise ValueError(f"Scheme of {url} is not supported.")
+    if not split_url.hostname:
+        raise ValueError(f"Url {url} has no host.")
+    use_ssl = split_url.scheme == "https"
+    default_port = {"": DEFAULT_PORT, "http": 80, "https": 443}[split_url.scheme]
+    return (split_url.hostname, split_url.port or default_port, use_ssl)
+
+
+class _CountedStream:
+    """Counts a grpclib Stream as active stream of its PooledChannel, from entering until exiting its context.
+    Other attributes are delegated to the stream.
+    """
+
+    def __init__(self, channel: "PooledChannel", stream: Stream[Any, Any]) -> None:
+        self._channel = channel
+        self._stream = stream
+
+    async def __aenter__(self) -> Stream[Any, Any]:
+        self._channel.active_streams += 1
+        self._channel.last_active = time.monotonic()
+        try:
+            return await self._stream.__aenter__()
+        except BaseException:
+            self._release()
+            raise
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        try:
+            await self._stream.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            self._release()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+    def _release(self) -> None:
+        self._channel.active_streams -= 1
+        self._channel.last_active = time.monotonic()
+
+
+class PooledChannel(Channel):
+    """A grpclib Channel that counts its active streams and reports since when it is idle.
+    Streams are counted around the context of `request(...)`, which the generated stubs enter for every call.
+    """
+
+    def __init__(self, url: str, config: Optional[Configuration] = None) -> None:
+        """Constructor of PooledChannel.
+
+        Args:
+            url (str): Url of the remote.
+            config (Optional[Configuration], optional): Configuration of the connection. Defaults to None.
+        """
+        host, port, use_ssl = parse_url(url)
+        super().__init__(host, port, ssl=use_ssl or None, config=config)
+        self.url = url
+        self.host = host
+        self.port = port
+        self.active_streams = 0
+        self.last_active = time.monotonic()
+
+    def request(self, *args: Any, **kwargs: Any) -> Stream[Any, Any]:
+        """Creates a stream like `Channel.request(...)`, that counts as active stream while its context is entered.
+
+        Returns:
+            Stream[Any, Any]: The counted stream.
+        """
+        return cast(
+            Stream[Any, Any], _CountedStream(self, super().request(*args, **kwargs))
+        )
+
+    def is_idle(self, idle_timeout: float) -> bool:
+        """Checks whether the channel had no active streams for idle_timeout seconds.
+
+        Args:
+            idle_timeout (float): Seconds without active streams.
+
+        Returns:
+            bool: True, if the channel is idle.
+        """
+        now = time.monotonic()
+        if self.active_streams > 0:
+            self.last_active = now
+            return False
+        return now - self.last_active >= idle_timeout
+
+
+async def check_connection(channel: PooledChannel, timeout: float = 5.0) -> bool:
+    """Health check that opens a TCP connection to the remote of a channel.
+
+    Args:
+        channel (PooledChannel): The checked channel.
+        timeout (float, optional): Seconds until the remote is considered unreachable. Defaults to 5.0.
+
+    Returns:
+        bool: True, if the remote accepted the connection.
+    """
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(channel.host, channel.port), timeout
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+class ChannelPool:
+    """Reuses grpclib channels per remote url, so repeated requests to the same remote share HTTP/2 connections.
+
+    Channels are handed out as follows:
+        - The channel of a url with the fewest active streams is used, while it has less than max_streams_per_channel.
+        - Otherwise a new channel is opened, while the url has less than max_channels_per_url channels.
+        - Otherwise the channel with the fewest active streams is used and the stream is queued by HTTP/2 flow control.
+    Maintenance, which runs every maintenance_interval seconds after `start()`:
+        - Channels without active streams for idle_timeout seconds are closed.
+        - Channels are checked with health_check, failing channels are closed and their url is marked unhealthy.
+    Channels to unhealthy urls are still handed out, callers choosing between remotes use `is_healthy(...)`,
+    e.g. HedgedMaterialFetcher requests unhealthy remotes last.
+    Stubs are bound to their channel, so they should be created per request with the stub factories
+    instead of being held, otherwise they keep using channels after eviction.
+    """
+
+    def __init__(
+        self,
+        max_streams_per_channel: int = 100,
+        max_channels_per_url: int = 4,
+        idle_timeout: float = 300.0,
+        maintenance_interval: float = 30.0,
+        health_check: Callable[[PooledChannel], Awaitable[bool]] = check_connection,
+        config: Optional[Configuration] = None,
+    ) -> None:
+        """Constructor of ChannelPool.
+
+        Args:
+            max_streams_per_channel (int, optional): The amount of active streams until another channel is opened. Defaults to 100.
+            max_channels_per_url (int, optional): The maximum amount of channels per url. Defaults to 4.
+            idle_timeout (float, optional): Seconds without active streams until a channel is closed. Defaults to 300.0.
+            maintenance_interval (float, optional): Seconds between idle eviction and health checks. Defaults to 30.0.
+            health_check (Callable[[PooledChannel], Awaitable[bool]], optional): Checks a channel, e.g. with the gRPC health checking protocol. Defaults to check_connection.
+            config (Optional[Configuration], optional): Configuration of opened channels, e.g. keepalive pings. Defaults to None.
+
+        Raises:
+            ValueError: If max_streams_per_channel or max_channels_per_url is not positive.
+        """
+        if max_streams_per_channel <= 0 or max_channels_per_url <= 0:
+            raise ValueError(
+                "max_streams_per_channel and max_channels_per_url have to be positive."
+            )
+        self.max_streams_per_channel = max_streams_per_channel
+        self.max_channels_per_url = max_channels_per_url
+        self.idle_timeout = idle_timeout
+        self.maintenance_interval = maintenance_interval
+        self.health_check = health_check
+        self.config = config
+        self.channels: dict[str, list[PooledChannel]] = {}
+        self.unhealthy_urls: set[str] = set()
+        self.closed = False
+        self._maintenance_task: Optional[asyncio.Task[None]] = None
+
+    def get_channel(self, url: str) -> PooledChannel:
+        """Retrieves a pooled channel to the remote at url.
+
+        Args:
+            url (str): Url of the remote.
+
+        Raises:
+            RuntimeError: If the pool is closed.
+
+        Returns:
+            PooledChannel: The least loaded channel of the url.
+        """
+        if self.closed:
+            raise RuntimeError("ChannelPool is closed.")
+        channels = self.channels.setdefault(url, [])
+        channel = min(
+            channels, key=lambda channel: channel.active_streams, default=None
+        )
+        if channel is None or (
+            channel.active_streams >= self.max_streams_per_channel
+            and len(channels) < self.max_channels_per_url
+        ):
+            channel = PooledChannel(url, self.config)
+            channels.append(channel)
+        channel.last_active = time.monotonic()
+        return channel
+
+    def get_stub(
+        self,
+        stub_type: Type[ServiceStubType],
+        url: str,
+        timeout: Optional[float] = None,
+    ) -> ServiceStubType:
+        """Creates a stub on a pooled channel.
+
+        Args:
+            stub_type (Type[ServiceStubType]): The generated stub class.
+            url (str): Url of the remote.
+            timeout (Optional[float], optional): Default timeout of requests of the stub in seconds. Defaults to None.
+
+        Returns:
+            ServiceStubType: The stub.
+        """
+        return stub_type(self.get_channel(url), timeout=timeout)
+
+    def material_server_stub(self, url: str) -> MaterialServerStub:
+        """Stub factory for MaterialServerStub, e.g. for HedgedMaterialFetcher.
+
+        Args:
+            url (str): Url of the remote.
+
+        Returns:
+            MaterialServerStub: The stub on a pooled channel.
+        """
+        return self.get_stub(MaterialServerStub, url)
+
+    def pipeline_server_stub(self, url: str) -> PipelineServerStub:
+        """Stub factory for PipelineServerStub.
+
+        Args:
+            url (str): Url of the remote.
+
+        Returns:
+            PipelineServerStub: The stub on a pooled channel.
+        """
+        return self.get_stub(PipelineServerStub, url)
+
+    def is_healthy(self, url: str) -> bool:
+        """Checks whether the last health check of url succeeded, urls without checks are healthy.
+
+        Args:
+            url (str): Url of the remote.
+
+        Returns:
+            bool: False, if the last health check of url failed.
+        """
+        return url not in self.unhealthy_urls
+
+    def evict_idle_channels(self) -> int:
+        """Closes channels without active streams for idle_timeout seconds.
+
+        Returns:
+            int: The amount of closed channels.
+        """
+        evicted_count = 0
+        for url, channels in list(self.channels.items()):
+            for channel in [
+                channel for channel in channels if channel.is_idle(self.idle_timeout)
+            ]:
+                channels.remove(channel)
+                channel.close()
+                evicted_count += 1
+            if not channels:
+                del self.channels[url]
+        return evicted_count
+
+    async def check_health(self) -> None:
+        """Runs the health check on all channels, closes failing channels and updates `unhealthy_urls`."""
+        checked_channels = [
+            channel for channels in self.channels.values() for channel in channels
+        ]
+        results = await asyncio.gather(
+            *(self.health_check(channel) for channel in checked_channels),
+            return_exceptions=True,
+        )
+        healthy_urls = set()
+        for channel, result in zip(checked_channels, results):
+            if result is True:
+                healthy_urls.add(channel.url)
+                continue
+            self.unhealthy_urls.add(channel.url)
+            channels = self.channels.get(channel.url, [])
+            if channel in channels and channel.active_streams == 0:
+                channels.remove(channel)
+                channel.close()
+        self.unhealthy_urls -= healthy_urls
+        for url in [url for url, channels in self.channels.items() if not channels]:
+            del self.channels[url]
+
+    def start(self) -> None:
+        """Starts periodic idle eviction and health checks on the running event loop."""
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def _maintain(self) -> None:
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            self.evict_idle_channels()
+            await self.check_health()
+
+    async def close(self, grace_period: float = 5.0) -> None:
+        """Stops handing out channels, waits until active streams ended and closes all channels.
+
+        Args:
+            grace_period (float, optional): Seconds to wait for active streams, remaining streams are cancelled. Defaults to 5.0.
+        """
+        self.closed = True
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+            self._maintenance_task = None
+        deadline = time.monotonic() + grace_period
+        channels = [
+            channel for channels in self.channels.values() for channel in channels
+        ]
+        while (
+            any(channel.active_streams > 0 for channel in channels)
+            and time.monotonic() < deadline
+        ):
+            await asyncio.sleep(0.01)
+        for channel in channels:
+            channel.close()
+        self.channels.clear()
+
+    async def __aenter__(self) -> "ChannelPool":
+        self.start()
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.close()
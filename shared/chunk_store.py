@@ -0,0 +1,636 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar, Union
+
+from blake3 import blake3
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from evalquiz_proto.shared.async_file_io import AsyncFileIO
+from evalquiz_proto.shared.exceptions import ChunkDataNotValidException
+from evalquiz_proto.shared.file_hasher import FileHasher
+from evalquiz_proto.shared.generated import (
+    ChunkData,
+    ChunkManifest,
+    ChunkRequest,
+    MaterialServerStub,
+    String,
+)
+
+GEAR_TABLE = [
+    int.from_bytes(blake3(bytes([value])).digest()[:8], "little")
+    for value in range(256)
+]
+"""Pseudo-random 64-bit values per byte value that the gear hash of the chunker is built from."""
+
+GEAR_HASH_MASK = 2**64 - 1
+
+CHUNK_BATCH_SIZE = 64
+"""The maximum amount of chunks per MongoDB round trip, bounds the memory held by a batch to CHUNK_BATCH_SIZE times max_size."""
+
+CHUNK_QUERY_BATCH_SIZE = 2**12
+"""The maximum amount of hashes per `$in` query, that only retrieves or removes chunk documents without data."""
+
+READ_SIZE = 2**22
+"""The amount of bytes read from a file per iteration while it is split into chunks."""
+
+T = TypeVar("T")
+
+
+class ContentDefinedChunker:
+    """Splits binary data into chunks whose boundaries are defined by their contents, following FastCDC.
+    A boundary is placed where the gear hash of the preceding 64 bytes matches a mask,
+    so inserting or removing bytes only changes the chunks around the modification.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 2**15,
+        average_size: int = 2**16,
+        max_size: int = 2**18,
+    ) -> None:
+        """Constructor of ContentDefinedChunker.
+
+        Args:
+            min_size (int, optional): The minimum size of a chunk, except for the last chunk. Defaults to 2**15.
+            average_size (int, optional): The targeted size of a chunk beyond min_size, has to be a power of 2. Defaults to 2**16.
+            max_size (int, optional): The maximum size of a chunk. Defaults to 2**18.
+
+        Raises:
+            ValueError: If the sizes are not ordered, or average_size is not a power of 2.
+        """
+        if not 0 < min_size < average_size < max_size:
+            raise ValueError(
+                "Sizes have to satisfy 0 < min_size < average_size < max_size."
+            )
+        if average_size & (average_size - 1):
+            raise ValueError("average_size has to be a power of 2.")
+        self.min_size = min_size
+        self.average_size = average_size
+        self.max_size = max_size
+        bits = average_size.bit_length() - 1
+        # Normalized chunking: boundaries are less likely before average_size and more likely after it.
+        self.small_mask = ((1 << (bits + 1)) - 1) << (63 - bits)
+        self.large_mask = ((1 << (bits - 1)) - 1) << (65 - bits)
+
+    def split(self, data: Union[bytes, bytearray], final: bool = True) -> list[int]:
+        """Calculates the sizes of the chunks that data is split into.
+
+        Args:
+            data (Union[bytes, bytearray]): The data to be split.
+            final (bool, optional): data is the end of the stream, if set to True. Otherwise, bytes after the last boundary
+                that can be determined without further data are left unassigned. Defaults to True.
+
+        Returns:
+            list[int]: Sizes of consecutive chunks from the start of data.
+        """
+        chunk_sizes = []
+        offset = 0
+        while offset < len(data):
+            if not final and len(data) - offset < self.max_size:
+                break
+            chunk_size = self._find_chunk_size(
+                data, offset, min(len(data), offset + self.max_size)
+            )
+            chunk_sizes.append(chunk_size)
+            offset += chunk_size
+        return chunk_sizes
+
+    def _find_chunk_size(
+        self, data: Union[bytes, bytearray], start: int, end: int
+    ) -> int:
+        """Finds the first boundary in data between start and end.
+
+        Args:
+            data (Union[bytes, bytearray]): The data to be split.
+            start (int): The start of the chunk.
+            end (int): The end of data or the position max_size after start.
+
+        Returns:
+            int: The size of the chunk.
+        """
+        if end - start <= self.min_size:
+            return end - start
+        normal_end = min(start + self.average_size, end)
+        boundary, gear_hash = self._scan(
+            data, start + self.min_size, normal_end, 0, self.small_mask
+        )
+        if boundary is None:
+            boundary, _ = self._scan(data, normal_end, end, gear_hash, self.large_mask)
+        if boundary is None:
+            return end - start
+        return boundary - start
+
+    @staticmethod
+    def _scan(
+        data: Union[bytes, bytearray],
+        position: int,
+        end: int,
+        gear_hash: int,
+        mask: int,
+    ) -> tuple[Optional[int], int]:
+        """Rolls the gear hash over data until it matches mask.
+
+        Args:
+            data (Union[bytes, bytearray]): The data to be split.
+            position (int): The position to continue rolling at.
+            end (int): The position to stop rolling at.
+            gear_hash (int): The gear hash before position.
+            mask (int): A boundary is placed after the first byte where no bit of mask is set in the gear hash.
+
+        Returns:
+            tuple[Optional[int], int]: The position after the boundary, or None if there is none, and the gear hash.
+        """
+        gear_table = GEAR_TABLE
+        while position < end:
+            # The hash is truncated once per block, bits above 64 do not influence the masked bits.
+            for value in data[position : min(position + 32, end)]:
+                gear_hash = (gear_hash << 1) + gear_table[value]
+                position += 1
+                if not gear_hash & mask:
+                    return (position, gear_hash & GEAR_HASH_MASK)
+            gear_hash &= GEAR_HASH_MASK
+        return (None, gear_hash)
+
+
+class ChunkStore:
+    """Stores files as deduplicated content-defined chunks in MongoDB.
+    A file is described by a manifest, that lists the hashes of its chunks in order.
+    Chunks are reference counted by manifests and removed, once no manifest references them anymore.
+    Files are synchronized between stores by transferring only the chunks that the pulling store is missing.
+    """
+
+    def __init__(
+        self,
+        mongodb_client: MongoClient[dict[str, Any]],
+        mongodb_database: str = "local_path_db",
+        chunker: Optional[ContentDefinedChunker] = None,
+        file_io: Optional[AsyncFileIO] = None,
+        database_executor: Optional[Executor] = None,
+    ) -> None:
+        """Constructor of ChunkStore.
+
+        Args:
+            mongodb_client (MongoClient[dict[str, Any]]): A pymongo client to enable communication with a MongoDB server.
+            mongodb_database (str, optional): The database that all operations are performed on. Defaults to "local_path_db".
+            chunker (Optional[ContentDefinedChunker], optional): Splits files into chunks. Defaults to a new ContentDefinedChunker.
+            file_io (Optional[AsyncFileIO], optional): Carries out file operations and chunking off the event loop. Defaults to a new AsyncFileIO.
+            database_executor (Optional[Executor], optional): MongoDB operations of async methods are carried out on database_executor, if set. Defaults to None.
+        """
+        self.chunks = mongodb_client[mongodb_database].chunks
+        self.manifests = mongodb_client[mongodb_database].manifests
+        self.chunker = chunker if chunker is not None else ContentDefinedChunker()
+        self.file_io = file_io if file_io is not None else AsyncFileIO()
+        self.database_executor = database_executor
+        self.file_hasher = FileHasher()
+
+    async def _run_database_operation(
+        self, function: Callable[..., T], *args: Any
+    ) -> T:
+        """Runs a blocking MongoDB operation from an async method, on database_executor if it is set.
+
+        Args:
+            function (Callable[..., T]): The blocking operation.
+            *args (Any): Positional arguments of function.
+
+        Returns:
+            T: Return value of function.
+        """
+        if self.database_executor is None:
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.database_executor, function, *args)
+
+    def get_manifest(self, hash: str) -> ChunkManifest:
+        """Retrieves the manifest of a file.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Raises:
+            KeyError: If no manifest is stored under the given hash.
+
+        Returns:
+            ChunkManifest: The manifest of the file.
+        """
+        mongodb_document = self.manifests.find_one({"_id": hash})
+        if mongodb_document is None:
+            raise KeyError(hash)
+        return ChunkManifest(
+            hash=hash,
+            chunk_hashes=mongodb_document["chunk_hashes"],
+            chunk_sizes=mongodb_document["chunk_sizes"],
+            mimetype=mongodb_document["mimetype"],
+        )
+
+    def has_manifest(self, hash: str) -> bool:
+        """Evaluates if a manifest is stored under the given hash.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Returns:
+            bool: True, if the file is stored.
+        """
+        return self.manifests.find_one({"_id": hash}, {"_id": 1}) is not None
+
+    def get_missing_chunk_hashes(self, chunk_hashes: list[str]) -> list[str]:
+        """Determines the chunks whose data is not stored.
+
+        Args:
+            chunk_hashes (list[str]): Hashes of chunks.
+
+        Returns:
+            list[str]: Distinct hashes of chunks in chunk_hashes, whose data is not stored.
+        """
+        distinct_chunk_hashes = list(dict.fromkeys(chunk_hashes))
+        present_chunk_hashes = set()
+        for start in range(0, len(distinct_chunk_hashes), CHUNK_QUERY_BATCH_SIZE):
+            for mongodb_document in self.chunks.find(
+                {
+                    "_id": {
+                        "$in": distinct_chunk_hashes[
+                            start : start + CHUNK_QUERY_BATCH_SIZE
+                        ]
+                    },
+                    "data": {"$exists": True},
+                },
+                {"_id": 1},
+            ):
+                present_chunk_hashes.add(mongodb_document["_id"])
+        return [
+            chunk_hash
+            for chunk_hash in distinct_chunk_hashes
+            if chunk_hash not in present_chunk_hashes
+        ]
+
+    def iterate_chunks(self, chunk_hashes: list[str]) -> Iterator[tuple[str, bytes]]:
+        """Iterates over the data of chunks in the given order, CHUNK_BATCH_SIZE chunks are retrieved per round trip.
+
+        Args:
+            chunk_hashes (list[str]): Hashes of chunks.
+
+        Raises:
+            KeyError: If the data of a chunk is not stored.
+
+        Returns:
+            Iterator[tuple[str, bytes]]: Iterator with hash and data of every chunk.
+        """
+        for start in range(0, len(chunk_hashes), CHUNK_BATCH_SIZE):
+            batch_chunk_hashes = chunk_hashes[start : start + CHUNK_BATCH_SIZE]
+            yield from self._get_chunk_batch(batch_chunk_hashes)
+
+    def _get_chunk_batch(self, chunk_hashes: list[str]) -> list[tuple[str, bytes]]:
+        """Retrieves the data of chunks with a single round trip.
+
+        Args:
+            chunk_hashes (list[str]): Hashes of chunks.
+
+        Raises:
+            KeyError: If the data of a chunk is not stored.
+
+        Returns:
+            list[tuple[str, bytes]]: Hash and data of every chunk in the given order.
+        """
+        chunk_data = {
+            mongodb_document["_id"]: bytes(mongodb_document["data"])
+            for mongodb_document in self.chunks.find(
+                {"_id": {"$in": chunk_hashes}, "data": {"$exists": True}},
+                {"data": 1},
+            )
+        }
+        return [(chunk_hash, chunk_data[chunk_hash]) for chunk_hash in chunk_hashes]
+
+    async def read_file_async(self, hash: str) -> AsyncIterator[bytes]:
+        """Streams a stored file by its chunks.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Raises:
+            KeyError: If the file or one of its chunks is not stored.
+
+        Returns:
+            AsyncIterator[bytes]: Iterator with the chunks of the file.
+        """
+        manifest = await self._run_database_operation(self.get_manifest, hash)
+        for start in range(0, len(manifest.chunk_hashes), CHUNK_BATCH_SIZE):
+            for _, data in await self._run_database_operation(
+                self._get_chunk_batch,
+                manifest.chunk_hashes[start : start + CHUNK_BATCH_SIZE],
+            ):
+                yield data
+
+    async def add_file_async(
+        self, local_path: Path, hash: Optional[str] = None, mimetype: str = ""
+    ) -> ChunkManifest:
+        """Splits a local file into chunks and stores the chunks that are not stored yet, together with the manifest of the file.
+
+        Args:
+            local_path (Path): The path of the file to be stored.
+            hash (Optional[str], optional): The BLAKE3 hash of the file. If set and the file is stored already, it is not read again. Defaults to None.
+            mimetype (str, optional): The mimetype of the file. Defaults to "".
+
+        Returns:
+            ChunkManifest: The manifest of the file.
+        """
+        if hash is not None:
+            try:
+                return await self._run_database_operation(self.get_manifest, hash)
+            except KeyError:
+                pass
+        hasher = self.file_hasher.create_hasher()
+        manifest = ChunkManifest(mimetype=mimetype)
+        try:
+            batch: list[tuple[str, bytes]] = []
+            async for chunk in self._split_file(local_path):
+                hasher.update(chunk)
+                batch.append((blake3(chunk).hexdigest(), chunk))
+                if len(batch) == CHUNK_BATCH_SIZE:
+                    await self._add_chunk_batch(manifest, batch)
+                    batch = []
+            await self._add_chunk_batch(manifest, batch)
+            manifest.hash = hasher.hexdigest()
+            return await self._run_database_operation(self._add_manifest, manifest)
+        except BaseException:
+            await self._run_database_operation(
+                self._release_chunks, manifest.chunk_hashes
+            )
+            raise
+
+    async def _add_chunk_batch(
+        self, manifest: ChunkManifest, batch: list[tuple[str, bytes]]
+    ) -> None:
+        """References a batch of chunks, appends them to manifest and stores the data of chunks that are not stored yet.
+
+        Args:
+            manifest (ChunkManifest): The manifest of the file that the chunks belong to.
+            batch (list[tuple[str, bytes]]): Hash and data of consecutive chunks.
+        """
+        if not batch:
+            return
+        chunk_hashes = [chunk_hash for chunk_hash, _ in batch]
+        chunk_sizes = [len(data) for _, data in batch]
+        missing_chunk_hashes = set(
+            await self._run_database_operation(
+                self._reference_chunks, chunk_hashes, chunk_sizes
+            )
+        )
+        manifest.chunk_hashes += chunk_hashes
+        manifest.chunk_sizes += chunk_sizes
+        await self._run_database_operation(
+            self._store_chunk_data,
+            [
+                (chunk_hash, data)
+                for chunk_hash, data in batch
+                if chunk_hash in missing_chunk_hashes
+            ],
+        )
+
+    async def _split_file(self, local_path: Path) -> AsyncIterator[bytes]:
+        """Streams a local file split into content-defined chunks, chunking is carried out on the thread pool of file_io.
+
+        Args:
+            local_path (Path): The path of the file to be split.
+
+        Returns:
+            AsyncIterator[bytes]: Iterator with the chunks of the file.
+        """
+        buffer = bytearray()
+        async for data in self.file_io.read_chunks(local_path, READ_SIZE):
+            buffer += data
+            chunk_sizes = await self.file_io.run(self.chunker.split, buffer, False)
+            offset = 0
+            for chunk_size in chunk_sizes:
+                yield bytes(buffer[offset : offset + chunk_size])
+                offset += chunk_size
+            del buffer[:offset]
+        offset = 0
+        for chunk_size in await self.file_io.run(self.chunker.split, buffer, True):
+            yield bytes(buffer[offset : offset + chunk_size])
+            offset += chunk_size
+
+    def _reference_chunks(
+        self, chunk_hashes: list[str], chunk_sizes: list[int]
+    ) -> list[str]:
+        """Increments the reference counts of chunks, chunks that are not stored yet are created without data.
+        Referenced chunks are not removed by concurrent releases, so their data can be relied on.
+
+        Args:
+            chunk_hashes (list[str]): Hashes of chunks, a chunk is referenced once per occurrence.
+            chunk_sizes (list[int]): Sizes of the chunks in chunk_hashes.
+
+        Returns:
+            list[str]: Distinct hashes of the referenced chunks, whose data is not stored.
+        """
+        if not chunk_hashes:
+            return []
+        chunk_counts = Counter(chunk_hashes)
+        chunk_size_mapping = dict(zip(chunk_hashes, chunk_sizes))
+        self._bulk_write(
+            [
+                UpdateOne(
+                    {"_id": chunk_hash},
+                    {
+                        "$inc": {"references": count},
+                        "$setOnInsert": {"size": chunk_size_mapping[chunk_hash]},
+                    },
+                    upsert=True,
+                )
+                for chunk_hash, count in chunk_counts.items()
+            ]
+        )
+        return self.get_missing_chunk_hashes(list(chunk_counts))
+
+    def _release_chunks(self, chunk_hashes: list[str]) -> None:
+        """Decrements the reference counts of chunks and removes chunks that are not referenced anymore.
+
+        Args:
+            chunk_hashes (list[str]): Hashes of chunks, a chunk is released once per occurrence.
+        """
+        chunk_counts = Counter(chunk_hashes)
+        if not chunk_counts:
+            return
+        self._bulk_write(
+            [
+                UpdateOne({"_id": chunk_hash}, {"$inc": {"references": -count}})
+                for chunk_hash, count in chunk_counts.items()
+            ]
+        )
+        distinct_chunk_hashes = list(chunk_counts)
+        for start in range(0, len(distinct_chunk_hashes), CHUNK_QUERY_BATCH_SIZE):
+            self.chunks.delete_many(
+                {
+                    "_id": {
+                        "$in": distinct_chunk_hashes[
+                            start : start + CHUNK_QUERY_BATCH_SIZE
+                        ]
+                    },
+                    "references": {"$lte": 0},
+                }
+            )
+
+    def _store_chunk_data(self, chunks: list[tuple[str, bytes]]) -> None:
+        """Stores the data of referenced chunks.
+
+        Args:
+            chunks (list[tuple[str, bytes]]): Hash and data of chunks.
+        """
+        if chunks:
+            self._bulk_write(
+                [
+                    UpdateOne({"_id": chunk_hash}, {"$set": {"data": data}})
+                    for chunk_hash, data in dict(chunks).items()
+                ]
+            )
+
+    def _bulk_write(self, requests: list[UpdateOne]) -> None:
+        """Carries out unordered updates of the chunks collection.
+        Concurrent upserts of the same chunk fail with a duplicate key error once, these updates are retried.
+
+        Args:
+            requests (list[UpdateOne]): The updates.
+        """
+        try:
+            self.chunks.bulk_write(requests, ordered=False)
+        except BulkWriteError as error:
+            write_errors = error.details["writeErrors"]
+            if any(write_error["code"] != 11000 for write_error in write_errors):
+                raise
+            self.chunks.bulk_write(
+                [requests[write_error["index"]] for write_error in write_errors],
+                ordered=False,
+            )
+
+    def _add_manifest(self, manifest: ChunkManifest) -> ChunkManifest:
+        """Stores the manifest of a file whose chunks are referenced and stored.
+        If the same file has been stored concurrently, the chunk references of manifest are released.
+
+        Args:
+            manifest (ChunkManifest): The manifest of the file.
+
+        Returns:
+            ChunkManifest: The stored manifest.
+        """
+        try:
+            self.manifests.insert_one(
+                {
+                    "_id": manifest.hash,
+                    "chunk_hashes": manifest.chunk_hashes,
+                    "chunk_sizes": manifest.chunk_sizes,
+                    "mimetype": manifest.mimetype,
+                }
+            )
+        except DuplicateKeyError:
+            self._release_chunks(manifest.chunk_hashes)
+            return self.get_manifest(manifest.hash)
+        return manifest
+
+    def delete_manifest(self, hash: str) -> None:
+        """Removes the manifest of a file and all chunks that are not referenced by other manifests.
+
+        Args:
+            hash (str): Hash to reference the file.
+        """
+        mongodb_document = self.manifests.find_one_and_delete({"_id": hash})
+        if mongodb_document is not None:
+            self._release_chunks(mongodb_document["chunk_hashes"])
+
+    async def create_chunk_stream(
+        self, chunk_request: ChunkRequest
+    ) -> AsyncIterator[ChunkData]:
+        """Creates the response stream of a `GetChunks` request on the server side.
+
+        Args:
+            chunk_request (ChunkRequest): Hashes of the requested chunks.
+
+        Raises:
+            KeyError: If the data of a chunk is not stored.
+
+        Returns:
+            AsyncIterator[ChunkData]: Iterator with hash and data of every requested chunk.
+        """
+        chunk_hashes = chunk_request.chunk_hashes
+        for start in range(0, len(chunk_hashes), CHUNK_BATCH_SIZE):
+            for chunk_hash, data in await self._run_database_operation(
+                self._get_chunk_batch, chunk_hashes[start : start + CHUNK_BATCH_SIZE]
+            ):
+                yield ChunkData(hash=chunk_hash, data=data)
+
+    async def pull_file_async(
+        self, material_server_stub: MaterialServerStub, hash: str
+    ) -> ChunkManifest:
+        """Synchronizes a file from a remote material server.
+        The manifest of the file is requested first, afterwards only the chunks whose data is not stored locally are transferred.
+
+        Args:
+            material_server_stub (MaterialServerStub): Stub of the remote material server.
+            hash (str): Hash to reference the file.
+
+        Raises:
+            ChunkDataNotValidException: If the remote sends a manifest or chunks that do not match the requested hashes.
+
+        Returns:
+            ChunkManifest: The manifest of the file.
+        """
+        try:
+            return await self._run_database_operation(self.get_manifest, hash)
+        except KeyError:
+            pass
+        manifest = await material_server_stub.get_chunk_manifest(String(value=hash))
+        if manifest.hash != hash or len(manifest.chunk_hashes) != len(
+            manifest.chunk_sizes
+        ):
+            raise ChunkDataNotValidException()
+        chunk_sizes = dict(zip(manifest.chunk_hashes, manifest.chunk_sizes))
+        missing_chunk_hashes = await self._run_database_operation(
+            self._reference_chunks, manifest.chunk_hashes, manifest.chunk_sizes
+        )
+        try:
+            if missing_chunk_hashes:
+                await self._receive_chunks(
+                    material_server_stub, missing_chunk_hashes, chunk_sizes
+                )
+            return await self._run_database_operation(self._add_manifest, manifest)
+        except BaseException:
+            await self._run_database_operation(
+                self._release_chunks, manifest.chunk_hashes
+            )
+            raise
+
+    async def _receive_chunks(
+        self,
+        material_server_stub: MaterialServerStub,
+        chunk_hashes: list[str],
+        chunk_sizes: dict[str, int],
+    ) -> None:
+        """Requests chunks from a remote material server and stores their data after verifying it.
+
+        Args:
+            material_server_stub (MaterialServerStub): Stub of the remote material server.
+            chunk_hashes (list[str]): Hashes of the referenced chunks whose data is missing.
+            chunk_sizes (dict[str, int]): Sizes of the chunks by hash.
+
+        Raises:
+            ChunkDataNotValidException: If the remote sends unrequested or corrupted chunks, or omits chunks.
+        """
+        pending_chunk_hashes = set(chunk_hashes)
+        batch: list[tuple[str, bytes]] = []
+        async for chunk_data in material_server_stub.get_chunks(
+            ChunkRequest(chunk_hashes=chunk_hashes)
+        ):
+            if (
+                chunk_data.hash not in pending_chunk_hashes
+                or len(chunk_data.data) != chunk_sizes[chunk_data.hash]
+                or blake3(chunk_data.data).hexdigest() != chunk_data.hash
+            ):
+                raise ChunkDataNotValidException()
+            pending_chunk_hashes.remove(chunk_data.hash)
+            batch.append((chunk_data.hash, chunk_data.data))
+            if len(batch) == CHUNK_BATCH_SIZE:
+                await self._run_database_operation(self._store_chunk_data, batch)
+                batch = []
+        await self._run_database_operation(self._store_chunk_data, batch)
+        if pending_chunk_hashes:
+            raise ChunkDataNotValidException()
@@ -0,0 +1,312 @@
+import asyncio
+import bz2
+import lzma
+import zlib
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Optional, Protocol, TypeVar
+
+from evalquiz_proto.shared.exceptions import (
+    CompressedDataNotValidException,
+    CompressionNotSupportedException,
+)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore[assignment]
+
+incompressible_mimetypes = {
+    "application/epub+zip",
+    "application/vnd.oasis.opendocument.text",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/zip",
+}
+"""Mimetypes of formats that are compressed already, so compressing them again costs time without saving bytes."""
+
+DEFAULT_MAX_DECOMPRESSED_CHUNK_SIZE = 2**20
+"""The default maximum size of a decompressed chunk in bytes, a compressed chunk is decompressed in multiple steps if it expands beyond it."""
+
+DEFAULT_MAX_DECOMPRESSED_SIZE = 2**32
+"""The default maximum size of a decompressed stream in bytes, larger streams are rejected as decompression bombs."""
+
+T = TypeVar("T")
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class Decompressor(Protocol):
+    """A decompressor with bounded output, like `lzma.LZMADecompressor` and `bz2.BZ2Decompressor`."""
+
+    @property
+    def eof(self) -> bool: ...
+
+    @property
+    def needs_input(self) -> bool: ...
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes: ...
+
+
+class ZlibDecompressor:
+    """Adapts `zlib.decompressobj()` to the Decompressor protocol, input beyond max_length is kept in `unconsumed_tail`."""
+
+    def __init__(self) -> None:
+        self._decompressor = zlib.decompressobj()
+        self.needs_input = True
+
+    @property
+    def eof(self) -> bool:
+        return self._decompressor.eof
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes:
+        data = self._decompressor.unconsumed_tail + data
+        output = self._decompressor.decompress(data, max(0, max_length))
+        self.needs_input = not self._decompressor.unconsumed_tail and (
+            max_length < 0 or len(output) < max_length
+        )
+        return output
+
+
+class ZstdDecompressor:
+    """Adapts the zstandard decompressobj, which has no output bound, to the Decompressor protocol.
+    Input is decompressed in slices, whose size adapts to a decaying maximum of the observed compression ratio,
+    so a step exceeds max_length by at most the output of min_slice_size bytes, a few blocks of 128 KiB.
+    """
+
+    def __init__(self, min_slice_size: int = 16, max_slice_size: int = 2**16) -> None:
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        self._min_slice_size = min_slice_size
+        self._max_slice_size = max_slice_size
+        self._ratio = float(2**16)
+        self._unconsumed_tail = b""
+
+    @property
+    def eof(self) -> bool:
+        return bool(self._decompressor.eof)
+
+    @property
+    def needs_input(self) -> bool:
+        return not self._unconsumed_tail
+
+    def decompress(self, data: bytes, max_length: int = -1) -> bytes:
+        data = self._unconsumed_tail + data
+        output = bytearray()
+        position = 0
+        while position < len(data) and not self.eof:
+            slice_size = self._max_slice_size
+            if max_length >= 0:
+                remaining_length = max_length - len(output)
+                if remaining_length <= 0:
+                    break
+                slice_size = max(
+                    self._min_slice_size,
+                    min(slice_size, int(remaining_length / self._ratio)),
+                )
+            input_slice = data[position : position + slice_size]
+            output_slice = self._decompressor.decompress(input_slice)
+            self._ratio = max(
+                1.0, self._ratio / 2, len(output_slice) / len(input_slice)
+            )
+            output += output_slice
+            position += len(input_slice)
+        self._unconsumed_tail = b"" if self.eof else data[position:]
+        return bytes(output)
+
+
+@dataclass(frozen=True)
+class CompressionCodec:
+    """A streaming compression algorithm that material streams can be compressed with."""
+
+    create_compressor: Callable[[int], Compressor]
+    create_decompressor: Callable[[], Decompressor]
+    default_level: int
+    levels: range
+
+
+compression_codecs: dict[str, CompressionCodec] = {
+    "zlib": CompressionCodec(
+        lambda level: zlib.compressobj(level),
+        ZlibDecompressor,
+        6,
+        range(0, 10),
+    ),
+    "bz2": CompressionCodec(bz2.BZ2Compressor, bz2.BZ2Decompressor, 9, range(1, 10)),
+    "lzma": CompressionCodec(
+        lambda level: lzma.LZMACompressor(preset=level),
+        lzma.LZMADecompressor,
+        6,
+        range(0, 10),
+    ),
+}
+"""Supported compression codecs by name, as they are referenced in `Metadata.compression`."""
+
+if zstandard is not None:
+    compression_codecs["zstd"] = CompressionCodec(
+        lambda level: zstandard.ZstdCompressor(level=level).compressobj(),
+        ZstdDecompressor,
+        3,
+        range(1, 23),
+    )
+
+decompression_errors: tuple[type[Exception], ...] = (
+    zlib.error,
+    lzma.LZMAError,
+    OSError,
+    EOFError,
+)
+"""Exceptions that decompressors raise on corrupted data."""
+
+if zstandard is not None:
+    decompression_errors += (zstandard.ZstdError,)
+
+
+def get_compression_codec(compression: str) -> CompressionCodec:
+    """Retrieves a supported compression codec.
+
+    Args:
+        compression (str): Name of the compression codec.
+
+    Raises:
+        CompressionNotSupportedException: If the codec is unknown or its optional dependency is not installed.
+
+    Returns:
+        CompressionCodec: The compression codec.
+    """
+    if compression not in compression_codecs:
+        raise CompressionNotSupportedException(compression)
+    return compression_codecs[compression]
+
+
+def negotiate_compression(
+    accepted_compressions: list[str], mimetype: Optional[str] = None
+) -> Optional[str]:
+    """Selects the compression codec of a stream, that the receiving side has to accept.
+
+    Args:
+        accepted_compressions (list[str]): Compression codecs that are accepted by the receiving side, in order of preference.
+        mimetype (Optional[str], optional): Mimetype of the streamed material, formats that are compressed already are sent uncompressed. Defaults to None.
+
+    Returns:
+        Optional[str]: The first accepted compression codec that is supported, None if the stream is sent uncompressed.
+    """
+    if mimetype in incompressible_mimetypes:
+        return None
+    for compression in accepted_compressions:
+        if compression in compression_codecs:
+            return compression
+    return None
+
+
+async def _run(
+    executor: Optional[Executor], function: Callable[..., T], *args: Any
+) -> T:
+    """Runs a blocking codec call on executor, so compression does not block the event loop.
+
+    Args:
+        executor (Optional[Executor]): The executor, the default executor of the event loop if None.
+        function (Callable[..., T]): The blocking call.
+        *args (Any): Positional arguments of function.
+
+    Returns:
+        T: Return value of function.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, function, *args)
+
+
+async def compress_chunks(
+    binary_iterator: AsyncIterator[bytes],
+    compression: str,
+    content_partition_size: int,
+    level: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[bytes]:
+    """Compresses a stream of chunks, codec calls run on executor.
+    Compressed chunks are at most content_partition_size bytes, so they fit into the same messages as uncompressed chunks.
+
+    Args:
+        binary_iterator (AsyncIterator[bytes]): Iterator with uncompressed chunks.
+        compression (str): Name of the compression codec.
+        content_partition_size (int): The maximum size of a compressed chunk in bytes.
+        level (Optional[int], optional): Compression level, higher levels trade speed for smaller size. Defaults to the default level of the codec.
+        executor (Optional[Executor], optional): Executor of the codec calls. Defaults to the default executor of the event loop.
+
+    Raises:
+        CompressionNotSupportedException: If the codec is not supported.
+        ValueError: If level is not supported by the codec.
+
+    Returns:
+        AsyncIterator[bytes]: Iterator with compressed chunks.
+    """
+    compression_codec = get_compression_codec(compression)
+    if level is None:
+        level = compression_codec.default_level
+    if level not in compression_codec.levels:
+        raise ValueError(f"Level {level} is not supported by {compression}.")
+    compressor = compression_codec.create_compressor(level)
+    pending = bytearray()
+    async for chunk in binary_iterator:
+        pending += await _run(executor, compressor.compress, chunk)
+        while len(pending) >= content_partition_size:
+            yield bytes(pending[:content_partition_size])
+            del pending[:content_partition_size]
+    pending += await _run(executor, compressor.flush)
+    for start in range(0, len(pending), content_partition_size):
+        yield bytes(pending[start : start + content_partition_size])
+
+
+async def decompress_chunks(
+    binary_iterator: AsyncIterator[bytes],
+    compression: str,
+    max_size: Optional[int] = DEFAULT_MAX_DECOMPRESSED_SIZE,
+    max_chunk_size: int = DEFAULT_MAX_DECOMPRESSED_CHUNK_SIZE,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[bytes]:
+    """Decompresses a stream of chunks that has been compressed with `compress_chunks(...)`, codec calls run on executor.
+    The output is bounded: each compressed chunk is decompressed in steps of at most max_chunk_size bytes
+    and the stream is rejected as soon as it expands beyond max_size bytes.
+
+    Args:
+        binary_iterator (AsyncIterator[bytes]): Iterator with compressed chunks.
+        compression (str): Name of the compression codec.
+        max_size (Optional[int], optional): The maximum size of the decompressed stream in bytes, e.g. the requested length, unbounded if None. Defaults to DEFAULT_MAX_DECOMPRESSED_SIZE.
+        max_chunk_size (int, optional): The maximum size of a decompressed chunk in bytes. Defaults to DEFAULT_MAX_DECOMPRESSED_CHUNK_SIZE.
+        executor (Optional[Executor], optional): Executor of the codec calls. Defaults to the default executor of the event loop.
+
+    Raises:
+        CompressionNotSupportedException: If the codec is not supported.
+        CompressedDataNotValidException: If the compressed stream is corrupted, truncated or expands beyond max_size.
+
+    Returns:
+        AsyncIterator[bytes]: Iterator with uncompressed chunks.
+    """
+    decompressor = get_compression_codec(compression).create_decompressor()
+    size = 0
+    async for chunk in binary_iterator:
+        data = chunk
+        while not decompressor.eof:
+            max_length = max_chunk_size
+            if max_size is not None:
+                max_length = min(max_length, max_size - size + 1)
+            try:
+                output = await _run(executor, decompressor.decompress, data, max_length)
+            except decompression_errors as error:
+                raise CompressedDataNotValidException() from error
+            data = b""
+            size += len(output)
+            if max_size is not None and size > max_size:
+                raise CompressedDataNotValidException(
+                    f"The decompressed stream exceeds {max_size} bytes."
+                )
+            if output:
+                yield output
+            if decompressor.needs_input:
+                break
+    if not decompressor.eof:
+        raise CompressedDataNotValidException()
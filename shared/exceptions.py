@@ -18,6 +18,30 @@ class FileOverwriteNotPermittedException(Exception):
     """A file is already present at the given location and is not permitted to be overwritten."""
 
 
+class UploadOffsetNotValidException(Exception):
+    """The offset of a resumed upload exceeds the amount of bytes received so far."""
+
+
+class CompressionNotSupportedException(Exception):
+    """The compression codec of a material stream is unknown or its optional dependency is not installed."""
+
+
+class CompressedDataNotValidException(Exception):
+    """The compressed data of a material stream is corrupted or truncated."""
+
+
+class ChunkDataNotValidException(Exception):
+    """Chunk data does not match its hash or size, or chunks of a manifest are missing."""
+
+
+class MaterialHashNotValidException(Exception):
+    """The contents received from a remote do not match the requested material hash."""
+
+
+class PageFilterNotSupportedException(Exception):
+    """Pages of the material cannot be selected, because its format has no page index."""
+
+
 class NoMimetypeMappingException(Exception):
     """The system could not map any file extension to the given mimetype, the mimetype could be invalid."""
 
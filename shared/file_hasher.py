@@ -0,0 +1,66 @@
+import mmap
+import os
+from pathlib import Path
+
+from blake3 import blake3
+
+
+class FileHasher:
+    """Calculates BLAKE3 hashes of local files with a constant memory footprint.
+    Files are either read in chunks of a fixed size or memory-mapped,
+    so the hashed file is never loaded into memory as a whole.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 2**20,
+        use_mmap: bool = False,
+        max_threads: int = 1,
+    ) -> None:
+        """Constructor of FileHasher.
+
+        Args:
+            chunk_size (int, optional): The amount of bytes read and hashed per iteration. Defaults to 2**20.
+            use_mmap (bool, optional): The file is memory-mapped instead of being read in chunks, if set to True. Defaults to False.
+            max_threads (int, optional): The maximum amount of threads used by blake3, `blake3.AUTO` uses all available cores. Defaults to 1.
+
+        Raises:
+            ValueError: If chunk_size is not positive.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size has to be positive.")
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+        self.max_threads = max_threads
+
+    def hash_file(self, local_path: Path) -> str:
+        """Calculates the BLAKE3 hash of the file at local_path.
+
+        Args:
+            local_path (Path): The path of the file to be hashed.
+
+        Returns:
+            str: Hexadecimal representation of the hash.
+        """
+        hasher = self.create_hasher()
+        with open(local_path, "rb") as local_file:
+            if self.use_mmap and os.fstat(local_file.fileno()).st_size > 0:
+                with mmap.mmap(
+                    local_file.fileno(), 0, access=mmap.ACCESS_READ
+                ) as mapped_file:
+                    hasher.update(mapped_file)
+            else:
+                buffer = bytearray(self.chunk_size)
+                view = memoryview(buffer)
+                while read_size := local_file.readinto(buffer):
+                    hasher.update(view[:read_size])
+        return hasher.hexdigest()
+
+    def create_hasher(self) -> blake3:
+        """Creates an empty blake3 hasher that respects the configured thread limit.
+        Can be used to hash data incrementally, e.g. while it is streamed.
+
+        Returns:
+            blake3: An empty blake3 hasher.
+        """
+        return blake3(max_threads=self.max_threads)
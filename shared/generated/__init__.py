@@ -69,6 +69,22 @@ class ListOfStrings(betterproto.Message):
     values: List[str] = betterproto.string_field(1)
 
 
+@dataclass(eq=False, repr=False)
+class MaterialHashesPageRequest(betterproto.Message):
+    after: Optional[str] = betterproto.string_field(1, optional=True, group="_after")
+    page_size: Optional[int] = betterproto.uint32_field(
+        2, optional=True, group="_page_size"
+    )
+
+
+@dataclass(eq=False, repr=False)
+class MaterialNames(betterproto.Message):
+    names: Dict[str, str] = betterproto.map_field(
+        1, betterproto.TYPE_STRING, betterproto.TYPE_STRING
+    )
+    missing_hashes: List[str] = betterproto.string_field(2)
+
+
 @dataclass(eq=False, repr=False)
 class MaterialUploadData(betterproto.Message):
     metadata: "Metadata" = betterproto.message_field(1, group="material_upload_data")
@@ -79,6 +95,48 @@ class MaterialUploadData(betterproto.Message):
 class Metadata(betterproto.Message):
     mimetype: str = betterproto.string_field(1)
     name: str = betterproto.string_field(3)
+    upload_id: Optional[str] = betterproto.string_field(
+        4, optional=True, group="_upload_id"
+    )
+    offset: Optional[int] = betterproto.uint64_field(5, optional=True, group="_offset")
+    compression: Optional[str] = betterproto.string_field(
+        6, optional=True, group="_compression"
+    )
+
+
+@dataclass(eq=False, repr=False)
+class MaterialRequest(betterproto.Message):
+    hash: str = betterproto.string_field(1)
+    offset: Optional[int] = betterproto.uint64_field(2, optional=True, group="_offset")
+    length: Optional[int] = betterproto.uint64_field(3, optional=True, group="_length")
+    accepted_compressions: List[str] = betterproto.string_field(4)
+    page_filter: Optional["PageFilter"] = betterproto.message_field(
+        5, optional=True, group="_page_filter"
+    )
+
+
+@dataclass(eq=False, repr=False)
+class UploadOffset(betterproto.Message):
+    offset: int = betterproto.uint64_field(1)
+
+
+@dataclass(eq=False, repr=False)
+class ChunkManifest(betterproto.Message):
+    hash: str = betterproto.string_field(1)
+    chunk_hashes: List[str] = betterproto.string_field(2)
+    chunk_sizes: List[int] = betterproto.uint32_field(3)
+    mimetype: str = betterproto.string_field(4)
+
+
+@dataclass(eq=False, repr=False)
+class ChunkRequest(betterproto.Message):
+    chunk_hashes: List[str] = betterproto.string_field(1)
+
+
+@dataclass(eq=False, repr=False)
+class ChunkData(betterproto.Message):
+    hash: str = betterproto.string_field(1)
+    data: bytes = betterproto.bytes_field(2)
 
 
 @dataclass(eq=False, repr=False)
@@ -267,6 +325,47 @@ class PipelineStatus(betterproto.Message):
         1, optional=True, group="_result"
     )
     batch_status: List["BatchStatus"] = betterproto.message_field(2)
+    generation_cache_statistics: Optional["CacheStatistics"] = (
+        betterproto.message_field(
+            3, optional=True, group="_generation_cache_statistics"
+        )
+    )
+    evaluation_cache_statistics: Optional["CacheStatistics"] = (
+        betterproto.message_field(
+            4, optional=True, group="_evaluation_cache_statistics"
+        )
+    )
+
+
+@dataclass(eq=False, repr=False)
+class PipelineStatusUpdate(betterproto.Message):
+    result: Optional["PipelineResult"] = betterproto.message_field(
+        1, optional=True, group="_result"
+    )
+    batch_status_updates: List["BatchStatusUpdate"] = betterproto.message_field(2)
+    batch_count: int = betterproto.uint32_field(3)
+    generation_cache_statistics: Optional["CacheStatistics"] = (
+        betterproto.message_field(
+            4, optional=True, group="_generation_cache_statistics"
+        )
+    )
+    evaluation_cache_statistics: Optional["CacheStatistics"] = (
+        betterproto.message_field(
+            5, optional=True, group="_evaluation_cache_statistics"
+        )
+    )
+
+
+@dataclass(eq=False, repr=False)
+class CacheStatistics(betterproto.Message):
+    hits: int = betterproto.uint64_field(1)
+    misses: int = betterproto.uint64_field(2)
+
+
+@dataclass(eq=False, repr=False)
+class BatchStatusUpdate(betterproto.Message):
+    batch_index: int = betterproto.uint32_field(1)
+    batch_status: "BatchStatus" = betterproto.message_field(2)
 
 
 @dataclass(eq=False, repr=False)
@@ -311,6 +410,24 @@ class PipelineServerStub(betterproto.ServiceStub):
         ):
             yield response
 
+    async def iterate_config_incremental(
+        self,
+        internal_config: "InternalConfig",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> AsyncIterator["PipelineStatusUpdate"]:
+        async for response in self._unary_stream(
+            "/PipelineServer/IterateConfigIncremental",
+            internal_config,
+            PipelineStatusUpdate,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        ):
+            yield response
+
 
 class MaterialServerStub(betterproto.ServiceStub):
     async def upload_material(
@@ -367,6 +484,24 @@ class MaterialServerStub(betterproto.ServiceStub):
             metadata=metadata,
         )
 
+    async def iterate_material_hashes(
+        self,
+        material_hashes_page_request: "MaterialHashesPageRequest",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> AsyncIterator["ListOfStrings"]:
+        async for response in self._unary_stream(
+            "/MaterialServer/IterateMaterialHashes",
+            material_hashes_page_request,
+            ListOfStrings,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        ):
+            yield response
+
     async def get_material_name(
         self,
         string: "String",
@@ -384,6 +519,23 @@ class MaterialServerStub(betterproto.ServiceStub):
             metadata=metadata,
         )
 
+    async def get_material_names(
+        self,
+        list_of_strings: "ListOfStrings",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> "MaterialNames":
+        return await self._unary_unary(
+            "/MaterialServer/GetMaterialNames",
+            list_of_strings,
+            MaterialNames,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        )
+
     async def get_material(
         self,
         string: "String",
@@ -402,6 +554,76 @@ class MaterialServerStub(betterproto.ServiceStub):
         ):
             yield response
 
+    async def get_material_range(
+        self,
+        material_request: "MaterialRequest",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> AsyncIterator["MaterialUploadData"]:
+        async for response in self._unary_stream(
+            "/MaterialServer/GetMaterialRange",
+            material_request,
+            MaterialUploadData,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        ):
+            yield response
+
+    async def get_upload_offset(
+        self,
+        string: "String",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> "UploadOffset":
+        return await self._unary_unary(
+            "/MaterialServer/GetUploadOffset",
+            string,
+            UploadOffset,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        )
+
+    async def get_chunk_manifest(
+        self,
+        string: "String",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> "ChunkManifest":
+        return await self._unary_unary(
+            "/MaterialServer/GetChunkManifest",
+            string,
+            ChunkManifest,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        )
+
+    async def get_chunks(
+        self,
+        chunk_request: "ChunkRequest",
+        *,
+        timeout: Optional[float] = None,
+        deadline: Optional["Deadline"] = None,
+        metadata: Optional["MetadataLike"] = None
+    ) -> AsyncIterator["ChunkData"]:
+        async for response in self._unary_stream(
+            "/MaterialServer/GetChunks",
+            chunk_request,
+            ChunkData,
+            timeout=timeout,
+            deadline=deadline,
+            metadata=metadata,
+        ):
+            yield response
+
 
 class PipelineServerBase(ServiceBase):
     async def iterate_config(
@@ -410,6 +632,12 @@ class PipelineServerBase(ServiceBase):
         raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
         yield PipelineStatus()
 
+    async def iterate_config_incremental(
+        self, internal_config: "InternalConfig"
+    ) -> AsyncIterator["PipelineStatusUpdate"]:
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+        yield PipelineStatusUpdate()
+
     async def __rpc_iterate_config(
         self, stream: "grpclib.server.Stream[InternalConfig, PipelineStatus]"
     ) -> None:
@@ -420,6 +648,16 @@ class PipelineServerBase(ServiceBase):
             request,
         )
 
+    async def __rpc_iterate_config_incremental(
+        self, stream: "grpclib.server.Stream[InternalConfig, PipelineStatusUpdate]"
+    ) -> None:
+        request = await stream.recv_message()
+        await self._call_rpc_handler_server_stream(
+            self.iterate_config_incremental,
+            stream,
+            request,
+        )
+
     def __mapping__(self) -> Dict[str, grpclib.const.Handler]:
         return {
             "/PipelineServer/IterateConfig": grpclib.const.Handler(
@@ -428,6 +666,12 @@ class PipelineServerBase(ServiceBase):
                 InternalConfig,
                 PipelineStatus,
             ),
+            "/PipelineServer/IterateConfigIncremental": grpclib.const.Handler(
+                self.__rpc_iterate_config_incremental,
+                grpclib.const.Cardinality.UNARY_STREAM,
+                InternalConfig,
+                PipelineStatusUpdate,
+            ),
         }
 
 
@@ -443,15 +687,44 @@ class MaterialServerBase(ServiceBase):
     async def get_material_hashes(self, empty: "Empty") -> "ListOfStrings":
         raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
 
+    async def iterate_material_hashes(
+        self, material_hashes_page_request: "MaterialHashesPageRequest"
+    ) -> AsyncIterator["ListOfStrings"]:
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+        yield ListOfStrings()
+
     async def get_material_name(self, string: "String") -> "String":
         raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
 
+    async def get_material_names(
+        self, list_of_strings: "ListOfStrings"
+    ) -> "MaterialNames":
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+
     async def get_material(
         self, string: "String"
     ) -> AsyncIterator["MaterialUploadData"]:
         raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
         yield MaterialUploadData()
 
+    async def get_material_range(
+        self, material_request: "MaterialRequest"
+    ) -> AsyncIterator["MaterialUploadData"]:
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+        yield MaterialUploadData()
+
+    async def get_upload_offset(self, string: "String") -> "UploadOffset":
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+
+    async def get_chunk_manifest(self, string: "String") -> "ChunkManifest":
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+
+    async def get_chunks(
+        self, chunk_request: "ChunkRequest"
+    ) -> AsyncIterator["ChunkData"]:
+        raise grpclib.GRPCError(grpclib.const.Status.UNIMPLEMENTED)
+        yield ChunkData()
+
     async def __rpc_upload_material(
         self, stream: "grpclib.server.Stream[MaterialUploadData, Empty]"
     ) -> None:
@@ -473,6 +746,16 @@ class MaterialServerBase(ServiceBase):
         response = await self.get_material_hashes(request)
         await stream.send_message(response)
 
+    async def __rpc_iterate_material_hashes(
+        self, stream: "grpclib.server.Stream[MaterialHashesPageRequest, ListOfStrings]"
+    ) -> None:
+        request = await stream.recv_message()
+        await self._call_rpc_handler_server_stream(
+            self.iterate_material_hashes,
+            stream,
+            request,
+        )
+
     async def __rpc_get_material_name(
         self, stream: "grpclib.server.Stream[String, String]"
     ) -> None:
@@ -480,6 +763,13 @@ class MaterialServerBase(ServiceBase):
         response = await self.get_material_name(request)
         await stream.send_message(response)
 
+    async def __rpc_get_material_names(
+        self, stream: "grpclib.server.Stream[ListOfStrings, MaterialNames]"
+    ) -> None:
+        request = await stream.recv_message()
+        response = await self.get_material_names(request)
+        await stream.send_message(response)
+
     async def __rpc_get_material(
         self, stream: "grpclib.server.Stream[String, MaterialUploadData]"
     ) -> None:
@@ -490,6 +780,40 @@ class MaterialServerBase(ServiceBase):
             request,
         )
 
+    async def __rpc_get_material_range(
+        self, stream: "grpclib.server.Stream[MaterialRequest, MaterialUploadData]"
+    ) -> None:
+        request = await stream.recv_message()
+        await self._call_rpc_handler_server_stream(
+            self.get_material_range,
+            stream,
+            request,
+        )
+
+    async def __rpc_get_upload_offset(
+        self, stream: "grpclib.server.Stream[String, UploadOffset]"
+    ) -> None:
+        request = await stream.recv_message()
+        response = await self.get_upload_offset(request)
+        await stream.send_message(response)
+
+    async def __rpc_get_chunk_manifest(
+        self, stream: "grpclib.server.Stream[String, ChunkManifest]"
+    ) -> None:
+        request = await stream.recv_message()
+        response = await self.get_chunk_manifest(request)
+        await stream.send_message(response)
+
+    async def __rpc_get_chunks(
+        self, stream: "grpclib.server.Stream[ChunkRequest, ChunkData]"
+    ) -> None:
+        request = await stream.recv_message()
+        await self._call_rpc_handler_server_stream(
+            self.get_chunks,
+            stream,
+            request,
+        )
+
     def __mapping__(self) -> Dict[str, grpclib.const.Handler]:
         return {
             "/MaterialServer/UploadMaterial": grpclib.const.Handler(
@@ -510,16 +834,52 @@ class MaterialServerBase(ServiceBase):
                 Empty,
                 ListOfStrings,
             ),
+            "/MaterialServer/IterateMaterialHashes": grpclib.const.Handler(
+                self.__rpc_iterate_material_hashes,
+                grpclib.const.Cardinality.UNARY_STREAM,
+                MaterialHashesPageRequest,
+                ListOfStrings,
+            ),
             "/MaterialServer/GetMaterialName": grpclib.const.Handler(
                 self.__rpc_get_material_name,
                 grpclib.const.Cardinality.UNARY_UNARY,
                 String,
                 String,
             ),
+            "/MaterialServer/GetMaterialNames": grpclib.const.Handler(
+                self.__rpc_get_material_names,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                ListOfStrings,
+                MaterialNames,
+            ),
             "/MaterialServer/GetMaterial": grpclib.const.Handler(
                 self.__rpc_get_material,
                 grpclib.const.Cardinality.UNARY_STREAM,
                 String,
                 MaterialUploadData,
             ),
+            "/MaterialServer/GetMaterialRange": grpclib.const.Handler(
+                self.__rpc_get_material_range,
+                grpclib.const.Cardinality.UNARY_STREAM,
+                MaterialRequest,
+                MaterialUploadData,
+            ),
+            "/MaterialServer/GetUploadOffset": grpclib.const.Handler(
+                self.__rpc_get_upload_offset,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                String,
+                UploadOffset,
+            ),
+            "/MaterialServer/GetChunkManifest": grpclib.const.Handler(
+                self.__rpc_get_chunk_manifest,
+                grpclib.const.Cardinality.UNARY_UNARY,
+                String,
+                ChunkManifest,
+            ),
+            "/MaterialServer/GetChunks": grpclib.const.Handler(
+                self.__rpc_get_chunks,
+                grpclib.const.Cardinality.UNARY_STREAM,
+                ChunkRequest,
+                ChunkData,
+            ),
         }
@@ -0,0 +1,225 @@
+import os
+import socket
+from pathlib import Path
+from typing import Any, Optional
+
+from pymongo import MongoClient
+from evalquiz_proto.shared.file_hasher import FileHasher
+from evalquiz_proto.shared.lru_cache import LRUCache
+
+FileKey = tuple[int, int]
+"""Device and inode of a file."""
+
+FileVersion = tuple[int, int]
+"""Size and modification time in nanoseconds of a file."""
+
+
+class HashCache:
+    """Caches file hashes keyed on file identity, so unchanged files are not rehashed.
+
+    The file identity consists of device, inode, size and modification time in nanoseconds.
+    Entries are stored per (device, inode) together with the (size, mtime_ns) they were calculated for.
+    Invalidation and eviction rules:
+        - An entry is only used, if size and mtime_ns of the file still match the stored values.
+          Otherwise the entry is removed and the file is rehashed.
+        - A hash is only stored, if the file identity did not change while the file was hashed.
+        - Renaming a file keeps device, inode and mtime_ns, so renamed files are not rehashed.
+        - Files that are modified without changing size and mtime_ns, e.g. by resetting mtime with `os.utime`,
+          are not detected. Such files have to be invalidated explicitly with `invalidate(...)`.
+        - The in-memory cache holds at most max_entries entries and evicts the least recently used entry first.
+    """
+
+    def __init__(self, max_entries: int = 10**5) -> None:
+        """Constructor of HashCache.
+
+        Args:
+            max_entries (int, optional): The maximum amount of entries held in memory. Defaults to 10**5.
+        """
+        self._entries: LRUCache[FileKey, tuple[FileVersion, str]] = LRUCache(
+            max_entries
+        )
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_file_identity(local_path: Path) -> tuple[FileKey, FileVersion]:
+        """Retrieves the identity of a file from the filesystem.
+
+        Args:
+            local_path (Path): The path of the file.
+
+        Returns:
+            tuple[FileKey, FileVersion]: (device, inode) at the first index and (size, mtime_ns) at the second index.
+        """
+        stat_result = os.stat(local_path)
+        return (
+            (stat_result.st_dev, stat_result.st_ino),
+            (stat_result.st_size, stat_result.st_mtime_ns),
+        )
+
+    def get_hash(self, local_path: Path, file_hasher: FileHasher) -> str:
+        """Retrieves the hash of a file from cache or calculates and caches it on a miss.
+
+        Args:
+            local_path (Path): The path of the file.
+            file_hasher (FileHasher): Used to calculate the hash on a cache miss.
+
+        Returns:
+            str: Hexadecimal representation of the hash.
+        """
+        file_key, file_version = self.get_file_identity(local_path)
+        cached_hash = self._lookup(file_key, file_version)
+        if cached_hash is not None:
+            self.hits += 1
+            return cached_hash
+        self.misses += 1
+        hash = file_hasher.hash_file(local_path)
+        if self.get_file_identity(local_path) == (file_key, file_version):
+            self._entries.put(file_key, (file_version, hash))
+            self._store(file_key, file_version, hash)
+        return hash
+
+    def add(self, local_path: Path, hash: str) -> None:
+        """Adds the hash of a file that has been calculated elsewhere, e.g. while the file was written.
+        The caller is responsible for hash matching the current file contents.
+
+        Args:
+            local_path (Path): The path of the file.
+            hash (str): Hexadecimal representation of the hash.
+        """
+        file_key, file_version = self.get_file_identity(local_path)
+        self._entries.put(file_key, (file_version, hash))
+        self._store(file_key, file_version, hash)
+
+    def _lookup(self, file_key: FileKey, file_version: FileVersion) -> Optional[str]:
+        """Looks up a hash and removes the entry if it does not match file_version.
+
+        Args:
+            file_key (FileKey): Device and inode of the file.
+            file_version (FileVersion): Current size and mtime_ns of the file.
+
+        Returns:
+            Optional[str]: The cached hash or None, if no valid entry exists.
+        """
+        entry = self._entries.get(file_key)
+        if entry is None:
+            entry = self._load(file_key)
+            if entry is not None:
+                self._entries.put(file_key, entry)
+        if entry is None:
+            return None
+        cached_file_version, cached_hash = entry
+        if cached_file_version != file_version:
+            self._entries.pop(file_key)
+            self._delete(file_key)
+            return None
+        return cached_hash
+
+    def invalidate(self, local_path: Path) -> None:
+        """Removes the entry of a file, the file is rehashed on the next lookup.
+
+        Args:
+            local_path (Path): The path of the file.
+        """
+        file_key, _ = self.get_file_identity(local_path)
+        self._entries.pop(file_key)
+        self._delete(file_key)
+
+    def clear(self) -> None:
+        """Removes all entries."""
+        self._entries.clear()
+
+    def _load(self, file_key: FileKey) -> Optional[tuple[FileVersion, str]]:
+        """Loads an entry from persistent storage, the in-memory cache has no persistent storage.
+
+        Args:
+            file_key (FileKey): Device and inode of the file.
+
+        Returns:
+            Optional[tuple[FileVersion, str]]: The stored entry or None.
+        """
+        return None
+
+    def _store(self, file_key: FileKey, file_version: FileVersion, hash: str) -> None:
+        """Writes an entry to persistent storage, the in-memory cache has no persistent storage.
+
+        Args:
+            file_key (FileKey): Device and inode of the file.
+            file_version (FileVersion): Size and mtime_ns of the file.
+            hash (str): The calculated hash.
+        """
+
+    def _delete(self, file_key: FileKey) -> None:
+        """Removes an entry from persistent storage, the in-memory cache has no persistent storage.
+
+        Args:
+            file_key (FileKey): Device and inode of the file.
+        """
+
+
+class MongoDBHashCache(HashCache):
+    """A HashCache that persists its entries in the `file_hashes` collection,
+    next to the `local_paths` collection of PathDictionaryController.
+    Entries survive restarts and are shared between processes on the same host.
+    Device and inode numbers are only unique per host, so entries are keyed on namespace, device and inode
+    and every host sharing the database has to use a distinct namespace.
+    Invalidation rules of HashCache apply, stale entries are overwritten or removed on lookup.
+    """
+
+    def __init__(
+        self,
+        mongodb_client: MongoClient[dict[str, Any]],
+        mongodb_database: str = "local_path_db",
+        max_entries: int = 10**5,
+        namespace: Optional[str] = None,
+    ) -> None:
+        """Constructor of MongoDBHashCache.
+
+        Args:
+            mongodb_client (MongoClient[dict[str, Any]]): A pymongo client to enable communication with a MongoDB server.
+            mongodb_database (str, optional): The database that all operations are performed on. Defaults to "local_path_db".
+            max_entries (int, optional): The maximum amount of entries held in memory. Defaults to 10**5.
+            namespace (Optional[str], optional): Identifies the host or filesystem the device and inode numbers belong to.
+                Defaults to None, which uses the hostname.
+        """
+        super().__init__(max_entries)
+        self.file_hashes = mongodb_client[mongodb_database].file_hashes
+        self.namespace = namespace if namespace is not None else socket.gethostname()
+
+    def _document_id(self, file_key: FileKey) -> str:
+        device, inode = file_key
+        return f"{self.namespace}:{device}:{inode}"
+
+    def _load(self, file_key: FileKey) -> Optional[tuple[FileVersion, str]]:
+        mongodb_document = self.file_hashes.find_one(
+            {"_id": self._document_id(file_key)}
+        )
+        if mongodb_document is None:
+            return None
+        return (
+            (mongodb_document["size"], mongodb_document["mtime_ns"]),
+            mongodb_document["hash"],
+        )
+
+    def _store(self, file_key: FileKey, file_version: FileVersion, hash: str) -> None:
+        size, mtime_ns = file_version
+        self.file_hashes.update_one(
+            {"_id": self._document_id(file_key)},
+            {
+                "$set": {
+                    "namespace": self.namespace,
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                    "hash": hash,
+                }
+            },
+            upsert=True,
+        )
+
+    def _delete(self, file_key: FileKey) -> None:
+        self.file_hashes.delete_one({"_id": self._document_id(file_key)})
+
+    def clear(self) -> None:
+        """Removes all entries from memory and the entries of namespace from MongoDB."""
+        super().clear()
+        self.file_hashes.delete_many({"namespace": self.namespace})
@@ -2,26 +2,44 @@ from __future__ import annotations
 from dataclasses import dataclass
 import os
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, ClassVar, Optional
 
 import jsonpickle
-from evalquiz_proto.shared.generated import LectureMaterial
-from blake3 import blake3
+from evalquiz_proto.shared.generated import LectureMaterial, PageFilter
 from evalquiz_proto.shared.exceptions import (
     MimetypeNotDetectedException,
 )
+from evalquiz_proto.shared.file_hasher import FileHasher
+from evalquiz_proto.shared.hash_cache import HashCache
 from evalquiz_proto.shared.mimetype_resolver import MimetypeResolver
 
+MONGODB_DOCUMENT_SCHEMA_VERSION = 2
+"""Version of the document schema written by `InternalLectureMaterial.to_mongodb_document()`.
+Version 1 documents have no `schema_version` field and store the jsonpickle-encoded object."""
+
 
 @dataclass(init=False)
 class InternalLectureMaterial(LectureMaterial):
     """A lecture material with an additional local path pointing to the file."""
 
     local_path: Path = Path("")
+    file_hasher: ClassVar[FileHasher] = FileHasher()
+    hash_cache: ClassVar[Optional[HashCache]] = None
 
     def __init__(self, local_path: Path, lecture_material: LectureMaterial):
         """Constructor of InternalLectureMaterial.
 
+        Args:
+            local_path (Path): The local path that the binary is located at.
+            lecture_material (LectureMaterial): Metadata in form of the LectureMaterial datatype.
+        """
+        self._set_fields(local_path, lecture_material)
+        self.update_mimetype()
+        self.update_hash()
+
+    def _set_fields(self, local_path: Path, lecture_material: LectureMaterial) -> None:
+        """Copies local_path and all fields of lecture_material to self, without inspecting the file.
+
         Args:
             local_path (Path): The local path that the binary is located at.
             lecture_material (LectureMaterial): Metadata in form of the LectureMaterial datatype.
@@ -32,8 +50,6 @@ class InternalLectureMaterial(LectureMaterial):
         self.hash = lecture_material.hash
         self.file_type = lecture_material.file_type
         self.page_filter = lecture_material.page_filter
-        self.update_mimetype()
-        self.update_hash()
 
     def update_hash(self, rename_file: bool = False) -> None:
         """Updates LectureMaterial hash with file contents.
@@ -41,9 +57,7 @@ class InternalLectureMaterial(LectureMaterial):
         Args:
             rename_file (bool, optional): Filename of referenced file is changed to the updated hash, if set to True. Defaults to False.
         """
-        with open(self.local_path, "rb") as local_file:
-            file_content = local_file.read()
-            hash = blake3(file_content).hexdigest()
+        hash = self._calculate_hash()
         if hash != self.hash:
             self.hash = hash
             self._update_mimetype()
@@ -72,9 +86,17 @@ class InternalLectureMaterial(LectureMaterial):
         """
         if other_hash is None:
             other_hash = self.hash
-        with open(self.local_path, "rb") as local_file:
-            file_content = local_file.read()
-            return other_hash == blake3(file_content).hexdigest()
+        return other_hash == self._calculate_hash()
+
+    def _calculate_hash(self) -> str:
+        """Calculates the hash of the file at local_path, hash_cache is consulted first if it is set.
+
+        Returns:
+            str: Hexadecimal representation of the hash.
+        """
+        if self.hash_cache is not None:
+            return self.hash_cache.get_hash(self.local_path, self.file_hasher)
+        return self.file_hasher.hash_file(self.local_path)
 
     def cast_to_lecture_material(self) -> LectureMaterial:
         """Casts self object to object of superclass: LectureMaterial.
@@ -90,11 +112,12 @@ class InternalLectureMaterial(LectureMaterial):
     def update_mimetype(self) -> None:
         """Evaluates if given mimetype matches mimetype of file at local_path.
         Sets mimetype to new value, if mimetype does not match mimetype of file at local_path.
+        The mimetype is detected from the file contents first, so files with a missing or wrong suffix are supported.
 
         Raises:
             MimetypeNotDetectedException
         """
-        type = MimetypeResolver.fixed_guess_type(self.local_path.suffix)
+        type = MimetypeResolver.guess_file_type(self.local_path)
         if type is None:
             raise MimetypeNotDetectedException()
         if type != self.file_type:
@@ -102,23 +125,55 @@ class InternalLectureMaterial(LectureMaterial):
 
     def _update_mimetype(self) -> None:
         """Updates mimetype to match the mimetype of file at local_path."""
-        type = MimetypeResolver.fixed_guess_type(self.local_path.suffix)
+        type = MimetypeResolver.guess_file_type(self.local_path)
         if type is not None:
             self.file_type = type
 
     def to_mongodb_document(self) -> dict[str, Any]:
         """Encodes self to a representation that can be inserted by pymongo.
+        All fields are stored as native BSON values, so they can be queried and indexed.
 
         Returns:
-            dict[str, Any]: Dictionary containing hash and serialized self.
+            dict[str, Any]: Dictionary containing hash and the fields of self.
         """
-        return {"_id": self.hash, "internal_lecture_material": jsonpickle.encode(self)}
+        return {
+            "_id": self.hash,
+            "reference": self.reference,
+            "url": self.url,
+            "file_type": self.file_type,
+            "page_filter": (
+                None
+                if self.page_filter is None
+                else {
+                    "lower_bound": self.page_filter.lower_bound,
+                    "upper_bound": self.page_filter.upper_bound,
+                }
+            ),
+            "local_path": str(self.local_path),
+            "schema_version": MONGODB_DOCUMENT_SCHEMA_VERSION,
+        }
 
     @classmethod
     def from_mongodb_document(cls, document: dict[str, Any]) -> InternalLectureMaterial:
         """Constructor of self from pymongo representation.
+        The file at local_path is not inspected, hash and mimetype are taken from the document.
+        Documents that have been encoded with jsonpickle are supported as well.
 
         Args:
-            document (dict[str, Any]): Dictionary containing hash and serialized self.
+            document (dict[str, Any]): Dictionary containing hash and the fields of self.
         """
-        return jsonpickle.decode(document["internal_lecture_material"])
+        if "schema_version" not in document:
+            return jsonpickle.decode(document["internal_lecture_material"])
+        page_filter = document["page_filter"]
+        internal_lecture_material = cls.__new__(cls)
+        internal_lecture_material._set_fields(
+            Path(document["local_path"]),
+            LectureMaterial(
+                reference=document["reference"],
+                url=document["url"],
+                hash=document["_id"],
+                file_type=document["file_type"],
+                page_filter=None if page_filter is None else PageFilter(**page_filter),
+            ),
+        )
+        return internal_lecture_material
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """A thread-safe, size-bounded mapping that evicts the least recently used entry first.
+    Hits and misses of `get(...)` are counted to make the cache efficiency observable.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        """Constructor of LRUCache.
+
+        Args:
+            max_size (int, optional): The maximum amount of entries before the least recently used entry is evicted. Defaults to 1024.
+
+        Raises:
+            ValueError: If max_size is not positive.
+        """
+        if max_size <= 0:
+            raise ValueError("max_size has to be positive.")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        """Retrieves an entry and marks it as most recently used.
+
+        Args:
+            key (K): Key of the entry.
+
+        Returns:
+            Optional[V]: The cached value or None, if no entry exists for key.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: K, value: V) -> None:
+        """Adds or replaces an entry and evicts the least recently used entry if max_size is exceeded.
+
+        Args:
+            key (K): Key of the entry.
+            value (V): Value of the entry.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Removes an entry, if it exists.
+
+        Args:
+            key (K): Key of the entry.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes all entries, hit and miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
@@ -0,0 +1,294 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from evalquiz_proto.shared.async_path_dictionary_controller import (
+    AsyncPathDictionaryController,
+)
+from evalquiz_proto.shared.channel_pool import ChannelPool
+from evalquiz_proto.shared.exceptions import LectureMaterialNotFoundOnRemotesException
+from evalquiz_proto.shared.generated import (
+    LectureMaterial,
+    MaterialRequest,
+    MaterialServerStub,
+)
+from evalquiz_proto.shared.material_stream import read_material_upload_stream
+from evalquiz_proto.shared.path_dictionary_controller import PathDictionaryController
+
+DEFAULT_HEDGE_DELAY = 0.1
+"""Seconds to wait for the first message of a remote before the next remote is requested."""
+
+
+class HedgedMaterialFetcher:
+    """Fetches lecture materials from the remotes of `InternalConfig.material_server_urls` with hedged requests.
+
+    Remotes are requested in order of their latency, measured as exponentially weighted moving average (EWMA)
+    of the time until the first message of a stream arrives. Remotes without measurements are requested first,
+    in the given order. Remotes that failed the last health check of channel_pool are requested last,
+    as they might have recovered since.
+    The fastest remote is requested first. Whenever it does not respond within hedge_delay, or a request fails,
+    the next remote is requested, with at most fan_out requests in flight.
+    The first remote that answers with a message wins and all other requests are cancelled.
+    The stream of the winner is written to a content-addressed file of path_dictionary_controller while it is hashed,
+    and only committed if it matches `LectureMaterial.hash`, so materials are never held in memory as a whole.
+    If it fails or does not match, the remaining remotes are requested, including the cancelled ones.
+    """
+
+    def __init__(
+        self,
+        stub_factory: Callable[[str], MaterialServerStub],
+        path_dictionary_controller: Union[
+            PathDictionaryController, AsyncPathDictionaryController
+        ],
+        directory: Path,
+        fan_out: int = 2,
+        hedge_delay: float = DEFAULT_HEDGE_DELAY,
+        timeout: Optional[float] = None,
+        latency_weight: float = 0.2,
+        failure_latency: float = 10.0,
+        accepted_compressions: Optional[list[str]] = None,
+        channel_pool: Optional[ChannelPool] = None,
+    ) -> None:
+        """Constructor of HedgedMaterialFetcher.
+
+        Args:
+            stub_factory (Callable[[str], MaterialServerStub]): Creates a stub for a remote url.
+            path_dictionary_controller (Union[PathDictionaryController, AsyncPathDictionaryController]): Stores fetched materials.
+            directory (Path): The system path to the directory where fetched materials are created.
+            fan_out (int, optional): The maximum amount of requests in flight. Defaults to 2.
+            hedge_delay (float, optional): Seconds to wait for the first message of a remote before the next remote is requested. Defaults to DEFAULT_HEDGE_DELAY.
+            timeout (Optional[float], optional): Timeout of a single request in seconds. Defaults to None.
+            latency_weight (float, optional): Weight of a new measurement in the latency EWMA. Defaults to 0.2.
+            failure_latency (float, optional): Latency in seconds recorded for a failed request. Defaults to 10.0.
+            accepted_compressions (Optional[list[str]], optional): Compression codecs offered to remotes, in order of preference, e.g. ["zstd"]. Defaults to no compression.
+            channel_pool (Optional[ChannelPool], optional): Unhealthy remotes of channel_pool are requested last, e.g. the pool of stub_factory. Defaults to None.
+
+        Raises:
+            ValueError: If fan_out is not positive, hedge_delay is negative or latency_weight is not in (0, 1].
+        """
+        if fan_out <= 0:
+            raise ValueError("fan_out has to be positive.")
+        if hedge_delay < 0:
+            raise ValueError("hedge_delay must not be negative.")
+        if not 0 < latency_weight <= 1:
+            raise ValueError("latency_weight has to be in (0, 1].")
+        self.stub_factory = stub_factory
+        self.path_dictionary_controller = path_dictionary_controller
+        self.directory = directory
+        self.fan_out = fan_out
+        self.hedge_delay = hedge_delay
+        self.timeout = timeout
+        self.latency_weight = latency_weight
+        self.failure_latency = failure_latency
+        self.accepted_compressions = (
+            [] if accepted_compressions is None else accepted_compressions
+        )
+        self.channel_pool = channel_pool
+        self.latencies: dict[str, float] = {}
+
+    def record_latency(self, material_server_url: str, latency: float) -> None:
+        """Updates the latency EWMA of a remote.
+
+        Args:
+            material_server_url (str): Url of the remote.
+            latency (float): The measured latency in seconds.
+        """
+        previous_latency = self.latencies.get(material_server_url)
+        if previous_latency is None:
+            self.latencies[material_server_url] = latency
+        else:
+            self.latencies[material_server_url] = previous_latency + (
+                self.latency_weight * (latency - previous_latency)
+            )
+
+    def order_remotes(self, material_server_urls: list[str]) -> list[str]:
+        """Orders remotes by their latency EWMA, remotes without measurements come first in their given order.
+        Unhealthy remotes of channel_pool come last, ordered the same way.
+
+        Args:
+            material_server_urls (list[str]): Urls of the remotes.
+
+        Returns:
+            list[str]: The ordered urls without duplicates.
+        """
+        channel_pool = self.channel_pool
+        return sorted(
+            dict.fromkeys(material_server_urls),
+            key=lambda material_server_url: (
+                channel_pool is not None
+                and not channel_pool.is_healthy(material_server_url),
+                self.latencies.get(material_server_url, 0.0),
+            ),
+        )
+
+    async def fetch_async(
+        self, lecture_material: LectureMaterial, material_server_urls: list[str]
+    ) -> str:
+        """Fetches a lecture material from the remotes with hedged requests and stores it in path_dictionary_controller.
+
+        Args:
+            lecture_material (LectureMaterial): The requested lecture material, identified by its hash.
+            material_server_urls (list[str]): Urls of the remotes, e.g. `InternalConfig.material_server_urls`.
+
+        Raises:
+            LectureMaterialNotFoundOnRemotesException: If no remote provides contents that match the hash.
+
+        Returns:
+            str: Hash to reference the stored file, see `PathDictionaryController.get_file_path_from_hash(...)`.
+        """
+        material_request = MaterialRequest(
+            hash=lecture_material.hash,
+            accepted_compressions=self.accepted_compressions,
+        )
+        remaining_urls = self.order_remotes(material_server_urls)
+        starts: dict[str, float] = {}
+        attempts: dict[str, tuple[asyncio.Task[str], asyncio.Event]] = {}
+        errors: list[Exception] = []
+        try:
+            while remaining_urls or attempts:
+                if remaining_urls and len(attempts) < self.fan_out:
+                    material_server_url = remaining_urls.pop(0)
+                    opened = asyncio.Event()
+                    starts[material_server_url] = time.monotonic()
+                    attempts[material_server_url] = (
+                        asyncio.create_task(
+                            self._fetch_from_remote(
+                                material_server_url,
+                                lecture_material,
+                                material_request,
+                                opened,
+                            )
+                        ),
+                        opened,
+                    )
+                can_hedge = bool(remaining_urls) and len(attempts) < self.fan_out
+                winner_url = await self._wait_for_winner(
+                    attempts, self.hedge_delay if can_hedge else None
+                )
+                for material_server_url, (task, _) in list(attempts.items()):
+                    error = task.exception() if task.done() else None
+                    if material_server_url != winner_url and isinstance(
+                        error, Exception
+                    ):
+                        del attempts[material_server_url]
+                        errors.append(error)
+                if winner_url is None:
+                    continue
+                winner_task, _ = attempts.pop(winner_url)
+                self._record_losers(attempts, starts, winner_url)
+                remaining_urls[:0] = await self._cancel_attempts(attempts)
+                try:
+                    return await winner_task
+                except Exception as error:
+                    errors.append(error)
+        finally:
+            await self._cancel_attempts(attempts)
+        raise LectureMaterialNotFoundOnRemotesException(
+            f"Lecture material {lecture_material.hash} was not provided by any of {len(dict.fromkeys(material_server_urls))} remotes."
+        ) from (errors[-1] if errors else None)
+
+    async def _fetch_from_remote(
+        self,
+        material_server_url: str,
+        lecture_material: LectureMaterial,
+        material_request: MaterialRequest,
+        opened: asyncio.Event,
+    ) -> str:
+        """Streams a material from a single remote to a content-addressed file, that is committed if it matches its hash.
+        Sets opened, as soon as the first message of the stream arrived.
+
+        Raises:
+            MaterialHashNotValidException: If the received contents do not match the requested hash.
+        """
+        start = time.monotonic()
+        try:
+            stub = self.stub_factory(material_server_url)
+            metadata, binary_iterator = await read_material_upload_stream(
+                stub.get_material_range(material_request, timeout=self.timeout),
+                require_metadata=False,
+            )
+        except Exception:
+            self.record_latency(material_server_url, self.failure_latency)
+            raise
+        self.record_latency(material_server_url, time.monotonic() - start)
+        opened.set()
+        try:
+            return (
+                await self.path_dictionary_controller.add_content_addressed_file_async(
+                    self.directory,
+                    metadata.mimetype or lecture_material.file_type,
+                    binary_iterator,
+                    lecture_material.reference,
+                    material_request.hash,
+                )
+            )
+        except Exception:
+            self.record_latency(material_server_url, self.failure_latency)
+            raise
+
+    def _record_losers(
+        self,
+        attempts: dict[str, tuple[asyncio.Task[str], asyncio.Event]],
+        starts: dict[str, float],
+        winner_url: str,
+    ) -> None:
+        """Records a latency of at least the latency of the winner for attempts that lose before their first message.
+        Their own elapsed time is too short for hedges that started after the winner, and would rank them ahead of it.
+        """
+        now = time.monotonic()
+        winner_latency = now - starts[winner_url]
+        for material_server_url, (_, opened) in attempts.items():
+            if not opened.is_set():
+                self.record_latency(
+                    material_server_url,
+                    max(winner_latency, now - starts[material_server_url]),
+                )
+
+    async def _wait_for_winner(
+        self,
+        attempts: dict[str, tuple[asyncio.Task[str], asyncio.Event]],
+        timeout: Optional[float],
+    ) -> Optional[str]:
+        """Waits until an attempt opened its stream or finished, or until timeout expired.
+
+        Returns:
+            Optional[str]: Url of the first attempt that opened its stream or finished successfully, None otherwise.
+        """
+        opened_waiters = {
+            asyncio.create_task(opened.wait()): material_server_url
+            for material_server_url, (_, opened) in attempts.items()
+        }
+        try:
+            await asyncio.wait(
+                [*opened_waiters, *(task for task, _ in attempts.values())],
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for opened_waiter in opened_waiters:
+                opened_waiter.cancel()
+        for material_server_url, (task, opened) in attempts.items():
+            if opened.is_set() or (
+                task.done() and not task.cancelled() and task.exception() is None
+            ):
+                return material_server_url
+        return None
+
+    async def _cancel_attempts(
+        self,
+        attempts: dict[str, tuple[asyncio.Task[str], asyncio.Event]],
+    ) -> list[str]:
+        """Cancels and removes all attempts and waits for their streams to close.
+
+        Returns:
+            list[str]: Urls of the cancelled attempts.
+        """
+        for task, _ in attempts.values():
+            task.cancel()
+        await asyncio.gather(
+            *(task for task, _ in attempts.values()), return_exceptions=True
+        )
+        cancelled_urls = list(attempts)
+        attempts.clear()
+        return cancelled_urls
@@ -0,0 +1,228 @@
+from concurrent.futures import Executor
+import dataclasses
+from typing import AsyncIterator, Optional, Union
+
+import betterproto
+from evalquiz_proto.shared.async_path_dictionary_controller import (
+    AsyncPathDictionaryController,
+)
+from evalquiz_proto.shared.compression import (
+    DEFAULT_MAX_DECOMPRESSED_SIZE,
+    compress_chunks,
+    decompress_chunks,
+    negotiate_compression,
+)
+from evalquiz_proto.shared.exceptions import (
+    DataChunkNotBytesException,
+    FirstDataChunkNotMetadataException,
+)
+from evalquiz_proto.shared.generated import (
+    MaterialRequest,
+    MaterialServerStub,
+    MaterialUploadData,
+    Metadata,
+)
+from evalquiz_proto.shared.path_dictionary_controller import (
+    DEFAULT_CONTENT_PARTITION_SIZE,
+    PathDictionaryController,
+)
+
+
+async def create_material_upload_stream(
+    metadata: Metadata,
+    binary_iterator: AsyncIterator[bytes],
+    content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
+    level: Optional[int] = None,
+) -> AsyncIterator[MaterialUploadData]:
+    """Creates a material stream that starts with metadata, followed by the chunks of binary_iterator.
+    Chunks are compressed with `metadata.compression`, if it is set.
+
+    Args:
+        metadata (Metadata): The first message of the stream.
+        binary_iterator (AsyncIterator[bytes]): Iterator with uncompressed chunks.
+        content_partition_size (int, optional): The maximum size of a compressed chunk in bytes. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
+        level (Optional[int], optional): Compression level. Defaults to the default level of the codec.
+
+    Raises:
+        CompressionNotSupportedException: If `metadata.compression` is not supported.
+
+    Returns:
+        AsyncIterator[MaterialUploadData]: Iterator with messages of the stream.
+    """
+    if metadata.compression is not None:
+        binary_iterator = compress_chunks(
+            binary_iterator, metadata.compression, content_partition_size, level
+        )
+    yield MaterialUploadData(metadata=metadata)
+    async for chunk in binary_iterator:
+        yield MaterialUploadData(data=chunk)
+
+
+async def read_material_upload_stream(
+    material_upload_data_iterator: AsyncIterator[MaterialUploadData],
+    require_metadata: bool = True,
+    max_size: Optional[int] = DEFAULT_MAX_DECOMPRESSED_SIZE,
+    executor: Optional[Executor] = None,
+) -> tuple[Metadata, AsyncIterator[bytes]]:
+    """Reads the metadata of a material stream and returns an iterator with its uncompressed chunks.
+
+    Args:
+        material_upload_data_iterator (AsyncIterator[MaterialUploadData]): Iterator with messages of the stream.
+        require_metadata (bool, optional): Streams without leading metadata are read as uncompressed, if set to False. Defaults to True.
+        max_size (Optional[int], optional): The maximum size of the decompressed stream in bytes, unbounded if None. Defaults to DEFAULT_MAX_DECOMPRESSED_SIZE.
+        executor (Optional[Executor], optional): Executor of the decompression. Defaults to the default executor of the event loop.
+
+    Raises:
+        FirstDataChunkNotMetadataException: If require_metadata is set and the stream does not start with metadata.
+        DataChunkNotBytesException: If a message after the first one is not bytes.
+        CompressionNotSupportedException: If `metadata.compression` is not supported.
+        CompressedDataNotValidException: If the compressed stream is corrupted, truncated or decompresses to more than max_size bytes.
+
+    Returns:
+        tuple[Metadata, AsyncIterator[bytes]]: A tuple with the metadata at the first index and the asynchronous iterator with uncompressed chunks at the second index.
+    """
+    metadata = Metadata()
+    first_chunks: list[bytes] = []
+    first_material_upload_data = await anext(material_upload_data_iterator, None)
+    if first_material_upload_data is not None:
+        field_name, _ = betterproto.which_one_of(
+            first_material_upload_data, "material_upload_data"
+        )
+        if field_name == "metadata":
+            metadata = first_material_upload_data.metadata
+        elif require_metadata:
+            raise FirstDataChunkNotMetadataException()
+        else:
+            first_chunks.append(first_material_upload_data.data)
+    elif require_metadata:
+        raise FirstDataChunkNotMetadataException()
+
+    async def iterate_data() -> AsyncIterator[bytes]:
+        for first_chunk in first_chunks:
+            yield first_chunk
+        async for material_upload_data in material_upload_data_iterator:
+            field_name, _ = betterproto.which_one_of(
+                material_upload_data, "material_upload_data"
+            )
+            if field_name != "data":
+                raise DataChunkNotBytesException()
+            yield material_upload_data.data
+
+    binary_iterator = iterate_data()
+    if metadata.compression is not None:
+        binary_iterator = decompress_chunks(
+            binary_iterator, metadata.compression, max_size, executor=executor
+        )
+    return (metadata, binary_iterator)
+
+
+async def create_material_download_stream(
+    path_dictionary_controller: Union[
+        PathDictionaryController, AsyncPathDictionaryController
+    ],
+    material_request: MaterialRequest,
+    content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
+    level: Optional[int] = None,
+) -> AsyncIterator[MaterialUploadData]:
+    """Creates the response stream of a `GetMaterialRange` request on the server side.
+    The stream starts with metadata that states mimetype and the compression codec negotiated with `material_request.accepted_compressions`.
+    If `material_request.page_filter` is set, only the selected pages are streamed and offset and length apply within them.
+
+    Args:
+        path_dictionary_controller (Union[PathDictionaryController, AsyncPathDictionaryController]): Provides the local file.
+        material_request (MaterialRequest): Hash, byte range and accepted compression codecs of the request.
+        content_partition_size (int, optional): The maximum size of a chunk in bytes. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
+        level (Optional[int], optional): Compression level. Defaults to the default level of the codec.
+
+    Raises:
+        KeyError: If file is not found under the given hash.
+        PageFilterNotSupportedException: If a page filter is set and the format of the file has no page index.
+        ValueError: If a page filter is set and selects no pages of the file.
+
+    Returns:
+        AsyncIterator[MaterialUploadData]: Iterator with messages of the stream.
+    """
+    if material_request.page_filter is None:
+        (
+            mimetype,
+            binary_iterator,
+        ) = await path_dictionary_controller.get_file_range_from_hash_async(
+            material_request.hash,
+            material_request.offset or 0,
+            material_request.length,
+            content_partition_size,
+        )
+    else:
+        (
+            mimetype,
+            binary_iterator,
+        ) = await path_dictionary_controller.get_page_range_from_hash_async(
+            material_request.hash,
+            material_request.page_filter,
+            material_request.offset or 0,
+            material_request.length,
+            content_partition_size,
+        )
+    compression = negotiate_compression(
+        material_request.accepted_compressions, mimetype
+    )
+    async for material_upload_data in create_material_upload_stream(
+        Metadata(mimetype=mimetype, compression=compression),
+        binary_iterator,
+        content_partition_size,
+        level,
+    ):
+        yield material_upload_data
+
+
+async def upload_material(
+    material_server_stub: MaterialServerStub,
+    metadata: Metadata,
+    binary_iterator: AsyncIterator[bytes],
+    content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
+    level: Optional[int] = None,
+) -> None:
+    """Uploads a material with `MaterialServerStub.upload_material(...)`, compressed with `metadata.compression` if it is set.
+
+    Args:
+        material_server_stub (MaterialServerStub): Stub of the material server.
+        metadata (Metadata): Metadata of the material.
+        binary_iterator (AsyncIterator[bytes]): Iterator with uncompressed chunks.
+        content_partition_size (int, optional): The maximum size of a compressed chunk in bytes. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
+        level (Optional[int], optional): Compression level. Defaults to the default level of the codec.
+    """
+    await material_server_stub.upload_material(
+        create_material_upload_stream(
+            metadata, binary_iterator, content_partition_size, level
+        )
+    )
+
+
+async def get_material(
+    material_server_stub: MaterialServerStub,
+    material_request: MaterialRequest,
+    accepted_compressions: Optional[list[str]] = None,
+    executor: Optional[Executor] = None,
+) -> tuple[Metadata, AsyncIterator[bytes]]:
+    """Downloads a material with `MaterialServerStub.get_material_range(...)` and decompresses it.
+    The decompressed stream is bounded by `material_request.length`, if it is set, and by DEFAULT_MAX_DECOMPRESSED_SIZE otherwise.
+
+    Args:
+        material_server_stub (MaterialServerStub): Stub of the material server.
+        material_request (MaterialRequest): Hash, byte range and pages of the material. It is not modified.
+        accepted_compressions (Optional[list[str]], optional): Compression codecs offered to the server, in order of preference, e.g. ["zstd"]. Defaults to `material_request.accepted_compressions`, which is empty unless set, so that compression is opt-in.
+        executor (Optional[Executor], optional): Executor of the decompression. Defaults to the default executor of the event loop.
+
+    Returns:
+        tuple[Metadata, AsyncIterator[bytes]]: A tuple with the metadata at the first index and the asynchronous iterator with uncompressed chunks at the second index.
+    """
+    if accepted_compressions is not None:
+        material_request = dataclasses.replace(
+            material_request, accepted_compressions=accepted_compressions
+        )
+    return await read_material_upload_stream(
+        material_server_stub.get_material_range(material_request),
+        require_metadata=False,
+        max_size=material_request.length or DEFAULT_MAX_DECOMPRESSED_SIZE,
+        executor=executor,
+    )
@@ -1,4 +1,6 @@
 import mimetypes
+import struct
+import zipfile
 from pathlib import Path
 from typing import Optional
 
@@ -21,14 +23,62 @@ mimetype_reverse_extension_mappings = {
     mimetype: extension for extension, mimetype in mimetype_extension_mappings.items()
 }
 
+magic_number_mappings = {
+    b"%PDF-": "application/pdf",
+    b"{\\rtf": "application/rtf",
+}
+"""Mimetypes of file formats that are identified by the first bytes of a file."""
+
+zip_member_mappings = {
+    "word/": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "ppt/": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "xl/": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+"""Mimetypes of zip based file formats that are identified by a directory of their members."""
+
+ZIP_MIMETYPE = "application/zip"
+ZIP_LOCAL_FILE_HEADER = struct.Struct("<4s2x2H8xI4x2H")
+"""Signature, flags, compression method, compressed size, name length and extra field length of a zip member."""
+ZIP_LOCAL_FILE_HEADER_SIGNATURE = b"PK\x03\x04"
+
+SNIFF_SIZE = 2**13
+"""The maximum amount of bytes read from the start of a file to detect its mimetype."""
+
+MAX_MEMOIZED_LOOKUPS = 2**10
+"""The maximum amount of memoized lookups that are not covered by the precomputed tables."""
+
+
+def _build_suffix_mimetypes() -> dict[str, Optional[str]]:
+    """Precomputes the results of `mimetypes.guess_type` for all suffixes that are registered in the mimetypes library.
+    Suffixes that the mimetypes library rewrites before the lookup are left out and resolved on demand.
+
+    Returns:
+        dict[str, Optional[str]]: Mimetypes by suffix with leading dot.
+    """
+    if not mimetypes.inited:
+        mimetypes.init()
+    suffix_mimetypes: dict[str, Optional[str]] = {}
+    suffix_mimetypes.update(mimetypes.common_types)
+    suffix_mimetypes.update(mimetypes.types_map)
+    for suffix in [*mimetypes.suffix_map, *mimetypes.encodings_map]:
+        suffix_mimetypes.pop(suffix, None)
+    suffix_mimetypes.update(mimetype_extension_mappings)
+    return suffix_mimetypes
+
+
+suffix_mimetypes = _build_suffix_mimetypes()
+memoized_suffix_mimetypes: dict[str, Optional[str]] = {}
+memoized_mimetype_extensions: dict[str, Optional[str]] = {}
+
 
 class MimetypeResolver:
     @staticmethod
     def fixed_guess_type(suffix: str) -> Optional[str]:
         """Fixes the missing markdown type in Python's mimetypes library.
+        Lookups are served from a precomputed table, other suffixes are memoized after their first lookup.
 
         Args:
-            local_path (Path): Path to guess type for.
+            suffix (str): Suffix with leading dot to guess type for.
 
         Returns:
             str: The guessed mime type.
@@ -36,16 +86,20 @@ class MimetypeResolver:
         Raises:
             MimetypeNotDetectedException
         """
-        if suffix in mimetype_extension_mappings:
-            return mimetype_extension_mappings[suffix]
-        else:
-            local_path = Path("test/misc" + suffix)
-            (type, _) = mimetypes.guess_type(local_path, strict=False)
-            return type
+        if suffix in suffix_mimetypes:
+            return suffix_mimetypes[suffix]
+        if suffix in memoized_suffix_mimetypes:
+            return memoized_suffix_mimetypes[suffix]
+        local_path = Path("test/misc" + suffix)
+        (type, _) = mimetypes.guess_type(local_path, strict=False)
+        if len(memoized_suffix_mimetypes) < MAX_MEMOIZED_LOOKUPS:
+            memoized_suffix_mimetypes[suffix] = type
+        return type
 
     @staticmethod
     def fixed_guess_extension(mimetype: str) -> Optional[str]:
         """Fixes the missing markdown type in Python's mimetypes library.
+        Lookups are memoized, so only the first lookup of a mimetype is delegated to the mimetypes library.
 
         Args:
             mimetype (str): Mimetype to guess extension for.
@@ -55,5 +109,113 @@ class MimetypeResolver:
         """
         if mimetype in mimetype_reverse_extension_mappings:
             return mimetype_reverse_extension_mappings[mimetype]
-        else:
-            return mimetypes.guess_extension(mimetype, strict=False)
+        if mimetype in memoized_mimetype_extensions:
+            return memoized_mimetype_extensions[mimetype]
+        extension = mimetypes.guess_extension(mimetype, strict=False)
+        if len(memoized_mimetype_extensions) < MAX_MEMOIZED_LOOKUPS:
+            memoized_mimetype_extensions[mimetype] = extension
+        return extension
+
+    @staticmethod
+    def guess_file_type(local_path: Path) -> Optional[str]:
+        """Guesses the mimetype of a file by its contents and falls back to its suffix.
+        Files with a missing or wrong suffix are detected, if their format is covered by `sniff_type(...)`.
+
+        Args:
+            local_path (Path): Path to guess type for.
+
+        Returns:
+            Optional[str]: The guessed mime type.
+        """
+        suffix_type = MimetypeResolver.fixed_guess_type(local_path.suffix)
+        sniffed_type = MimetypeResolver.sniff_file_type(local_path)
+        if sniffed_type is None or (
+            sniffed_type == ZIP_MIMETYPE and suffix_type is not None
+        ):
+            return suffix_type
+        return sniffed_type
+
+    @staticmethod
+    def sniff_file_type(local_path: Path) -> Optional[str]:
+        """Guesses the mimetype of a file by its first SNIFF_SIZE bytes.
+
+        Args:
+            local_path (Path): Path to guess type for.
+
+        Returns:
+            Optional[str]: The guessed mime type, None if the format is not detected.
+        """
+        with open(local_path, "rb") as local_file:
+            header = local_file.read(SNIFF_SIZE)
+        return MimetypeResolver.sniff_type(header, local_path)
+
+    @staticmethod
+    def sniff_type(header: bytes, local_path: Optional[Path] = None) -> Optional[str]:
+        """Guesses a mimetype by the magic bytes at the start of a file.
+        Zip based formats are told apart by the members listed in header.
+        If these are inconclusive and local_path is given, the central directory of the zip file is read.
+
+        Args:
+            header (bytes): The first bytes of a file.
+            local_path (Optional[Path], optional): Path of the file that header is read from. Defaults to None.
+
+        Returns:
+            Optional[str]: The guessed mime type, None if the format is not detected.
+        """
+        for magic_number, magic_number_type in magic_number_mappings.items():
+            if header.startswith(magic_number):
+                return magic_number_type
+        if not header.startswith(ZIP_LOCAL_FILE_HEADER_SIGNATURE):
+            return None
+        member_names = []
+        offset = 0
+        while offset + ZIP_LOCAL_FILE_HEADER.size <= len(header):
+            (
+                signature,
+                flags,
+                method,
+                compressed_size,
+                name_length,
+                extra_length,
+            ) = ZIP_LOCAL_FILE_HEADER.unpack_from(header, offset)
+            if signature != ZIP_LOCAL_FILE_HEADER_SIGNATURE:
+                break
+            name_start = offset + ZIP_LOCAL_FILE_HEADER.size
+            data_start = name_start + name_length + extra_length
+            member_name = header[name_start : name_start + name_length].decode(
+                "utf-8", "replace"
+            )
+            # EPUB and OpenDocument files start with an uncompressed member that contains their mimetype.
+            if offset == 0 and member_name == "mimetype" and method == 0:
+                member_data = header[data_start : data_start + compressed_size]
+                if b"/" in member_data:
+                    return member_data.decode("ascii", "replace").strip()
+            member_names.append(member_name)
+            if flags & 0x08:
+                # The size of the member follows its data, so the next header cannot be located.
+                break
+            offset = data_start + compressed_size
+        mimetype = MimetypeResolver._guess_zip_type(member_names)
+        if mimetype is None and local_path is not None:
+            try:
+                with zipfile.ZipFile(local_path) as zip_file:
+                    mimetype = MimetypeResolver._guess_zip_type(zip_file.namelist())
+            except zipfile.BadZipFile:
+                pass
+        return ZIP_MIMETYPE if mimetype is None else mimetype
+
+    @staticmethod
+    def _guess_zip_type(member_names: list[str]) -> Optional[str]:
+        """Guesses the mimetype of a zip based format by the names of its members.
+
+        Args:
+            member_names (list[str]): Names of members of the zip file.
+
+        Returns:
+            Optional[str]: The guessed mime type, None if the format is not detected.
+        """
+        for member_name in member_names:
+            for prefix, mimetype in zip_member_mappings.items():
+                if member_name.startswith(prefix):
+                    return mimetype
+        return None
@@ -0,0 +1,170 @@
+import re
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+
+from evalquiz_proto.shared.generated import PageFilter
+
+PAGE_BREAK = b"\f"
+"""Form feed, separates pages of plain text, e.g. text extracted from PDFs with pdftotext."""
+
+MARKDOWN_SLIDE_SEPARATOR = re.compile(rb"---[ \t]*\r?\n?")
+MARKDOWN_CODE_FENCE = re.compile(rb"[ \t]*(```|~~~)")
+TEX_FRAME_START = re.compile(rb"[ \t]*\\begin\{frame\}")
+TEX_PAGE_BREAK = re.compile(rb"[ \t]*\\(newpage|clearpage|pagebreak)\b")
+
+
+DEFAULT_SCAN_BLOCK_SIZE = 2**20
+"""The size of the blocks in bytes, that files are read in while their page index is built."""
+
+
+def iterate_lines(
+    local_file: BinaryIO, block_size: int = DEFAULT_SCAN_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """Reads a file in fixed-size blocks and yields its lines, including line endings.
+    Memory is bounded by block_size and the longest line instead of the file size.
+
+    Args:
+        local_file (BinaryIO): The file, opened in binary mode.
+        block_size (int, optional): The size of the blocks in bytes. Defaults to DEFAULT_SCAN_BLOCK_SIZE.
+
+    Returns:
+        Iterator[bytes]: Iterator with the lines of the file.
+    """
+    pending: list[bytes] = []
+    while block := local_file.read(block_size):
+        start = 0
+        while (end := block.find(b"\n", start)) != -1:
+            pending.append(block[start : end + 1])
+            yield b"".join(pending)
+            pending = []
+            start = end + 1
+        if start < len(block):
+            pending.append(block[start:])
+    if pending:
+        yield b"".join(pending)
+
+
+def _find_page_breaks(line: bytes, offset: int) -> Iterator[int]:
+    """Pages of plain text end with form feeds, yields the offsets after the form feeds of a line that starts at offset."""
+    start = 0
+    while (page_break := line.find(PAGE_BREAK, start)) != -1:
+        start = page_break + len(PAGE_BREAK)
+        yield offset + start
+
+
+def _get_plain_text_page_starts(lines: Iterable[bytes]) -> list[int]:
+    """Pages of plain text end with form feeds."""
+    page_starts: list[int] = []
+    offset = 0
+    for line in lines:
+        page_starts.extend(_find_page_breaks(line, offset))
+        offset += len(line)
+    return page_starts
+
+
+def _get_markdown_page_starts(lines: Iterable[bytes]) -> list[int]:
+    """Slides of markdown decks (Marp, reveal.js, remark) end with a line `---` after a blank line.
+    Front matter at the start of the file, setext headings and code blocks do not separate slides.
+    """
+    page_starts: list[int] = []
+    offset = 0
+    in_code_block = False
+    in_front_matter = False
+    previous_line_blank = True
+    for index, line in enumerate(lines):
+        page_starts.extend(_find_page_breaks(line, offset))
+        offset += len(line)
+        if MARKDOWN_CODE_FENCE.match(line):
+            in_code_block = not in_code_block
+        elif MARKDOWN_SLIDE_SEPARATOR.fullmatch(line) and not in_code_block:
+            if index == 0:
+                in_front_matter = True
+            elif in_front_matter:
+                in_front_matter = False
+            elif previous_line_blank:
+                page_starts.append(offset)
+        previous_line_blank = not line.strip()
+    return sorted(set(page_starts))
+
+
+def _get_tex_page_starts(lines: Iterable[bytes]) -> list[int]:
+    """Beamer frames start with `\\begin{frame}`, the first frame also contains the preamble.
+    Pages of other documents end with `\\newpage`, `\\clearpage` or `\\pagebreak`."""
+    page_starts: list[int] = []
+    offset = 0
+    frame_count = 0
+    for line in lines:
+        if TEX_FRAME_START.match(line):
+            frame_count += 1
+            if frame_count > 1:
+                page_starts.append(offset)
+        page_starts.extend(_find_page_breaks(line, offset))
+        offset += len(line)
+        if TEX_PAGE_BREAK.match(line):
+            page_starts.append(offset)
+    return sorted(set(page_starts))
+
+
+page_start_finders: dict[str, Callable[[Iterable[bytes]], list[int]]] = {
+    "text/plain": _get_plain_text_page_starts,
+    "text/markdown": _get_markdown_page_starts,
+    "text/x-rst": _get_plain_text_page_starts,
+    "application/x-tex": _get_tex_page_starts,
+}
+"""Finds the byte offsets where pages start in a single pass over the lines, by mimetype of text formats whose pages are contiguous byte ranges."""
+
+
+def build_page_offsets(
+    local_path: Path,
+    mimetype: Optional[str],
+    block_size: int = DEFAULT_SCAN_BLOCK_SIZE,
+) -> Optional[list[int]]:
+    """Builds the page index of a text material, reading it in blocks of block_size bytes.
+    Page `i` (1-based) spans the bytes from `page_offsets[i - 1]` to `page_offsets[i]`, the last offset is the file size.
+    The file is read with blocking calls, async callers run it off the event loop, e.g. with `AsyncFileIO.run(...)`.
+
+    Args:
+        local_path (Path): The path of the material.
+        mimetype (Optional[str]): Mimetype of the material.
+        block_size (int, optional): The size of the blocks in bytes. Defaults to DEFAULT_SCAN_BLOCK_SIZE.
+
+    Returns:
+        Optional[list[int]]: Page offsets, None if pages of the mimetype are not contiguous byte ranges.
+    """
+    page_start_finder = page_start_finders.get(mimetype or "")
+    if page_start_finder is None:
+        return None
+    with open(local_path, "rb") as local_file:
+        page_starts = page_start_finder(iterate_lines(local_file, block_size))
+        size = local_file.tell()
+    return [
+        0,
+        *(page_start for page_start in page_starts if 0 < page_start < size),
+        size,
+    ]
+
+
+def get_page_byte_range(
+    page_offsets: list[int], page_filter: PageFilter
+) -> tuple[int, int]:
+    """Resolves a page range to a byte range with a page index.
+    Bounds are 1-based and inclusive, upper_bound is clamped to the amount of pages.
+
+    Args:
+        page_offsets (list[int]): Page index, see `build_page_offsets(...)`.
+        page_filter (PageFilter): The requested pages.
+
+    Raises:
+        ValueError: If lower_bound is smaller than 1, greater than upper_bound or greater than the amount of pages.
+
+    Returns:
+        tuple[int, int]: Offset and length of the byte range.
+    """
+    page_count = len(page_offsets) - 1
+    if not 1 <= page_filter.lower_bound <= min(page_filter.upper_bound, page_count):
+        raise ValueError(
+            f"Pages {page_filter.lower_bound} to {page_filter.upper_bound} are not within 1 to {page_count}."
+        )
+    start = page_offsets[page_filter.lower_bound - 1]
+    end = page_offsets[min(page_filter.upper_bound, page_count)]
+    return (start, end - start)
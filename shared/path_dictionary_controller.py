@@ -1,36 +1,198 @@
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from functools import partial
+import asyncio
+import logging
 import os
 from pathlib import Path
 import shutil
+import tempfile
+from threading import Lock, Thread
+import time
 import jsonpickle
 
-from pymongo import MongoClient
+from blake3 import blake3
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.change_stream import CollectionChangeStream
+from pymongo.errors import BulkWriteError, PyMongoError
 from evalquiz_proto.shared.exceptions import (
+    ChunkDataNotValidException,
     FileOverwriteNotPermittedException,
+    MaterialHashNotValidException,
     MimetypeNotDetectedException,
+    NoMimetypeMappingException,
+    PageFilterNotSupportedException,
+    UploadOffsetNotValidException,
 )
-from typing import Any, AsyncIterator
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, TypeVar
 
+from evalquiz_proto.shared.async_file_io import AsyncFileIO
+from evalquiz_proto.shared.chunk_store import ChunkStore
+from evalquiz_proto.shared.file_hasher import FileHasher
+from evalquiz_proto.shared.generated import MaterialServerStub, PageFilter
+from evalquiz_proto.shared.hash_cache import HashCache
+from evalquiz_proto.shared.lru_cache import LRUCache
 from evalquiz_proto.shared.mimetype_resolver import MimetypeResolver
+from evalquiz_proto.shared.page_index import build_page_offsets, get_page_byte_range
+
+MAX_MESSAGE_SIZE = 4 * 2**20
+"""The default maximum size of a gRPC message in bytes."""
+
+DEFAULT_CONTENT_PARTITION_SIZE = MAX_MESSAGE_SIZE - 2**10
+"""The default maximum size of a streamed packet, leaves room for the MaterialUploadData envelope within MAX_MESSAGE_SIZE."""
+
+LOCAL_PATHS_SCHEMA_VERSION = 2
+"""Version of the local_paths document schema that is written.
+Version 1 documents have no `schema_version` field and store `local_path` as jsonpickle-encoded Path,
+version 2 documents store `local_path` as plain string."""
+
+BULK_BATCH_SIZE = 10**4
+"""The maximum amount of hashes per `$in` query or `bulk_write` call of bulk operations."""
+
+DEFAULT_PAGE_SIZE = 10**4
+"""The default amount of hashes per page of hash listings, a page of hex digests stays well below MAX_MESSAGE_SIZE."""
+
+DEFAULT_MAX_STALENESS = 1.0
+"""The default amount of seconds between checks of the version counter.
+Cache hits within it are served without a MongoDB round trip, modifications by the same instance are visible immediately."""
+
+logger = logging.getLogger(__name__)
+
+
+def _get_file_mode() -> int:
+    """Computes the permissions of newly created files from the umask of the process.
+
+    The umask is read from /proc where available, as os.umask changes it for all threads.
+
+    Returns:
+        int: 0o666 with the bits of the umask cleared.
+    """
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("Umask:"):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except OSError:
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+FILE_MODE = _get_file_mode()
+"""Permissions of uploaded files, tempfile.mkstemp creates owner-only files."""
+
+T = TypeVar("T")
+
+
+@dataclass
+class LocalPathEntry:
+    """Decoded contents of a `local_paths` document.
+    page_offsets is the page index of text materials, see `build_page_offsets(...)`."""
+
+    local_path: Path
+    name: str
+    page_offsets: Optional[list[int]] = None
+
+    @classmethod
+    def from_mongodb_document(cls, document: dict[str, Any]) -> "LocalPathEntry":
+        """Decodes a local_paths document of any schema version.
+
+        Args:
+            document (dict[str, Any]): A local_paths document.
+
+        Returns:
+            LocalPathEntry: The decoded document.
+        """
+        if "schema_version" in document:
+            local_path = Path(document["local_path"])
+        else:
+            local_path = jsonpickle.decode(document["local_path"])
+        return cls(local_path, document["name"], document.get("page_offsets"))
+
+    def to_mongodb_document(self, hash: str) -> dict[str, Any]:
+        """Encodes self into a local_paths document of the current schema version.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Returns:
+            dict[str, Any]: A local_paths document.
+        """
+        return {
+            "_id": hash,
+            "name": self.name,
+            "local_path": str(self.local_path),
+            "page_offsets": self.page_offsets,
+            "schema_version": LOCAL_PATHS_SCHEMA_VERSION,
+        }
 
 
 class PathDictionaryController:
     """The PathDictionaryController manages str aliases to paths for local files.
     Multiple PathDictionaryController instances are able to share their state using MongoDB.
+    Lookups are served from an in-memory LRU cache, which is kept coherent with other instances
+    by a version counter that every modification increments, or by a MongoDB change stream, see `watch_changes()`.
+    Every invalidation increments a local generation, documents read before an invalidation are not cached,
+    so lookups on concurrent threads cannot reinsert stale entries.
     """
 
     def __init__(
         self,
         mongodb_client: MongoClient[dict[str, Any]],
         mongodb_database: str = "local_path_db",
+        hash_cache: Optional[HashCache] = None,
+        file_io: Optional[AsyncFileIO] = None,
+        cache_size: int = 4096,
+        max_staleness: float = DEFAULT_MAX_STALENESS,
+        database_executor: Optional[Executor] = None,
+        chunk_store: Optional[ChunkStore] = None,
     ) -> None:
         """Constructor of InternalMaterialController.
 
         Args:
             mongodb_client (MongoClient[dict[str, Any]]): A pymongo client to enable communication with a MongoDB server.
             mongodb_database: (str): The database that all operations are performed on.
+            hash_cache (Optional[HashCache], optional): Hashes calculated during uploads are added to hash_cache, if set. Defaults to None.
+            file_io (Optional[AsyncFileIO], optional): Carries out file operations of async methods off the event loop. Defaults to a new AsyncFileIO.
+            cache_size (int, optional): The maximum amount of cached local_paths documents. Defaults to 4096.
+            max_staleness (float, optional): The version counter is checked at most once in max_staleness seconds, 0.0 checks it on every lookup. Use `watch_changes()` for immediate invalidation. Defaults to DEFAULT_MAX_STALENESS.
+            database_executor (Optional[Executor], optional): MongoDB operations of async methods are carried out on database_executor, if set. Otherwise they block the event loop. Defaults to None.
+            chunk_store (Optional[ChunkStore], optional): Content-addressed files are additionally stored as deduplicated chunks in chunk_store, if set. Defaults to None.
         """
         self.mongodb_client = mongodb_client
         self.local_paths = mongodb_client[mongodb_database].local_paths
+        self.uploads = mongodb_client[mongodb_database].uploads
+        self.versions = mongodb_client[mongodb_database].versions
+        self.hash_cache = hash_cache
+        self.file_io = file_io if file_io is not None else AsyncFileIO()
+        self.cache: LRUCache[str, LocalPathEntry] = LRUCache(cache_size)
+        self.max_staleness = max_staleness
+        self.database_executor = database_executor
+        self.chunk_store = chunk_store
+        self.file_hasher = FileHasher()
+        self._cached_version: Optional[int] = None
+        self._generation = 0
+        self._cache_lock = Lock()
+        self._version_checked_at = float("-inf")
+        self._change_stream: Optional[CollectionChangeStream[dict[str, Any]]] = None
+
+    async def _run_database_operation(
+        self, function: Callable[..., T], *args: Any
+    ) -> T:
+        """Runs a blocking MongoDB operation from an async method, on database_executor if it is set.
+
+        Args:
+            function (Callable[..., T]): The blocking operation.
+            *args (Any): Positional arguments of function.
+
+        Returns:
+            T: Return value of function.
+        """
+        if self.database_executor is None:
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.database_executor, function, *args)
 
     def get_file_path_from_hash(self, hash: str) -> Path:
         """Retrieves local path from hash.
@@ -44,19 +206,212 @@ class PathDictionaryController:
         Returns:
             Path: The path to the local file.
         """
-        mongodb_document = self.local_paths.find_one({"_id": hash})
-        if mongodb_document is None:
+        local_path_entry = self._get_local_path_entry(hash)
+        if local_path_entry is None:
             raise KeyError()
-        return jsonpickle.decode(mongodb_document["local_path"])
+        return local_path_entry.local_path
+
+    def _get_local_path_entry(self, hash: str) -> Optional[LocalPathEntry]:
+        """Retrieves the decoded local_paths document of a hash, using the cache.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Returns:
+            Optional[LocalPathEntry]: The decoded document or None, if file is not found under the given hash.
+        """
+        self._validate_cache()
+        local_path_entry = self.cache.get(hash)
+        if local_path_entry is None:
+            generation = self._generation
+            mongodb_document = self.local_paths.find_one({"_id": hash})
+            if mongodb_document is None:
+                return None
+            local_path_entry = LocalPathEntry.from_mongodb_document(mongodb_document)
+            self._fill_cache({hash: local_path_entry}, generation)
+        return local_path_entry
+
+    def get_file_paths_from_hashes(self, hashes: list[str]) -> dict[str, Path]:
+        """Retrieves local paths of multiple hashes with as few round trips as possible.
+
+        Args:
+            hashes (list[str]): Hashes to reference the files.
+
+        Returns:
+            dict[str, Path]: Local paths by hash, hashes of files that are not found are omitted.
+        """
+        return {
+            hash: local_path_entry.local_path
+            for hash, local_path_entry in self._get_local_path_entries(hashes).items()
+        }
+
+    def get_material_names(self, hashes: list[str]) -> dict[str, str]:
+        """Retrieves material names of multiple hashes with as few round trips as possible.
+
+        Args:
+            hashes (list[str]): Hashes to reference the files.
+
+        Returns:
+            dict[str, str]: Material names by hash, hashes of files that are not found are omitted.
+        """
+        return {
+            hash: local_path_entry.name
+            for hash, local_path_entry in self._get_local_path_entries(hashes).items()
+        }
+
+    def _get_local_path_entries(self, hashes: list[str]) -> dict[str, LocalPathEntry]:
+        """Retrieves decoded local_paths documents of multiple hashes.
+        Cached documents are served from the cache, the others are queried in batches with `$in`.
+
+        Args:
+            hashes (list[str]): Hashes to reference the files.
+
+        Returns:
+            dict[str, LocalPathEntry]: Decoded documents by hash, hashes of files that are not found are omitted.
+        """
+        self._validate_cache()
+        local_path_entries: dict[str, LocalPathEntry] = {}
+        uncached_hashes: list[str] = []
+        for hash in dict.fromkeys(hashes):
+            local_path_entry = self.cache.get(hash)
+            if local_path_entry is None:
+                uncached_hashes.append(hash)
+            else:
+                local_path_entries[hash] = local_path_entry
+        for start in range(0, len(uncached_hashes), BULK_BATCH_SIZE):
+            generation = self._generation
+            queried_entries = {
+                mongodb_document["_id"]: LocalPathEntry.from_mongodb_document(
+                    mongodb_document
+                )
+                for mongodb_document in self.local_paths.find(
+                    {"_id": {"$in": uncached_hashes[start : start + BULK_BATCH_SIZE]}}
+                )
+            }
+            self._fill_cache(queried_entries, generation)
+            local_path_entries.update(queried_entries)
+        return local_path_entries
+
+    def _fill_cache(
+        self, local_path_entries: dict[str, LocalPathEntry], generation: int
+    ) -> None:
+        """Caches documents, unless the cache was invalidated since they were read.
+
+        Args:
+            local_path_entries (dict[str, LocalPathEntry]): Decoded documents by hash.
+            generation (int): The generation before the documents were read.
+        """
+        with self._cache_lock:
+            if generation != self._generation:
+                return
+            for hash, local_path_entry in local_path_entries.items():
+                self.cache.put(hash, local_path_entry)
+
+    def _evict(self, hashes: Optional[list[str]] = None) -> None:
+        """Removes hashes from the cache and starts a new generation, so that concurrent lookups do not cache documents read before.
+
+        Args:
+            hashes (Optional[list[str]], optional): The hashes to remove. Defaults to all hashes.
+        """
+        with self._cache_lock:
+            self._generation += 1
+            if hashes is None:
+                self.cache.clear()
+            else:
+                for hash in hashes:
+                    self.cache.pop(hash)
+
+    def _validate_cache(self) -> None:
+        """Clears the cache, if another instance modified local_paths since the version counter was last checked.
+        The version counter is not checked while a change stream invalidates the cache.
+        """
+        if self._change_stream is not None:
+            return
+        now = time.monotonic()
+        if now - self._version_checked_at < self.max_staleness:
+            return
+        mongodb_document = self.versions.find_one({"_id": "local_paths"})
+        version = 0 if mongodb_document is None else mongodb_document["version"]
+        with self._cache_lock:
+            self._version_checked_at = now
+            if version != self._cached_version:
+                self._generation += 1
+                self.cache.clear()
+                self._cached_version = version
+
+    def _invalidate(self, hashes: list[str]) -> None:
+        """Removes modified hashes from the cache and increments the version counter to notify other instances.
+        The incremented version is adopted, if no other instance modified local_paths in between.
+        Concurrent lookups that read the hashes before do not cache them, see `_fill_cache(...)`.
+
+        Args:
+            hashes (list[str]): Hashes of the modified local_paths documents.
+        """
+        self._evict(hashes)
+        mongodb_document = self.versions.find_one_and_update(
+            {"_id": "local_paths"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        with self._cache_lock:
+            if (
+                mongodb_document is not None
+                and self._cached_version is not None
+                and mongodb_document["version"] == self._cached_version + 1
+            ):
+                self._cached_version = mongodb_document["version"]
+
+    def watch_changes(self) -> None:
+        """Invalidates cached entries using a MongoDB change stream on local_paths instead of the version counter.
+        Entries are invalidated as soon as the change event arrives, the version counter is used again if the change stream fails.
+        Requires MongoDB to run as replica set.
+
+        Raises:
+            PyMongoError: If the change stream cannot be opened.
+        """
+        change_stream = self.local_paths.watch()
+        self._evict()
+        self._change_stream = change_stream
+        Thread(
+            target=self._consume_change_stream, args=(change_stream,), daemon=True
+        ).start()
+
+    def _consume_change_stream(
+        self, change_stream: CollectionChangeStream[dict[str, Any]]
+    ) -> None:
+        """Removes changed documents from the cache until the change stream is closed or fails.
+
+        Args:
+            change_stream (CollectionChangeStream[dict[str, Any]]): Change stream on local_paths.
+        """
+        try:
+            for change in change_stream:
+                if "documentKey" in change:
+                    self._evict([change["documentKey"]["_id"]])
+                else:
+                    self._evict()
+        except PyMongoError:
+            pass
+        finally:
+            with self._cache_lock:
+                self._change_stream = None
+                self._version_checked_at = float("-inf")
+                self._cached_version = None
+
+    def close(self) -> None:
+        """Closes the change stream, if `watch_changes()` has been called."""
+        if self._change_stream is not None:
+            self._change_stream.close()
 
     async def get_file_from_hash_async(
-        self, hash: str, content_partition_size: int = 5 * 10**8
+        self, hash: str, content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE
     ) -> tuple[str, AsyncIterator[bytes]]:
         """Streams a local file using the given hash and returns its mimetype.
 
         Args:
             hash (str): Hash to reference the file.
-            content_partition_size (int, optional): The maximum filesize in bytes that a packet can have. Defaults to 5*10**8.
+            content_partition_size (int, optional): The maximum filesize in bytes that a packet can have. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
 
         Raises:
             KeyError: If file is not found under the given hash.
@@ -64,52 +419,374 @@ class PathDictionaryController:
         Returns:
             tuple[str, AsyncIterator[MaterialUploadData]]: A tuple with the mimetype at the first index and the asynchronous iterator for streaming at the second index.
         """
-        mongodb_document = self.local_paths.find_one({"_id": hash})
-        if mongodb_document is None:
-            raise KeyError()
-        local_path = jsonpickle.decode(mongodb_document["local_path"])
-        mimetype = MimetypeResolver.fixed_guess_type(local_path.suffix)
-        if mimetype is None:
-            raise MimetypeNotDetectedException()
+        local_path, mimetype = await self._run_database_operation(
+            self._get_local_path_and_mimetype, hash
+        )
         material_upload_data_iterator = self._get_async_iterator_of_local_file(
             local_path, content_partition_size
         )
         return (mimetype, material_upload_data_iterator)
 
+    async def get_file_view_from_hash_async(
+        self, hash: str, content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE
+    ) -> tuple[str, AsyncIterator[memoryview]]:
+        """Streams a local file using the given hash without copying its contents and returns its mimetype.
+        The file is memory-mapped, each yielded memoryview is only valid until the next packet is requested.
+
+        Args:
+            hash (str): Hash to reference the file.
+            content_partition_size (int, optional): The maximum filesize in bytes that a packet can have. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
+
+        Raises:
+            KeyError: If file is not found under the given hash.
+
+        Returns:
+            tuple[str, AsyncIterator[memoryview]]: A tuple with the mimetype at the first index and the asynchronous iterator for streaming at the second index.
+        """
+        local_path, mimetype = await self._run_database_operation(
+            self._get_local_path_and_mimetype, hash
+        )
+        material_view_iterator = self.file_io.read_mapped_chunks(
+            local_path, content_partition_size
+        )
+        return (mimetype, material_view_iterator)
+
+    async def get_file_range_from_hash_async(
+        self,
+        hash: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
+    ) -> tuple[str, AsyncIterator[bytes]]:
+        """Streams a byte range of a local file using the given hash and returns its mimetype.
+
+        Args:
+            hash (str): Hash to reference the file.
+            offset (int, optional): Position in the file to start streaming from. Defaults to 0.
+            length (Optional[int], optional): The maximum amount of bytes to stream, the file is streamed until its end if None. Defaults to None.
+            content_partition_size (int, optional): The maximum filesize in bytes that a packet can have. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
+
+        Raises:
+            KeyError: If file is not found under the given hash.
+
+        Returns:
+            tuple[str, AsyncIterator[bytes]]: A tuple with the mimetype at the first index and the asynchronous iterator for streaming at the second index.
+        """
+        local_path, mimetype = await self._run_database_operation(
+            self._get_local_path_and_mimetype, hash
+        )
+        material_range_iterator = self.file_io.read_chunks(
+            local_path, content_partition_size, offset, length
+        )
+        return (mimetype, material_range_iterator)
+
+    async def get_page_range_from_hash_async(
+        self,
+        hash: str,
+        page_filter: PageFilter,
+        offset: int = 0,
+        length: Optional[int] = None,
+        content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
+    ) -> tuple[str, AsyncIterator[bytes]]:
+        """Streams the pages selected by page_filter of a local file using the given hash and returns its mimetype.
+        Only the bytes of the selected pages are read, using the page index of the file.
+
+        Args:
+            hash (str): Hash to reference the file.
+            page_filter (PageFilter): The selected pages, bounds are 1-based and inclusive.
+            offset (int, optional): Position within the selected pages to start streaming from. Defaults to 0.
+            length (Optional[int], optional): The maximum amount of bytes to stream, the selected pages are streamed until their end if None. Defaults to None.
+            content_partition_size (int, optional): The maximum filesize in bytes that a packet can have. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
+
+        Raises:
+            KeyError: If file is not found under the given hash.
+            PageFilterNotSupportedException: If the format of the file has no page index.
+            ValueError: If page_filter selects no pages of the file.
+
+        Returns:
+            tuple[str, AsyncIterator[bytes]]: A tuple with the mimetype at the first index and the asynchronous iterator for streaming at the second index.
+        """
+        local_path, mimetype = await self._run_database_operation(
+            self._get_local_path_and_mimetype, hash
+        )
+        page_offsets = await self.get_page_offsets_async(hash)
+        if page_offsets is None:
+            raise PageFilterNotSupportedException()
+        page_range_offset, page_range_length = get_page_byte_range(
+            page_offsets, page_filter
+        )
+        offset = min(offset, page_range_length)
+        remaining_length = page_range_length - offset
+        material_range_iterator = self.file_io.read_chunks(
+            local_path,
+            content_partition_size,
+            page_range_offset + offset,
+            remaining_length if length is None else min(length, remaining_length),
+        )
+        return (mimetype, material_range_iterator)
+
+    def get_page_offsets(self, hash: str) -> Optional[list[int]]:
+        """Retrieves the page index of a file, see `build_page_offsets(...)`.
+        The index is built at load time, files loaded without an index or modified since are indexed on demand.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Raises:
+            KeyError: If file is not found under the given hash.
+
+        Returns:
+            Optional[list[int]]: Page offsets, None if the format of the file has no page index.
+        """
+        local_path_entry = self._get_local_path_entry(hash)
+        if local_path_entry is None:
+            raise KeyError()
+        page_offsets, is_rebuilt = self._refresh_page_offsets(local_path_entry)
+        if is_rebuilt and page_offsets is not None:
+            self._store_page_offsets(hash, page_offsets)
+        return page_offsets
+
+    async def get_page_offsets_async(self, hash: str) -> Optional[list[int]]:
+        """Retrieves the page index of a file like `get_page_offsets(...)`, the file is inspected with file_io off the event loop.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Raises:
+            KeyError: If file is not found under the given hash.
+
+        Returns:
+            Optional[list[int]]: Page offsets, None if the format of the file has no page index.
+        """
+        local_path_entry = await self._run_database_operation(
+            self._get_local_path_entry, hash
+        )
+        if local_path_entry is None:
+            raise KeyError()
+        page_offsets, is_rebuilt = await self.file_io.run(
+            self._refresh_page_offsets, local_path_entry
+        )
+        if is_rebuilt and page_offsets is not None:
+            await self._run_database_operation(
+                self._store_page_offsets, hash, page_offsets
+            )
+        return page_offsets
+
+    @classmethod
+    def _refresh_page_offsets(
+        cls, local_path_entry: LocalPathEntry
+    ) -> tuple[Optional[list[int]], bool]:
+        """Validates the stored page index of a file against its size and rebuilds it, if it is missing or outdated.
+
+        Args:
+            local_path_entry (LocalPathEntry): The decoded local_paths document of the file.
+
+        Returns:
+            tuple[Optional[list[int]], bool]: The page offsets at the first index and whether they were rebuilt at the second index.
+        """
+        page_offsets = local_path_entry.page_offsets
+        if page_offsets is not None and page_offsets[-1] == os.path.getsize(
+            local_path_entry.local_path
+        ):
+            return (page_offsets, False)
+        return (cls._build_page_offsets(local_path_entry.local_path), True)
+
+    def _store_page_offsets(self, hash: str, page_offsets: list[int]) -> None:
+        """Stores a rebuilt page index in the local_paths document of a file.
+
+        Args:
+            hash (str): Hash to reference the file.
+            page_offsets (list[int]): The page offsets.
+        """
+        self.local_paths.update_one(
+            {"_id": hash}, {"$set": {"page_offsets": page_offsets}}
+        )
+        self._invalidate([hash])
+
+    @staticmethod
+    def _build_page_offsets(local_path: Path) -> Optional[list[int]]:
+        """Builds the page index of a file, if its suffix belongs to a format with a page index.
+
+        Args:
+            local_path (Path): The path of the file.
+
+        Returns:
+            Optional[list[int]]: Page offsets, None if the format has no page index or the file is not readable.
+        """
+        try:
+            return build_page_offsets(
+                local_path, MimetypeResolver.fixed_guess_type(local_path.suffix)
+            )
+        except OSError:
+            return None
+
+    def _get_local_path_and_mimetype(self, hash: str) -> tuple[Path, str]:
+        """Retrieves local path and mimetype from hash.
+        The mimetype is looked up by suffix, the file contents are only inspected for files without a known suffix.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Raises:
+            KeyError: If file is not found under the given hash.
+            MimetypeNotDetectedException
+
+        Returns:
+            tuple[Path, str]: A tuple with the local path at the first index and the mimetype at the second index.
+        """
+        local_path = self.get_file_path_from_hash(hash)
+        mimetype = MimetypeResolver.fixed_guess_type(local_path.suffix)
+        if mimetype is None:
+            mimetype = MimetypeResolver.sniff_file_type(local_path)
+        if mimetype is None:
+            raise MimetypeNotDetectedException()
+        return (local_path, mimetype)
+
     async def _get_async_iterator_of_local_file(
-        self, local_path: Path, content_partition_size: int = 5 * 10**8
+        self,
+        local_path: Path,
+        content_partition_size: int = DEFAULT_CONTENT_PARTITION_SIZE,
     ) -> AsyncIterator[bytes]:
         """Streams binary data of a file under local_path.
 
         Args:
             local_path (Path): The path of the file to be stream.
-            content_partition_size (int, optional): The maximum filesize in bytes that a packet can have. Defaults to 5*10**8.
+            content_partition_size (int, optional): The maximum filesize in bytes that a packet can have. Defaults to DEFAULT_CONTENT_PARTITION_SIZE.
 
         Returns:
             AsyncIterator[bytes]: Iterator with binary packets.
         """
-        with open(local_path, "rb") as local_file:
-            while content_partition := local_file.read(content_partition_size):
-                yield content_partition
+        async for content_partition in self.file_io.read_chunks(
+            local_path, content_partition_size
+        ):
+            yield content_partition
 
-    def load_file(self, local_path: Path, hash: str, name: str = "") -> None:
-        """Adds a file to the internal pool of files.
+    def load_file(
+        self,
+        local_path: Path,
+        hash: str,
+        name: str = "",
+        page_offsets: Optional[list[int]] = None,
+    ) -> None:
+        """Adds a file to the internal pool of files and builds its page index.
 
         Args:
             local_path (Path): The system path to the file.
             hash (str): Hash to reference the file.
             name: Name or description of the file to load.
+            page_offsets (Optional[list[int]], optional): Page index of the file, it is built from the file if None. Defaults to None.
         """
-        mongodb_document = {
-            "_id": hash,
-            "name": name,
-            "local_path": jsonpickle.encode(local_path),
-        }
+        if page_offsets is None:
+            page_offsets = self._build_page_offsets(local_path)
+        mongodb_document = LocalPathEntry(
+            local_path, name, page_offsets
+        ).to_mongodb_document(hash)
         self.local_paths.update_one(
             {"_id": mongodb_document["_id"]},
             {"$set": mongodb_document},
             upsert=True,
         )
+        self._invalidate([hash])
+
+    def load_files(self, files: list[tuple[Path, str, str]]) -> dict[str, str]:
+        """Adds multiple files to the internal pool of files using unordered bulk writes.
+        A failing file does not abort loading the other files.
+        Hashes of batches that were attempted are invalidated, even if a later batch fails with another error.
+        Files are not read, their page index is built on demand by `get_page_offsets(...)`.
+
+        Args:
+            files (list[tuple[Path, str, str]]): Tuples of local path, hash and name of the files to load.
+
+        Returns:
+            dict[str, str]: Error messages by hash of the files that failed to load, empty if all files are loaded.
+        """
+        errors: dict[str, str] = {}
+        attempted_hashes: list[str] = []
+        try:
+            for start in range(0, len(files), BULK_BATCH_SIZE):
+                batch = files[start : start + BULK_BATCH_SIZE]
+                requests = [
+                    UpdateOne(
+                        {"_id": hash},
+                        {
+                            "$set": LocalPathEntry(
+                                local_path, name
+                            ).to_mongodb_document(hash)
+                        },
+                        upsert=True,
+                    )
+                    for (local_path, hash, name) in batch
+                ]
+                attempted_hashes.extend(hash for (_, hash, _) in batch)
+                try:
+                    self.local_paths.bulk_write(requests, ordered=False)
+                except BulkWriteError as bulk_write_error:
+                    for write_error in bulk_write_error.details["writeErrors"]:
+                        _, hash, _ = batch[write_error["index"]]
+                        errors[hash] = write_error["errmsg"]
+        finally:
+            if attempted_hashes:
+                self._invalidate(attempted_hashes)
+        return errors
+
+    def migrate_local_paths(self, batch_size: int = 1000) -> int:
+        """Rewrites local_paths documents of older schema versions to the current schema version.
+        Documents are migrated in batches while the collection stays in use, reads support all schema versions in the meantime.
+        A document that is modified concurrently is skipped and written by its modification in the current schema version.
+
+        Args:
+            batch_size (int, optional): The maximum amount of documents rewritten per bulk write. Defaults to 1000.
+
+        Returns:
+            int: The amount of migrated documents.
+        """
+        migrated = 0
+        last_id = None
+        while True:
+            query: dict[str, Any] = {"schema_version": {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            mongodb_documents = list(
+                self.local_paths.find(query).sort("_id", 1).limit(batch_size)
+            )
+            if not mongodb_documents:
+                return migrated
+            requests = [
+                UpdateOne(
+                    {
+                        "_id": mongodb_document["_id"],
+                        "local_path": mongodb_document["local_path"],
+                        "schema_version": {"$exists": False},
+                    },
+                    {
+                        "$set": LocalPathEntry.from_mongodb_document(
+                            mongodb_document
+                        ).to_mongodb_document(mongodb_document["_id"])
+                    },
+                )
+                for mongodb_document in mongodb_documents
+            ]
+            migrated += self.local_paths.bulk_write(
+                requests, ordered=False
+            ).modified_count
+            last_id = mongodb_documents[-1]["_id"]
+
+    def unload_materials(self, hashes: list[str]) -> None:
+        """Removes the internal representation of multiple lecture materials. Does not delete the files.
+        Hashes of batches that were attempted are invalidated, even if a later batch fails.
+
+        Args:
+            hashes (list[str]): Hashes to reference the files.
+        """
+        attempted_hashes: list[str] = []
+        try:
+            for start in range(0, len(hashes), BULK_BATCH_SIZE):
+                batch = hashes[start : start + BULK_BATCH_SIZE]
+                attempted_hashes.extend(batch)
+                self.local_paths.delete_many({"_id": {"$in": batch}})
+        finally:
+            if attempted_hashes:
+                self._invalidate(attempted_hashes)
 
     def unload_material(self, hash: str) -> None:
         """Removes the internal representation of a lecture material. Does not delete the file.
@@ -118,6 +795,7 @@ class PathDictionaryController:
             hash: Hash to reference the file.
         """
         self.local_paths.delete_one({"_id": hash})
+        self._invalidate([hash])
 
     async def add_file_async(
         self,
@@ -142,15 +820,337 @@ class PathDictionaryController:
         """
         if os.path.exists(local_path) and not overwrite:
             raise FileOverwriteNotPermittedException()
-        with open(local_path, "ab") as local_file:
-            local_file.truncate(0)
-            while True:
-                try:
-                    data = await binary_iterator.__anext__()
-                    local_file.write(data)
-                except StopAsyncIteration:
-                    break
-        self.load_file(local_path, hash, name)
+        temporary_path = await self._write_temporary_file_async(
+            Path(os.path.dirname(os.path.abspath(local_path))), binary_iterator
+        )
+        await self.file_io.run(os.replace, temporary_path, local_path)
+        page_offsets = await self.file_io.run(self._build_page_offsets, local_path)
+        await self._run_database_operation(
+            self.load_file, local_path, hash, name, page_offsets
+        )
+
+    async def add_content_addressed_file_async(
+        self,
+        directory: Path,
+        mimetype: str,
+        binary_iterator: AsyncIterator[bytes],
+        name: str = "",
+        expected_hash: Optional[str] = None,
+    ) -> str:
+        """A new file is created asynchronously from a stream and named after its BLAKE3 hash.
+        The stream is hashed while it is written to a temporary file, which is renamed atomically afterwards.
+        If a file with the same hash is already present, the temporary file is discarded and the present file is reused.
+
+        Args:
+            directory: The system path to the directory where the file is created.
+            mimetype: Mimetype of the file, determines the file extension.
+            binary_iterator: Yields binary data of the file itself.
+            name: Name or description of the file to add.
+            expected_hash: The file is only committed, if its hash matches, e.g. the requested hash of a download.
+
+        Raises:
+            NoMimetypeMappingException
+            MaterialHashNotValidException: If expected_hash is set and does not match the hash of the stream.
+
+        Returns:
+            str: Hash to reference the file.
+        """
+        extension = MimetypeResolver.fixed_guess_extension(mimetype)
+        if extension is None:
+            raise NoMimetypeMappingException()
+        hasher = self.file_hasher.create_hasher()
+        temporary_path = await self._write_temporary_file_async(
+            directory, binary_iterator, hasher
+        )
+        hash = hasher.hexdigest()
+        if expected_hash is not None and hash != expected_hash:
+            await self.file_io.run(os.remove, temporary_path)
+            raise MaterialHashNotValidException(
+                f"Received contents do not match {expected_hash}."
+            )
+        return await self._commit_content_addressed_file_async(
+            directory, temporary_path, hash, extension, name
+        )
+
+    async def pull_content_addressed_file_async(
+        self,
+        directory: Path,
+        material_server_stub: MaterialServerStub,
+        hash: str,
+        name: str = "",
+    ) -> str:
+        """Synchronizes a file from a remote material server by its chunks and names it after its BLAKE3 hash.
+        Only chunks that chunk_store does not contain yet are transferred, see `ChunkStore.pull_file_async(...)`.
+
+        Args:
+            directory (Path): The system path to the directory where the file is created.
+            material_server_stub (MaterialServerStub): Stub of the remote material server.
+            hash (str): Hash to reference the file.
+            name (str, optional): Name or description of the file to add. Defaults to "".
+
+        Raises:
+            ValueError: If chunk_store is not set.
+            ChunkDataNotValidException: If the remote sends data that does not match the requested hashes.
+            NoMimetypeMappingException
+
+        Returns:
+            str: Hash to reference the file.
+        """
+        if self.chunk_store is None:
+            raise ValueError("Files can only be pulled, if chunk_store is set.")
+        present_file_path = await self._run_database_operation(
+            self._get_present_file_path, hash
+        )
+        if present_file_path is not None:
+            return hash
+        await self.chunk_store.pull_file_async(material_server_stub, hash)
+        return await self.restore_content_addressed_file_async(directory, hash, name)
+
+    async def restore_content_addressed_file_async(
+        self, directory: Path, hash: str, name: str = ""
+    ) -> str:
+        """Recreates a file from its chunks in chunk_store and names it after its BLAKE3 hash.
+        The file is committed like in `add_content_addressed_file_async(...)`.
+
+        Args:
+            directory (Path): The system path to the directory where the file is created.
+            hash (str): Hash to reference the file.
+            name (str, optional): Name or description of the file to add. Defaults to "".
+
+        Raises:
+            ValueError: If chunk_store is not set.
+            KeyError: If the file is not stored in chunk_store.
+            ChunkDataNotValidException: If the recreated file does not match its hash.
+            NoMimetypeMappingException
+
+        Returns:
+            str: Hash to reference the file.
+        """
+        if self.chunk_store is None:
+            raise ValueError("Files can only be restored, if chunk_store is set.")
+        manifest = await self._run_database_operation(
+            self.chunk_store.get_manifest, hash
+        )
+        extension = MimetypeResolver.fixed_guess_extension(manifest.mimetype)
+        if extension is None:
+            raise NoMimetypeMappingException()
+        hasher = self.file_hasher.create_hasher()
+        temporary_path = await self._write_temporary_file_async(
+            directory, self.chunk_store.read_file_async(hash), hasher
+        )
+        if hasher.hexdigest() != hash:
+            await self.file_io.run(os.remove, temporary_path)
+            raise ChunkDataNotValidException()
+        return await self._commit_content_addressed_file_async(
+            directory, temporary_path, hash, extension, name
+        )
+
+    async def add_resumable_file_async(
+        self,
+        directory: Path,
+        upload_id: str,
+        offset: int,
+        mimetype: str,
+        binary_iterator: AsyncIterator[bytes],
+        name: str = "",
+    ) -> str:
+        """Starts or resumes an upload that is identified by upload_id and named after its BLAKE3 hash on completion.
+        Received data is kept in a partial file if the stream is interrupted, the upload can be resumed at `get_upload_offset(upload_id)`.
+        The completed file is committed like in `add_content_addressed_file_async(...)`.
+
+        Args:
+            directory: The system path to the directory where the file is created.
+            upload_id: Identifies the upload across interrupted streams.
+            offset: Position in the file that binary_iterator starts at, data after offset that was received before is discarded.
+            mimetype: Mimetype of the file, determines the file extension.
+            binary_iterator: Yields binary data of the file starting at offset.
+            name: Name or description of the file to add.
+
+        Raises:
+            NoMimetypeMappingException
+            UploadOffsetNotValidException: If offset exceeds the amount of bytes received so far.
+
+        Returns:
+            str: Hash to reference the file.
+        """
+        extension = MimetypeResolver.fixed_guess_extension(mimetype)
+        if extension is None:
+            raise NoMimetypeMappingException()
+        partial_path = await self._run_database_operation(
+            self._get_partial_upload_path, upload_id
+        )
+        if partial_path is None:
+            partial_path = directory / (
+                "." + blake3(upload_id.encode()).hexdigest() + ".partial"
+            )
+            await self._run_database_operation(
+                partial(self.uploads.update_one, upsert=True),
+                {"_id": upload_id},
+                {"$set": {"local_path": str(partial_path)}},
+            )
+        hasher = self.file_hasher.create_hasher()
+        file_descriptor = await self.file_io.run(
+            os.open, partial_path, os.O_RDWR | os.O_CREAT, 0o666
+        )
+        try:
+            received = (await self.file_io.run(os.fstat, file_descriptor)).st_size
+            if offset > received:
+                raise UploadOffsetNotValidException()
+            await self.file_io.run(os.ftruncate, file_descriptor, offset)
+            await self.file_io.run(os.lseek, file_descriptor, offset, os.SEEK_SET)
+            async for received_data in self.file_io.read_chunks(
+                partial_path, DEFAULT_CONTENT_PARTITION_SIZE, 0, offset
+            ):
+                hasher.update(received_data)
+            await self.file_io.write_chunks(file_descriptor, binary_iterator, hasher)
+        finally:
+            await self.file_io.run(os.close, file_descriptor)
+        await self._run_database_operation(self.uploads.delete_one, {"_id": upload_id})
+        return await self._commit_content_addressed_file_async(
+            Path(os.path.dirname(partial_path)),
+            partial_path,
+            hasher.hexdigest(),
+            extension,
+            name,
+        )
+
+    def get_upload_offset(self, upload_id: str) -> int:
+        """Retrieves the amount of bytes received so far by an interrupted upload.
+
+        Args:
+            upload_id (str): Identifies the upload across interrupted streams.
+
+        Returns:
+            int: The offset to resume the upload at, 0 if the upload is unknown.
+        """
+        partial_path = self._get_partial_upload_path(upload_id)
+        if partial_path is None or not os.path.exists(partial_path):
+            return 0
+        return os.path.getsize(partial_path)
+
+    def discard_upload(self, upload_id: str) -> None:
+        """Removes the partial file and the reference of an interrupted upload.
+
+        Args:
+            upload_id (str): Identifies the upload across interrupted streams.
+        """
+        partial_path = self._get_partial_upload_path(upload_id)
+        if partial_path is not None:
+            self.uploads.delete_one({"_id": upload_id})
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def _get_partial_upload_path(self, upload_id: str) -> Optional[Path]:
+        """Retrieves the path of the partial file of an upload.
+
+        Args:
+            upload_id (str): Identifies the upload across interrupted streams.
+
+        Returns:
+            Optional[Path]: The path to the partial file or None, if the upload is unknown.
+        """
+        mongodb_document = self.uploads.find_one({"_id": upload_id})
+        if mongodb_document is None:
+            return None
+        return Path(mongodb_document["local_path"])
+
+    async def _commit_content_addressed_file_async(
+        self,
+        directory: Path,
+        temporary_path: Path,
+        hash: str,
+        extension: str,
+        name: str,
+    ) -> str:
+        """Atomically renames a completely written file to its hash and loads it.
+        If a file with the same hash is already present, the written file is discarded and the present file is reused.
+        Failures of chunk_store are logged instead of raised, as the file is committed already.
+        Adding the same file again retries storing its chunks.
+
+        Args:
+            directory (Path): The system path to the directory where the file is created.
+            temporary_path (Path): The completely written file.
+            hash (str): The BLAKE3 hash of the written file.
+            extension (str): The file extension matching the mimetype of the file.
+            name (str): Name or description of the file.
+
+        Returns:
+            str: Hash to reference the file.
+        """
+        local_path = await self._run_database_operation(
+            self._get_present_file_path, hash
+        )
+        if local_path is None:
+            local_path = directory / (hash + extension)
+            await self.file_io.run(os.replace, temporary_path, local_path)
+            if self.hash_cache is not None:
+                self.hash_cache.add(local_path, hash)
+        else:
+            await self.file_io.run(os.remove, temporary_path)
+        page_offsets = await self.file_io.run(self._build_page_offsets, local_path)
+        await self._run_database_operation(
+            self.load_file, local_path, hash, name, page_offsets
+        )
+        if self.chunk_store is not None:
+            try:
+                await self.chunk_store.add_file_async(
+                    local_path,
+                    hash,
+                    MimetypeResolver.fixed_guess_type(extension) or "",
+                )
+            except Exception:
+                logger.exception(
+                    "Storing chunks of %s failed, the file is committed without chunks.",
+                    hash,
+                )
+        return hash
+
+    def _get_present_file_path(self, hash: str) -> Optional[Path]:
+        """Retrieves local path from hash, if the file is loaded and present on the filesystem.
+
+        Args:
+            hash (str): Hash to reference the file.
+
+        Returns:
+            Optional[Path]: The path to the local file or None.
+        """
+        try:
+            local_path = self.get_file_path_from_hash(hash)
+        except KeyError:
+            return None
+        if not os.path.exists(local_path):
+            return None
+        return local_path
+
+    async def _write_temporary_file_async(
+        self,
+        directory: Path,
+        binary_iterator: AsyncIterator[bytes],
+        hasher: Optional[blake3] = None,
+    ) -> Path:
+        """Writes a stream to a new temporary file in directory.
+        The temporary file is removed, if the stream is interrupted.
+
+        Args:
+            directory (Path): The directory where the temporary file is created, should be on the same filesystem as the final location to allow atomic renaming.
+            binary_iterator (AsyncIterator[bytes]): Yields binary data of the file itself.
+            hasher (Optional[blake3], optional): Is updated with all written data, if set. Defaults to None.
+
+        Returns:
+            Path: The path to the temporary file.
+        """
+        file_descriptor, temporary_path = await self.file_io.run(
+            tempfile.mkstemp, ".upload", ".", directory
+        )
+        try:
+            await self.file_io.run(os.fchmod, file_descriptor, FILE_MODE)
+            await self.file_io.write_chunks(file_descriptor, binary_iterator, hasher)
+        except BaseException:
+            await self.file_io.run(os.remove, temporary_path)
+            raise
+        finally:
+            await self.file_io.run(os.close, file_descriptor)
+        return Path(temporary_path)
 
     def copy_and_load_file(
         self,
@@ -167,29 +1167,81 @@ class PathDictionaryController:
             hash (str): Hash to reference the file.
         """
         shutil.copyfile(source_local_path, destination_local_path)
-        self.load_file(destination_local_path, hash, name)
+        page_offsets = self._build_page_offsets(destination_local_path)
+        self.load_file(destination_local_path, hash, name, page_offsets)
 
     def delete_file(self, hash: str) -> None:
         """Deletes the reference to the file and the file itself from the filesystem.
+        Chunks of the file are removed from chunk_store, unless other files reference them.
 
         Args:
             local_path: The system path to the file.
         """
-        mongodb_document = self.local_paths.find_one({"_id": hash})
-        if mongodb_document is not None:
-            mongodb_document = mongodb_document["local_path"]
-            local_path = jsonpickle.decode(mongodb_document)
+        local_path_entry = self._get_local_path_entry(hash)
+        if local_path_entry is not None:
+            local_path = local_path_entry.local_path
             self.unload_material(hash)
             if self.local_paths.find_one({"_id": hash}) is None:
                 os.remove(local_path)
+        if self.chunk_store is not None:
+            self.chunk_store.delete_manifest(hash)
 
     def get_material_hashes(self) -> list[str]:
         """Retrieves all hashes of the internally referenced files.
+        Use `iterate_material_hashes(...)` to process large stores page by page.
 
         Returns:
             A set of strings
         """
-        return [str(id) for id in self.local_paths.distinct("_id")]
+        return [
+            hash
+            for material_hashes_page in self.iterate_material_hashes()
+            for hash in material_hashes_page
+        ]
+
+    def get_material_hashes_page(
+        self, after: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE
+    ) -> list[str]:
+        """Retrieves a page of hashes of the internally referenced files in ascending order.
+        Pages are selected by the last hash of the previous page, so every page is served by the `_id` index
+        and the result stays consistent while documents are added or removed.
+
+        Args:
+            after (Optional[str], optional): The last hash of the previous page, the first page is retrieved if None. Defaults to None.
+            page_size (int, optional): The maximum amount of hashes per page. Defaults to DEFAULT_PAGE_SIZE.
+
+        Raises:
+            ValueError: If page_size is not positive.
+
+        Returns:
+            list[str]: Hashes that are greater than after, an empty list if there are none left.
+        """
+        if page_size <= 0:
+            raise ValueError("page_size must be positive.")
+        query: dict[str, Any] = {} if after is None else {"_id": {"$gt": after}}
+        return [
+            str(mongodb_document["_id"])
+            for mongodb_document in self.local_paths.find(query, {"_id": 1})
+            .sort("_id", 1)
+            .limit(page_size)
+        ]
+
+    def iterate_material_hashes(
+        self, after: Optional[str] = None, page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Iterator[list[str]]:
+        """Iterates over pages of hashes of the internally referenced files in ascending order.
+        Only a single page is held in memory at a time.
+
+        Args:
+            after (Optional[str], optional): Hash to resume the iteration after, starts at the first hash if None. Defaults to None.
+            page_size (int, optional): The maximum amount of hashes per page. Defaults to DEFAULT_PAGE_SIZE.
+
+        Returns:
+            Iterator[list[str]]: Iterator with non-empty pages of hashes.
+        """
+        while material_hashes_page := self.get_material_hashes_page(after, page_size):
+            yield material_hashes_page
+            after = material_hashes_page[-1]
 
     def get_material_name(self, hash: str) -> str:
         """Returns material name from hash.
@@ -203,7 +1255,7 @@ class PathDictionaryController:
         Returns:
             str: Material name.
         """
-        mongodb_document = self.local_paths.find_one({"_id": hash})
-        if mongodb_document is None:
+        local_path_entry = self._get_local_path_entry(hash)
+        if local_path_entry is None:
             raise KeyError()
-        return mongodb_document["name"]
+        return local_path_entry.name
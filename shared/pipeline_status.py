@@ -0,0 +1,222 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+from evalquiz_proto.shared.generated import (
+    BatchStatus,
+    BatchStatusUpdate,
+    CacheStatistics,
+    InternalConfig,
+    PipelineServerStub,
+    PipelineStatus,
+    PipelineStatusUpdate,
+)
+
+DEFAULT_MAX_EMISSION_RATE = 10.0
+"""The default maximum amount of status updates per second of an incremental status stream."""
+
+
+class PipelineStatusEncoder:
+    """Encodes successive PipelineStatus snapshots into PipelineStatusUpdate messages,
+    that only contain the BatchStatus entries that changed since the previous update.
+    The PipelineResult is sent once, with the first update that contains it.
+    CacheStatistics are sent when they changed.
+    """
+
+    def __init__(self) -> None:
+        self._encoded_batch_statuses: list[bytes] = []
+        self._encoded_cache_statistics: dict[str, bytes] = {}
+        self._result_sent = False
+        self._first_update_sent = False
+
+    def encode(self, pipeline_status: PipelineStatus) -> Optional[PipelineStatusUpdate]:
+        """Encodes the changes of pipeline_status since the previous update.
+
+        Args:
+            pipeline_status (PipelineStatus): The complete status of the pipeline.
+
+        Returns:
+            Optional[PipelineStatusUpdate]: The changes, None if nothing changed since the previous update.
+        """
+        batch_status_updates = []
+        batch_count = len(pipeline_status.batch_status)
+        del self._encoded_batch_statuses[batch_count:]
+        for batch_index, batch_status in enumerate(pipeline_status.batch_status):
+            encoded_batch_status = bytes(batch_status)
+            if batch_index == len(self._encoded_batch_statuses):
+                self._encoded_batch_statuses.append(encoded_batch_status)
+            elif self._encoded_batch_statuses[batch_index] == encoded_batch_status:
+                continue
+            else:
+                self._encoded_batch_statuses[batch_index] = encoded_batch_status
+            batch_status_updates.append(
+                BatchStatusUpdate(batch_index=batch_index, batch_status=batch_status)
+            )
+        result = None
+        if pipeline_status.result is not None and not self._result_sent:
+            result = pipeline_status.result
+            self._result_sent = True
+        generation_cache_statistics = self._encode_cache_statistics(
+            "generation", pipeline_status.generation_cache_statistics
+        )
+        evaluation_cache_statistics = self._encode_cache_statistics(
+            "evaluation", pipeline_status.evaluation_cache_statistics
+        )
+        if (
+            self._first_update_sent
+            and not batch_status_updates
+            and result is None
+            and generation_cache_statistics is None
+            and evaluation_cache_statistics is None
+        ):
+            return None
+        self._first_update_sent = True
+        return PipelineStatusUpdate(
+            result=result,
+            batch_status_updates=batch_status_updates,
+            batch_count=batch_count,
+            generation_cache_statistics=generation_cache_statistics,
+            evaluation_cache_statistics=evaluation_cache_statistics,
+        )
+
+    def _encode_cache_statistics(
+        self, cache_name: str, cache_statistics: Optional[CacheStatistics]
+    ) -> Optional[CacheStatistics]:
+        """Returns cache_statistics, if they changed since the previous update.
+
+        Returns:
+            Optional[CacheStatistics]: The changed statistics or None.
+        """
+        if cache_statistics is None:
+            return None
+        encoded_cache_statistics = bytes(cache_statistics)
+        if self._encoded_cache_statistics.get(cache_name) == encoded_cache_statistics:
+            return None
+        self._encoded_cache_statistics[cache_name] = encoded_cache_statistics
+        return cache_statistics
+
+
+class PipelineStatusReconstructor:
+    """Reconstructs complete PipelineStatus snapshots from PipelineStatusUpdate messages on the client side."""
+
+    def __init__(self) -> None:
+        self.pipeline_status = PipelineStatus()
+
+    def apply(self, pipeline_status_update: PipelineStatusUpdate) -> PipelineStatus:
+        """Applies an update to the reconstructed status.
+
+        Args:
+            pipeline_status_update (PipelineStatusUpdate): The changes since the previous update.
+
+        Raises:
+            IndexError: If a batch index is not smaller than the batch count of the update.
+
+        Returns:
+            PipelineStatus: The reconstructed status, it is modified by later updates.
+        """
+        batch_statuses = self.pipeline_status.batch_status
+        batch_count = pipeline_status_update.batch_count
+        del batch_statuses[batch_count:]
+        batch_statuses.extend(
+            BatchStatus() for _ in range(batch_count - len(batch_statuses))
+        )
+        for batch_status_update in pipeline_status_update.batch_status_updates:
+            if batch_status_update.batch_index >= batch_count:
+                raise IndexError(
+                    f"Batch index {batch_status_update.batch_index} exceeds batch count {batch_count}."
+                )
+            batch_statuses[batch_status_update.batch_index] = (
+                batch_status_update.batch_status
+            )
+        if pipeline_status_update.result is not None:
+            self.pipeline_status.result = pipeline_status_update.result
+        if pipeline_status_update.generation_cache_statistics is not None:
+            self.pipeline_status.generation_cache_statistics = (
+                pipeline_status_update.generation_cache_statistics
+            )
+        if pipeline_status_update.evaluation_cache_statistics is not None:
+            self.pipeline_status.evaluation_cache_statistics = (
+                pipeline_status_update.evaluation_cache_statistics
+            )
+        return self.pipeline_status
+
+
+async def create_incremental_status_stream(
+    pipeline_status_iterator: AsyncIterator[PipelineStatus],
+    max_emission_rate: Optional[float] = DEFAULT_MAX_EMISSION_RATE,
+) -> AsyncIterator[PipelineStatusUpdate]:
+    """Creates the response stream of an `IterateConfigIncremental` request on the server side from PipelineStatus snapshots.
+    Snapshots that arrive faster than max_emission_rate are coalesced, only the latest snapshot of an interval is encoded.
+    The latest snapshot is always sent when pipeline_status_iterator ends, so the final result is never delayed.
+
+    Args:
+        pipeline_status_iterator (AsyncIterator[PipelineStatus]): Complete status snapshots, as yielded for `IterateConfig`.
+        max_emission_rate (Optional[float], optional): The maximum amount of updates per second, updates are not coalesced if None. Defaults to DEFAULT_MAX_EMISSION_RATE.
+
+    Raises:
+        ValueError: If max_emission_rate is not positive.
+
+    Returns:
+        AsyncIterator[PipelineStatusUpdate]: Iterator with updates.
+    """
+    if max_emission_rate is not None and max_emission_rate <= 0:
+        raise ValueError("max_emission_rate has to be positive.")
+    encoder = PipelineStatusEncoder()
+    if max_emission_rate is None:
+        async for pipeline_status in pipeline_status_iterator:
+            pipeline_status_update = encoder.encode(pipeline_status)
+            if pipeline_status_update is not None:
+                yield pipeline_status_update
+        return
+    emission_interval = 1 / max_emission_rate
+    next_emission_time = time.monotonic()
+    pending_pipeline_status: Optional[PipelineStatus] = None
+    next_pipeline_status = asyncio.ensure_future(anext(pipeline_status_iterator))
+    try:
+        while True:
+            timeout = None
+            if pending_pipeline_status is not None:
+                timeout = max(0.0, next_emission_time - time.monotonic())
+            await asyncio.wait({next_pipeline_status}, timeout=timeout)
+            if next_pipeline_status.done():
+                try:
+                    pending_pipeline_status = next_pipeline_status.result()
+                except StopAsyncIteration:
+                    break
+                next_pipeline_status = asyncio.ensure_future(
+                    anext(pipeline_status_iterator)
+                )
+            if (
+                pending_pipeline_status is not None
+                and time.monotonic() >= next_emission_time
+            ):
+                pipeline_status_update = encoder.encode(pending_pipeline_status)
+                pending_pipeline_status = None
+                if pipeline_status_update is not None:
+                    next_emission_time = time.monotonic() + emission_interval
+                    yield pipeline_status_update
+    finally:
+        next_pipeline_status.cancel()
+    if pending_pipeline_status is not None:
+        pipeline_status_update = encoder.encode(pending_pipeline_status)
+        if pipeline_status_update is not None:
+            yield pipeline_status_update
+
+
+async def iterate_config_incremental(
+    pipeline_server_stub: PipelineServerStub, internal_config: InternalConfig
+) -> AsyncIterator[PipelineStatus]:
+    """Runs a pipeline with `PipelineServerStub.iterate_config_incremental(...)` and reconstructs complete status snapshots.
+
+    Args:
+        pipeline_server_stub (PipelineServerStub): Stub of the pipeline server.
+        internal_config (InternalConfig): The pipeline configuration.
+
+    Returns:
+        AsyncIterator[PipelineStatus]: Iterator with a reconstructed snapshot per received update, the yielded object is modified by later updates.
+    """
+    reconstructor = PipelineStatusReconstructor()
+    async for pipeline_status_update in pipeline_server_stub.iterate_config_incremental(
+        internal_config
+    ):
+        yield reconstructor.apply(pipeline_status_update)
@@ -0,0 +1,393 @@
+import math
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional
+
+import betterproto
+from evalquiz_proto.shared.generated import (
+    Batch,
+    Capability,
+    CourseSettings,
+    EducationalObjective,
+    EvaluationResult,
+    EvaluationResultType,
+    GenerationResult,
+    LanguageModelEvaluation,
+    Metric,
+    QuestionType,
+    Relationship,
+)
+from evalquiz_proto.shared.lru_cache import LRUCache
+
+GENERATION_INSTRUCTIONS = (
+    "You generate exam questions for a university course. "
+    "Every question has to be answerable with the lecture materials and has to train the given capabilities.\n\n"
+)
+"""Instructions at the start of every generation prompt, they are the same for all batches."""
+
+RESULT_FORMATS = {
+    QuestionType.MULTIPLE_CHOICE: (
+        "Generate a multiple choice question with exactly one answer and at least one distractor. "
+        "Answer with a <result></result> section in the following format, with one line per distractor:\n"
+        "<result>\nQuestion: <question text>\nAnswer: <answer text>\nDistractor: <distractor text>\n</result>"
+    ),
+    QuestionType.MULTIPLE_RESPONSE: (
+        "Generate a multiple response question with at least one answer and at least one distractor. "
+        "Answer with a <result></result> section in the following format, with one line per answer and distractor:\n"
+        "<result>\nQuestion: <question text>\nAnswer: <answer text>\nDistractor: <distractor text>\n</result>"
+    ),
+}
+"""Per-question suffix of generation prompts by QuestionType."""
+
+
+def estimate_token_count(text: str) -> int:
+    """Estimates the amount of tokens of a text, assuming four characters per token.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated amount of tokens.
+    """
+    return math.ceil(len(text) / 4)
+
+
+def render_capability(capability: Capability) -> str:
+    """Renders a Capability as text for a prompt.
+
+    Args:
+        capability (Capability): The Capability.
+
+    Returns:
+        str: The rendered Capability.
+    """
+    educational_objective = (
+        EducationalObjective(capability.educational_objective).name or ""
+    )
+    relationship = Relationship(capability.relationship).name or ""
+    return (
+        ", ".join(capability.keywords)
+        + f" (educational objective: {educational_objective.lower().replace('_', ' ')}"
+        + f", relationship: {relationship.lower()})"
+    )
+
+
+def render_generation_result(generation_result: GenerationResult) -> str:
+    """Renders a GenerationResult as text for a prompt, in the line format of generation results.
+
+    Args:
+        generation_result (GenerationResult): The GenerationResult.
+
+    Returns:
+        str: The rendered GenerationResult.
+    """
+    field_name, _ = betterproto.which_one_of(generation_result, "generation_result")
+    if field_name == "multiple_choice":
+        multiple_choice = generation_result.multiple_choice
+        lines = [
+            f"Question: {multiple_choice.question_text}",
+            f"Answer: {multiple_choice.answer_text}",
+        ]
+        lines.extend(
+            f"Distractor: {distractor}"
+            for distractor in multiple_choice.distractor_text
+        )
+    elif field_name == "multiple_response":
+        multiple_response = generation_result.multiple_response
+        lines = [f"Question: {multiple_response.question_text}"]
+        lines.extend(f"Answer: {answer}" for answer in multiple_response.answer_texts)
+        lines.extend(
+            f"Distractor: {distractor}"
+            for distractor in multiple_response.distractor_texts
+        )
+    else:
+        lines = []
+    return "\n".join(lines)
+
+
+def render_evaluation_result(evaluation_result: EvaluationResult) -> str:
+    """Renders an EvaluationResult as the content of a result section.
+
+    Args:
+        evaluation_result (EvaluationResult): The EvaluationResult.
+
+    Returns:
+        str: The rendered EvaluationResult.
+    """
+    _, value = betterproto.which_one_of(evaluation_result, "evaluation_result")
+    return "" if value is None else str(value)
+
+
+def describe_evaluation_result_type(
+    evaluation_result_type: EvaluationResultType,
+) -> str:
+    """Describes the expected result of an evaluation for a prompt.
+
+    Args:
+        evaluation_result_type (EvaluationResultType): The expected type of the result.
+
+    Returns:
+        str: The description.
+    """
+    field_name, _ = betterproto.which_one_of(
+        evaluation_result_type, "evaluation_result_type"
+    )
+    if field_name == "value_range":
+        value_range = evaluation_result_type.value_range
+        return (
+            f"a number between {value_range.lower_bound} and {value_range.upper_bound}"
+        )
+    if field_name == "categorical":
+        categories = ", ".join(evaluation_result_type.categorical.categories)
+        return f"one of the categories {categories}"
+    return "a text"
+
+
+@dataclass(frozen=True)
+class CompiledPrefix:
+    """The static part of prompts, that is shared by all questions of a Batch or a (Batch, Metric) pair.
+
+    Attributes:
+        text (str): The rendered prefix.
+        token_count (int): The amount of tokens of text.
+    """
+
+    text: str
+    token_count: int
+
+
+class PromptCompiler:
+    """Compiles generation and evaluation prompts from a cached static prefix and a per-question suffix.
+
+    Prefixes are ordered from the least to the most specific part, so that prompts share the longest possible
+    prefix for model-side prefix caching: instructions or metric definition, course settings, batch capabilities.
+    Token counts of prefixes and suffixes are counted to make prompt construction cost and cache efficiency measurable.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 1024,
+        count_tokens: Callable[[str], int] = estimate_token_count,
+    ) -> None:
+        """Constructor of PromptCompiler.
+
+        Args:
+            cache_size (int, optional): The maximum amount of cached prefixes. Defaults to 1024.
+            count_tokens (Callable[[str], int], optional): Counts the tokens of a text, e.g. with the tokenizer of the model. Defaults to estimate_token_count.
+        """
+        self.prefixes: LRUCache[Hashable, CompiledPrefix] = LRUCache(cache_size)
+        self.count_tokens = count_tokens
+        self.prompt_count = 0
+        self.prefix_tokens = 0
+        self.suffix_tokens = 0
+        self.rendered_prefix_tokens = 0
+
+    def get_generation_prefix(
+        self, batch: Batch, course_settings: Optional[CourseSettings] = None
+    ) -> CompiledPrefix:
+        """Retrieves or renders the prefix of the generation prompts of a batch.
+
+        Args:
+            batch (Batch): The batch.
+            course_settings (Optional[CourseSettings], optional): Course settings of the InternalConfig. Defaults to None.
+
+        Returns:
+            CompiledPrefix: The prefix.
+        """
+        key = (
+            "generation",
+            (
+                None
+                if course_settings is None
+                else (
+                    self._get_capabilities_key(course_settings.course_goals),
+                    self._get_capabilities_key(course_settings.required_capabilites),
+                    self._get_capabilities_key(
+                        course_settings.advantageous_capabilities
+                    ),
+                )
+            ),
+            self._get_capabilities_key(batch.capabilites),
+        )
+        compiled_prefix = self.prefixes.get(key)
+        if compiled_prefix is not None:
+            return compiled_prefix
+        sections = [GENERATION_INSTRUCTIONS]
+        if course_settings is not None:
+            for title, capabilities in [
+                ("Course goals", course_settings.course_goals),
+                ("Required capabilities", course_settings.required_capabilites),
+                (
+                    "Advantageous capabilities",
+                    course_settings.advantageous_capabilities,
+                ),
+            ]:
+                if capabilities:
+                    sections.append(self._render_capabilities(title, capabilities))
+        sections.append(
+            self._render_capabilities(
+                "Capabilities of the questions", batch.capabilites
+            )
+        )
+        return self._put_prefix(key, "".join(sections))
+
+    def get_evaluation_prefix(self, batch: Batch, metric: Metric) -> CompiledPrefix:
+        """Retrieves or renders the prefix of the evaluation prompts of a metric on a batch.
+
+        Args:
+            batch (Batch): The batch.
+            metric (Metric): The metric.
+
+        Raises:
+            ValueError: If the metric is not a LanguageModelEvaluation.
+
+        Returns:
+            CompiledPrefix: The prefix.
+        """
+        field_name, _ = betterproto.which_one_of(metric.evaluation, "evaluation")
+        if field_name != "language_model_evaluation":
+            raise ValueError(
+                f"Metric {metric.reference} is not a language model evaluation."
+            )
+        language_model_evaluation = metric.evaluation.language_model_evaluation
+        key = (
+            "evaluation",
+            self._get_language_model_evaluation_key(language_model_evaluation),
+            self._get_capabilities_key(batch.capabilites),
+        )
+        compiled_prefix = self.prefixes.get(key)
+        if compiled_prefix is not None:
+            return compiled_prefix
+        sections = [
+            language_model_evaluation.evaluation_description + "\n\n",
+            "The evaluation of a question is "
+            + describe_evaluation_result_type(
+                language_model_evaluation.evaluation_result_type
+            )
+            + ".\n\n",
+        ]
+        for few_shot_example in language_model_evaluation.few_shot_examples:
+            sections.append(
+                "Example:\n"
+                + render_generation_result(few_shot_example.generation_result)
+                + "\n<result>"
+                + render_evaluation_result(few_shot_example.evaluation_result)
+                + "</result>\n\n"
+            )
+        sections.append(
+            self._render_capabilities(
+                "Capabilities of the questions", batch.capabilites
+            )
+        )
+        return self._put_prefix(key, "".join(sections))
+
+    def compile(self, compiled_prefix: CompiledPrefix, suffix: str) -> str:
+        """Appends the per-question suffix to a prefix and counts the tokens of the prompt.
+
+        Args:
+            compiled_prefix (CompiledPrefix): The prefix.
+            suffix (str): The per-question part of the prompt.
+
+        Returns:
+            str: The prompt.
+        """
+        self.prompt_count += 1
+        self.prefix_tokens += compiled_prefix.token_count
+        self.suffix_tokens += self.count_tokens(suffix)
+        return compiled_prefix.text + suffix
+
+    def compile_generation_prompt(
+        self,
+        batch: Batch,
+        question_type: QuestionType,
+        course_settings: Optional[CourseSettings] = None,
+    ) -> str:
+        """Compiles the prompt of a question of a batch.
+
+        Args:
+            batch (Batch): The batch.
+            question_type (QuestionType): Type of the generated question.
+            course_settings (Optional[CourseSettings], optional): Course settings of the InternalConfig. Defaults to None.
+
+        Returns:
+            str: The prompt.
+        """
+        return self.compile(
+            self.get_generation_prefix(batch, course_settings),
+            RESULT_FORMATS[question_type],
+        )
+
+    def _put_prefix(self, key: Hashable, text: str) -> CompiledPrefix:
+        """Caches a rendered prefix with its token count.
+
+        Returns:
+            CompiledPrefix: The prefix.
+        """
+        compiled_prefix = CompiledPrefix(text, self.count_tokens(text))
+        self.rendered_prefix_tokens += compiled_prefix.token_count
+        self.prefixes.put(key, compiled_prefix)
+        return compiled_prefix
+
+    @staticmethod
+    def _get_capabilities_key(capabilities: list[Capability]) -> Hashable:
+        """Creates a cache key of capabilities, that is cheaper to compute than a digest of their serialization.
+
+        Returns:
+            Hashable: The key.
+        """
+        return tuple(
+            (
+                tuple(capability.keywords),
+                int(capability.educational_objective),
+                int(capability.relationship),
+            )
+            for capability in capabilities
+        )
+
+    @staticmethod
+    def _get_language_model_evaluation_key(
+        language_model_evaluation: LanguageModelEvaluation,
+    ) -> Hashable:
+        """Creates a cache key of a LanguageModelEvaluation, that is cheaper to compute than a digest of its serialization.
+
+        Returns:
+            Hashable: The key.
+        """
+        evaluation_result_type = language_model_evaluation.evaluation_result_type
+        field_name, _ = betterproto.which_one_of(
+            evaluation_result_type, "evaluation_result_type"
+        )
+        if field_name == "value_range":
+            evaluation_result_type_key: Hashable = (
+                field_name,
+                evaluation_result_type.value_range.lower_bound,
+                evaluation_result_type.value_range.upper_bound,
+            )
+        elif field_name == "categorical":
+            evaluation_result_type_key = (
+                field_name,
+                tuple(evaluation_result_type.categorical.categories),
+            )
+        else:
+            evaluation_result_type_key = field_name
+        return (
+            language_model_evaluation.model,
+            language_model_evaluation.evaluation_description,
+            evaluation_result_type_key,
+            tuple(
+                (
+                    render_generation_result(few_shot_example.generation_result),
+                    render_evaluation_result(few_shot_example.evaluation_result),
+                )
+                for few_shot_example in language_model_evaluation.few_shot_examples
+            ),
+        )
+
+    @staticmethod
+    def _render_capabilities(title: str, capabilities: list[Capability]) -> str:
+        return (
+            f"{title}:\n"
+            + "".join(
+                f"- {render_capability(capability)}\n" for capability in capabilities
+            )
+            + "\n"
+        )
@@ -0,0 +1,589 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import betterproto
+from blake3 import blake3
+from pymongo import ASCENDING, MongoClient, UpdateOne
+from evalquiz_proto.shared.generated import (
+    Batch,
+    CacheStatistics,
+    Capability,
+    EvaluationResult,
+    GenerationResult,
+    GenerationSettings,
+    LectureMaterial,
+    Metric,
+    Mode,
+    QuestionType,
+)
+from evalquiz_proto.shared.lru_cache import LRUCache
+
+GENERATION_CACHE_KEY_VERSION = 1
+"""Version of the inputs that make up a generation digest, increment it to invalidate all cached generation results."""
+
+EVALUATION_CACHE_KEY_VERSION = 1
+"""Version of the inputs that make up an evaluation digest, increment it to invalidate all cached evaluation results."""
+
+DEFAULT_TTL = 30 * 24 * 60 * 60.0
+"""The default time to live of cached results in seconds."""
+
+
+def get_digest(inputs: Any) -> str:
+    """Calculates the canonical digest of JSON-compatible inputs.
+    Mappings are serialized with sorted keys, so equal inputs have equal digests independent of insertion order.
+
+    Args:
+        inputs (Any): JSON-compatible inputs.
+
+    Returns:
+        str: The BLAKE3 hex digest.
+    """
+    canonical_inputs = json.dumps(
+        inputs, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return blake3(canonical_inputs.encode()).hexdigest()
+
+
+class ResultCache:
+    """Caches serialized results by digest in an in-memory LRU front and a MongoDB collection.
+
+    Eviction rules:
+        - Entries expire ttl seconds after they were stored, using a MongoDB TTL index.
+          Expired entries are never returned, even before the TTL monitor removed them.
+        - The collection holds about max_entries entries, the least recently used entries beyond max_entries
+          are removed every eviction_interval writes.
+        - The front holds at most front_size entries and evicts the least recently used entry first.
+    """
+
+    def __init__(
+        self,
+        mongodb_client: MongoClient[dict[str, Any]],
+        collection_name: str,
+        mongodb_database: str = "local_path_db",
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_entries: Optional[int] = 10**6,
+        front_size: int = 4096,
+        eviction_interval: int = 1000,
+    ) -> None:
+        """Constructor of ResultCache.
+
+        Args:
+            mongodb_client (MongoClient[dict[str, Any]]): A pymongo client to enable communication with a MongoDB server.
+            collection_name (str): The collection of the cached results.
+            mongodb_database (str, optional): The database of the collection. Defaults to "local_path_db".
+            ttl (Optional[float], optional): Seconds until an entry expires, entries do not expire if None. Defaults to DEFAULT_TTL.
+            max_entries (Optional[int], optional): The amount of entries kept in the collection, the collection is not bounded if None. Defaults to 10**6.
+            front_size (int, optional): The maximum amount of entries in memory. Defaults to 4096.
+            eviction_interval (int, optional): The amount of writes between size evictions. Defaults to 1000.
+        """
+        self.results = mongodb_client[mongodb_database][collection_name]
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.eviction_interval = eviction_interval
+        self.front: LRUCache[str, tuple[float, bytes]] = LRUCache(front_size)
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self.results.create_index("expires_at", expireAfterSeconds=0)
+        self.results.create_index("accessed_at")
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Retrieves a cached result.
+
+        Args:
+            digest (str): Digest of the inputs of the result.
+
+        Returns:
+            Optional[bytes]: The serialized result or None, if it is not cached or expired.
+        """
+        return self.get_many([digest]).get(digest)
+
+    def get_many(self, digests: list[str]) -> dict[str, bytes]:
+        """Retrieves multiple cached results with a single query for the entries that are not in the front.
+        Hits and misses are counted per requested digest.
+
+        Args:
+            digests (list[str]): Digests of the inputs of the results.
+
+        Returns:
+            dict[str, bytes]: Serialized results by digest, digests of missing or expired results are omitted.
+        """
+        now = time.time()
+        unique_digests = list(dict.fromkeys(digests))
+        cached_results: dict[str, bytes] = {}
+        missing_digests = []
+        for digest in unique_digests:
+            front_entry = self.front.get(digest)
+            if front_entry is not None and front_entry[0] > now:
+                cached_results[digest] = front_entry[1]
+            else:
+                missing_digests.append(digest)
+        if missing_digests:
+            current_datetime = datetime.now(timezone.utc)
+            for mongodb_document in self.results.find(
+                {
+                    "_id": {"$in": missing_digests},
+                    "expires_at": {"$gt": current_datetime},
+                }
+            ):
+                digest = mongodb_document["_id"]
+                cached_results[digest] = mongodb_document["result"]
+                expires_at = mongodb_document["expires_at"]
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                self.front.put(digest, (expires_at.timestamp(), cached_results[digest]))
+            found_digests = [
+                digest for digest in missing_digests if digest in cached_results
+            ]
+            if found_digests:
+                self.results.update_many(
+                    {"_id": {"$in": found_digests}},
+                    {"$set": {"accessed_at": current_datetime}},
+                )
+        hits = sum(digest in cached_results for digest in digests)
+        self.hits += hits
+        self.misses += len(digests) - hits
+        return cached_results
+
+    def put(self, digest: str, result: bytes) -> None:
+        """Caches a result.
+
+        Args:
+            digest (str): Digest of the inputs of the result.
+            result (bytes): The serialized result.
+        """
+        self.put_many({digest: result})
+
+    def put_many(self, results: dict[str, bytes]) -> None:
+        """Caches multiple results with a single bulk write.
+
+        Args:
+            results (dict[str, bytes]): Serialized results by digest.
+        """
+        if not results:
+            return
+        current_datetime = datetime.now(timezone.utc)
+        expires_at = (
+            datetime.max.replace(tzinfo=timezone.utc)
+            if self.ttl is None
+            else current_datetime + timedelta(seconds=self.ttl)
+        )
+        self.results.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": digest},
+                    {
+                        "$set": {
+                            "result": result,
+                            "expires_at": expires_at,
+                            "accessed_at": current_datetime,
+                        }
+                    },
+                    upsert=True,
+                )
+                for digest, result in results.items()
+            ],
+            ordered=False,
+        )
+        for digest, result in results.items():
+            self.front.put(digest, (expires_at.timestamp(), result))
+        self._writes_since_eviction += len(results)
+        if self._writes_since_eviction >= self.eviction_interval:
+            self.evict()
+
+    def evict(self) -> int:
+        """Removes the least recently used entries beyond max_entries from the collection.
+        Entries in the front are kept, their accessed_at is not updated on front hits.
+
+        Returns:
+            int: The amount of removed entries.
+        """
+        self._writes_since_eviction = 0
+        if self.max_entries is None:
+            return 0
+        excess = self.results.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return 0
+        evicted_digests = [
+            mongodb_document["_id"]
+            for mongodb_document in self.results.find({}, {"_id": 1})
+            .sort("accessed_at", ASCENDING)
+            .limit(excess)
+            if mongodb_document["_id"] not in self.front
+        ]
+        return self.results.delete_many({"_id": {"$in": evicted_digests}}).deleted_count
+
+    def get_statistics(self) -> CacheStatistics:
+        """Returns the hits and misses of the cache, e.g. for `PipelineStatus`.
+
+        Returns:
+            CacheStatistics: Hits and misses since the cache was created.
+        """
+        return CacheStatistics(hits=self.hits, misses=self.misses)
+
+    def invalidate(self, digests: list[str]) -> None:
+        """Removes cached results.
+
+        Args:
+            digests (list[str]): Digests of the removed results.
+        """
+        for digest in digests:
+            self.front.pop(digest)
+        self.results.delete_many({"_id": {"$in": digests}})
+
+
+def uses_cache(mode: Optional[Mode]) -> bool:
+    """Checks whether cached results may be used in a Mode.
+    `Complete`, which is also the default, uses cached results. `Overwrite` and `ByMetrics` regenerate results.
+
+    Args:
+        mode (Optional[Mode]): The mode of the generation or evaluation.
+
+    Returns:
+        bool: True, if cached results may be used.
+    """
+    if mode is None:
+        return True
+    field_name, _ = betterproto.which_one_of(mode, "mode")
+    return field_name in ("", "complete")
+
+
+class GenerationResultCache:
+    """Caches GenerationResults of questions by a canonical digest of their generation inputs:
+    The set of lecture material hashes with their page filters, the capability list of the batch,
+    the question type and the model of the generation settings.
+    """
+
+    def __init__(self, result_cache: ResultCache) -> None:
+        """Constructor of GenerationResultCache.
+
+        Args:
+            result_cache (ResultCache): Stores the serialized GenerationResults.
+        """
+        self.result_cache = result_cache
+
+    @staticmethod
+    def get_generation_digest(
+        lecture_materials: list[LectureMaterial],
+        capabilities: list[Capability],
+        question_type: QuestionType,
+        model: Optional[str],
+        occurrence: int = 0,
+    ) -> str:
+        """Calculates the canonical digest of the inputs of a generation.
+        References, urls and file types of lecture materials are not part of the digest, the hash identifies the contents.
+
+        Args:
+            lecture_materials (list[LectureMaterial]): Lecture materials of the batch, their order does not matter.
+            capabilities (list[Capability]): Capabilities of the batch, their order matters.
+            question_type (QuestionType): Type of the generated question.
+            model (Optional[str]): Model of the generation settings.
+            occurrence (int, optional): Counts the previous questions of the same type in the batch, so they are cached separately. Defaults to 0.
+
+        Returns:
+            str: The digest.
+        """
+        materials = sorted(
+            {
+                (
+                    lecture_material.hash,
+                    (
+                        -1
+                        if lecture_material.page_filter is None
+                        else lecture_material.page_filter.lower_bound
+                    ),
+                    (
+                        -1
+                        if lecture_material.page_filter is None
+                        else lecture_material.page_filter.upper_bound
+                    ),
+                )
+                for lecture_material in lecture_materials
+            }
+        )
+        return get_digest(
+            {
+                "version": GENERATION_CACHE_KEY_VERSION,
+                "lecture_materials": materials,
+                "capabilities": [
+                    {
+                        "keywords": capability.keywords,
+                        "educational_objective": int(capability.educational_objective),
+                        "relationship": int(capability.relationship),
+                    }
+                    for capability in capabilities
+                ],
+                "question_type": int(question_type),
+                "model": model,
+                "occurrence": occurrence,
+            }
+        )
+
+    def get_batch_digests(
+        self, batch: Batch, generation_settings: Optional[GenerationSettings]
+    ) -> list[str]:
+        """Calculates the digest of every question of a batch.
+        The n-th question of a question type in a batch has the same digest in every run with the same inputs.
+
+        Args:
+            batch (Batch): The batch.
+            generation_settings (Optional[GenerationSettings]): Generation settings of the InternalConfig.
+
+        Returns:
+            list[str]: Digests in order of `batch.question_to_generate`.
+        """
+        model = None if generation_settings is None else generation_settings.model
+        occurrences: dict[QuestionType, int] = {}
+        digests = []
+        for question in batch.question_to_generate:
+            occurrence = occurrences.get(question.question_type, 0)
+            occurrences[question.question_type] = occurrence + 1
+            digests.append(
+                self.get_generation_digest(
+                    batch.lecture_materials,
+                    batch.capabilites,
+                    question.question_type,
+                    model,
+                    occurrence,
+                )
+            )
+        return digests
+
+    def fill_from_cache(
+        self, batch: Batch, generation_settings: Optional[GenerationSettings]
+    ) -> list[int]:
+        """Sets cached GenerationResults on the questions of a batch that need to be generated.
+        With `Complete` mode, questions that already have a GenerationResult are kept and the others are looked up.
+        With `Overwrite` or `ByMetrics` mode, the cache is bypassed and every question needs to be generated.
+
+        Args:
+            batch (Batch): The batch, its questions are modified.
+            generation_settings (Optional[GenerationSettings]): Generation settings of the InternalConfig.
+
+        Returns:
+            list[int]: Indices of the questions that still need to be generated.
+        """
+        questions = batch.question_to_generate
+        if not uses_cache(
+            None if generation_settings is None else generation_settings.mode
+        ):
+            return list(range(len(questions)))
+        pending_indices = [
+            index
+            for index, question in enumerate(questions)
+            if question.generation_result is None
+        ]
+        if not pending_indices:
+            return []
+        digests = self.get_batch_digests(batch, generation_settings)
+        cached_results = self.result_cache.get_many(
+            [digests[index] for index in pending_indices]
+        )
+        missing_indices = []
+        for index in pending_indices:
+            cached_result = cached_results.get(digests[index])
+            if cached_result is None:
+                missing_indices.append(index)
+            else:
+                questions[index].generation_result = GenerationResult().parse(
+                    cached_result
+                )
+        return missing_indices
+
+    def store(
+        self,
+        batch: Batch,
+        generation_settings: Optional[GenerationSettings],
+        indices: Optional[list[int]] = None,
+    ) -> None:
+        """Caches the GenerationResults of the questions of a batch, also in `Overwrite` mode.
+
+        Args:
+            batch (Batch): The batch with generated questions.
+            generation_settings (Optional[GenerationSettings]): Generation settings of the InternalConfig.
+            indices (Optional[list[int]], optional): Indices of the stored questions, e.g. the return value of `fill_from_cache(...)`. Defaults to all questions.
+        """
+        questions = batch.question_to_generate
+        if indices is None:
+            indices = list(range(len(questions)))
+        digests = self.get_batch_digests(batch, generation_settings)
+        self.result_cache.put_many(
+            {
+                digests[index]: bytes(generation_result)
+                for index in indices
+                if (generation_result := questions[index].generation_result) is not None
+            }
+        )
+
+
+class EvaluationResultCache:
+    """Caches the EvaluationResults of LanguageModelEvaluation metrics by the digest of the GenerationResult and the metric definition.
+    The metric definition consists of model, evaluation description, few-shot examples and EvaluationResultType, the metric reference is not part of it.
+    """
+
+    def __init__(self, result_cache: ResultCache) -> None:
+        """Constructor of EvaluationResultCache.
+
+        Args:
+            result_cache (ResultCache): Stores the serialized EvaluationResults.
+        """
+        self.result_cache = result_cache
+
+    @staticmethod
+    def get_metric_digest(metric: Metric) -> Optional[str]:
+        """Calculates the canonical digest of a metric definition.
+        The serialization of LanguageModelEvaluation is deterministic, as it does not contain maps.
+
+        Args:
+            metric (Metric): The metric.
+
+        Returns:
+            Optional[str]: The digest, None if the metric is not a LanguageModelEvaluation.
+        """
+        field_name, _ = betterproto.which_one_of(metric.evaluation, "evaluation")
+        if field_name != "language_model_evaluation":
+            return None
+        language_model_evaluation = metric.evaluation.language_model_evaluation
+        return get_digest(
+            {
+                "version": EVALUATION_CACHE_KEY_VERSION,
+                "language_model_evaluation": bytes(language_model_evaluation).hex(),
+            }
+        )
+
+    @staticmethod
+    def get_evaluation_digest(
+        generation_result: GenerationResult, metric_digest: str
+    ) -> str:
+        """Calculates the canonical digest of an evaluation.
+
+        Args:
+            generation_result (GenerationResult): The evaluated GenerationResult.
+            metric_digest (str): Digest of the metric definition, see `get_metric_digest(...)`.
+
+        Returns:
+            str: The digest.
+        """
+        return get_digest(
+            {
+                "generation_result": bytes(generation_result).hex(),
+                "metric": metric_digest,
+            }
+        )
+
+    def _get_evaluation_digests(
+        self, batch: Batch, metrics: list[Metric]
+    ) -> dict[tuple[int, str], str]:
+        """Calculates the digests of all cacheable evaluations of a batch.
+
+        Returns:
+            dict[tuple[int, str], str]: Digests by question index and metric reference.
+        """
+        metric_digests = {
+            metric.reference: metric_digest
+            for metric in metrics
+            if (metric_digest := self.get_metric_digest(metric)) is not None
+        }
+        return {
+            (index, reference): self.get_evaluation_digest(
+                question.generation_result, metric_digest
+            )
+            for index, question in enumerate(batch.question_to_generate)
+            if question.generation_result is not None
+            for reference, metric_digest in metric_digests.items()
+        }
+
+    def fill_from_cache(
+        self, batch: Batch, metrics: list[Metric]
+    ) -> list[tuple[int, Metric]]:
+        """Sets cached EvaluationResults in `Question.evaluation_results` for the evaluations that need to be done.
+        The mode of each metric is respected: With `Complete` mode, existing EvaluationResults are kept and the others are looked up.
+        With `Overwrite` or `ByMetrics` mode, the cache is bypassed and the metric is evaluated on every question.
+        Questions without GenerationResult are not evaluated.
+
+        Args:
+            batch (Batch): The batch, its questions are modified.
+            metrics (list[Metric]): Metrics of the EvaluationSettings.
+
+        Returns:
+            list[tuple[int, Metric]]: Question indices and metrics of the evaluations that still need to be done.
+        """
+        questions = batch.question_to_generate
+        evaluation_digests = self._get_evaluation_digests(batch, metrics)
+        pending_evaluations = []
+        cacheable_evaluations = []
+        for index, question in enumerate(questions):
+            if question.generation_result is None:
+                continue
+            for metric in metrics:
+                if not uses_cache(metric.mode):
+                    pending_evaluations.append((index, metric))
+                elif metric.reference in question.evaluation_results:
+                    continue
+                elif (index, metric.reference) in evaluation_digests:
+                    cacheable_evaluations.append((index, metric))
+                else:
+                    pending_evaluations.append((index, metric))
+        cached_results = self.result_cache.get_many(
+            [
+                evaluation_digests[(index, metric.reference)]
+                for index, metric in cacheable_evaluations
+            ]
+        )
+        for index, metric in cacheable_evaluations:
+            cached_result = cached_results.get(
+                evaluation_digests[(index, metric.reference)]
+            )
+            if cached_result is None:
+                pending_evaluations.append((index, metric))
+            else:
+                questions[index].evaluation_results[
+                    metric.reference
+                ] = EvaluationResult().parse(cached_result)
+        metric_positions = {
+            metric.reference: position for position, metric in enumerate(metrics)
+        }
+        return sorted(
+            pending_evaluations,
+            key=lambda pending_evaluation: (
+                pending_evaluation[0],
+                metric_positions[pending_evaluation[1].reference],
+            ),
+        )
+
+    def store(
+        self,
+        batch: Batch,
+        metrics: list[Metric],
+        evaluations: Optional[list[tuple[int, Metric]]] = None,
+    ) -> None:
+        """Caches the EvaluationResults of a batch, also for metrics in `Overwrite` mode.
+
+        Args:
+            batch (Batch): The batch with evaluated questions.
+            metrics (list[Metric]): Metrics of the EvaluationSettings.
+            evaluations (Optional[list[tuple[int, Metric]]], optional): Question indices and metrics of the stored evaluations,
+                e.g. the return value of `fill_from_cache(...)`. Defaults to all evaluations.
+        """
+        questions = batch.question_to_generate
+        evaluation_digests = self._get_evaluation_digests(batch, metrics)
+        keys = (
+            list(evaluation_digests)
+            if evaluations is None
+            else [(index, metric.reference) for index, metric in evaluations]
+        )
+        self.result_cache.put_many(
+            {
+                evaluation_digests[(index, reference)]: bytes(evaluation_result)
+                for index, reference in keys
+                if (index, reference) in evaluation_digests
+                and (
+                    evaluation_result := questions[index].evaluation_results.get(
+                        reference
+                    )
+                )
+                is not None
+            }
+        )
@@ -0,0 +1,249 @@
+from typing import AsyncIterator, Optional
+
+from evalquiz_proto.shared.exceptions import (
+    ResultSectionNotFoundException,
+    ResultSectionNotParsableException,
+)
+from evalquiz_proto.shared.generated import (
+    GenerationResult,
+    MultipleChoice,
+    MultipleResponse,
+    QuestionType,
+)
+
+RESULT_START_TAG = "<result>"
+RESULT_END_TAG = "</result>"
+
+_LABELS = ("Question:", "Answer:", "Distractor:")
+
+
+class ResultSectionParser:
+    """Parses a `<result></result>` section incrementally from streamed model output and validates it against a QuestionType.
+
+    The section consists of one `Question:` line, followed by `Answer:` and `Distractor:` lines,
+    see `prompt_templates.RESULT_FORMATS`. Lines without label continue the text of the previous line.
+    Structurally invalid output raises as soon as the offending line is complete, so generation can be aborted early.
+    """
+
+    def __init__(
+        self,
+        question_type: QuestionType,
+        max_preamble_length: Optional[int] = 2000,
+        max_section_length: Optional[int] = 8000,
+    ) -> None:
+        """Constructor of ResultSectionParser.
+
+        Args:
+            question_type (QuestionType): The expected type of the generated question.
+            max_preamble_length (Optional[int], optional): The maximum amount of characters before the start tag, unbounded if None. Defaults to 2000.
+            max_section_length (Optional[int], optional): The maximum amount of characters of the section, unbounded if None. Defaults to 8000.
+        """
+        self.question_type = question_type
+        self.max_preamble_length = max_preamble_length
+        self.max_section_length = max_section_length
+        self.consumed_characters = 0
+        self.is_complete = False
+        self._buffer = ""
+        self._preamble_length = 0
+        self._section_length = 0
+        self._in_section = False
+        self._question_text: Optional[str] = None
+        self._answer_texts: list[str] = []
+        self._distractor_texts: list[str] = []
+        self._last_label: Optional[str] = None
+
+    def feed(self, text: str) -> bool:
+        """Consumes the next chunk of streamed model output.
+
+        Args:
+            text (str): The chunk, e.g. a token.
+
+        Raises:
+            ResultSectionNotFoundException: If the start tag does not appear within max_preamble_length characters.
+            ResultSectionNotParsableException: If the section does not match the QuestionType or exceeds max_section_length characters.
+
+        Returns:
+            bool: True, if the end tag was seen and the section is complete. Further chunks are ignored.
+        """
+        if self.is_complete:
+            return True
+        self.consumed_characters += len(text)
+        self._buffer += text
+        if not self._in_section:
+            start = self._buffer.find(RESULT_START_TAG)
+            if start == -1:
+                kept_length = len(RESULT_START_TAG) - 1
+                self._preamble_length += max(0, len(self._buffer) - kept_length)
+                self._buffer = self._buffer[-kept_length:]
+                if (
+                    self.max_preamble_length is not None
+                    and self._preamble_length > self.max_preamble_length
+                ):
+                    raise ResultSectionNotFoundException(
+                        f"No result section within {self.max_preamble_length} characters."
+                    )
+                return False
+            self._in_section = True
+            self._buffer = self._buffer[start + len(RESULT_START_TAG) :]
+            self._section_length = 0
+        end = self._buffer.find(RESULT_END_TAG)
+        section_text = self._buffer if end == -1 else self._buffer[:end]
+        *lines, remainder = section_text.split("\n")
+        for line in lines:
+            self._parse_line(line)
+        self._section_length += len(section_text) - len(remainder)
+        if (
+            self.max_section_length is not None
+            and self._section_length + len(remainder) > self.max_section_length
+        ):
+            raise ResultSectionNotParsableException(
+                f"The result section exceeds {self.max_section_length} characters."
+            )
+        if end == -1:
+            self._buffer = remainder
+            return False
+        self._parse_line(remainder)
+        self._buffer = ""
+        self.is_complete = True
+        return True
+
+    def finish(self) -> GenerationResult:
+        """Validates the complete section and creates the GenerationResult.
+
+        Raises:
+            ResultSectionNotFoundException: If the start or end tag has not been seen.
+            ResultSectionNotParsableException: If the section misses a question, answer or distractor.
+
+        Returns:
+            GenerationResult: The parsed GenerationResult.
+        """
+        if not self.is_complete:
+            raise ResultSectionNotFoundException(
+                "The output ended before the result section was complete."
+            )
+        if not self._question_text:
+            raise ResultSectionNotParsableException("The question text is missing.")
+        if not self._answer_texts or not self._distractor_texts:
+            raise ResultSectionNotParsableException(
+                "At least one answer and one distractor are required."
+            )
+        if self.question_type == QuestionType.MULTIPLE_CHOICE:
+            return GenerationResult(
+                multiple_choice=MultipleChoice(
+                    question_text=self._question_text,
+                    answer_text=self._answer_texts[0],
+                    distractor_text=self._distractor_texts,
+                )
+            )
+        return GenerationResult(
+            multiple_response=MultipleResponse(
+                question_text=self._question_text,
+                answer_texts=self._answer_texts,
+                distractor_texts=self._distractor_texts,
+            )
+        )
+
+    def _parse_line(self, line: str) -> None:
+        """Validates a complete line of the section and adds its text.
+
+        Raises:
+            ResultSectionNotParsableException: If the line does not match the QuestionType at its position.
+        """
+        stripped_line = line.strip()
+        if not stripped_line:
+            return
+        label = next(
+            (label for label in _LABELS if stripped_line.startswith(label)), None
+        )
+        if label is None:
+            if self._last_label is None:
+                raise ResultSectionNotParsableException(
+                    "The result section has to start with the question."
+                )
+            self._append_continuation(stripped_line)
+            return
+        text = stripped_line[len(label) :].strip()
+        if label == "Question:":
+            if self._question_text is not None:
+                raise ResultSectionNotParsableException(
+                    "The result section contains more than one question."
+                )
+            self._question_text = text
+        elif self._question_text is None:
+            raise ResultSectionNotParsableException(
+                "The result section has to start with the question."
+            )
+        elif label == "Answer:":
+            if (
+                self.question_type == QuestionType.MULTIPLE_CHOICE
+                and self._answer_texts
+            ):
+                raise ResultSectionNotParsableException(
+                    "A multiple choice question has exactly one answer."
+                )
+            self._answer_texts.append(text)
+        else:
+            self._distractor_texts.append(text)
+        self._last_label = label
+
+    def _append_continuation(self, text: str) -> None:
+        """Appends a line without label to the text of the previous line."""
+        if self._last_label == "Question:":
+            self._question_text = f"{self._question_text}\n{text}"
+        elif self._last_label == "Answer:":
+            self._answer_texts[-1] += f"\n{text}"
+        else:
+            self._distractor_texts[-1] += f"\n{text}"
+
+
+async def parse_result_stream(
+    chunks: AsyncIterator[str],
+    question_type: QuestionType,
+    max_preamble_length: Optional[int] = 2000,
+    max_section_length: Optional[int] = 8000,
+) -> GenerationResult:
+    """Parses the result section of streamed model output and stops consuming the stream as soon as the end tag is seen.
+    The stream is closed when parsing ends, early or with an exception, which cancels the generation of streaming model clients.
+
+    Args:
+        chunks (AsyncIterator[str]): Streamed model output, e.g. tokens.
+        question_type (QuestionType): The expected type of the generated question.
+        max_preamble_length (Optional[int], optional): The maximum amount of characters before the start tag, unbounded if None. Defaults to 2000.
+        max_section_length (Optional[int], optional): The maximum amount of characters of the section, unbounded if None. Defaults to 8000.
+
+    Raises:
+        ResultSectionNotFoundException: If the output does not contain a complete result section.
+        ResultSectionNotParsableException: If the result section does not match question_type.
+
+    Returns:
+        GenerationResult: The parsed GenerationResult.
+    """
+    parser = ResultSectionParser(question_type, max_preamble_length, max_section_length)
+    try:
+        async for chunk in chunks:
+            if parser.feed(chunk):
+                break
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return parser.finish()
+
+
+def parse_result_section(text: str, question_type: QuestionType) -> GenerationResult:
+    """Parses the result section of complete model output.
+
+    Args:
+        text (str): The model output.
+        question_type (QuestionType): The expected type of the generated question.
+
+    Raises:
+        ResultSectionNotFoundException: If text does not contain a complete result section.
+        ResultSectionNotParsableException: If the result section does not match question_type.
+
+    Returns:
+        GenerationResult: The parsed GenerationResult.
+    """
+    parser = ResultSectionParser(question_type, None, None)
+    parser.feed(text)
+    return parser.finish()
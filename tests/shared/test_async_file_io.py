@@ -0,0 +1,129 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+from blake3 import blake3
+from evalquiz_proto.shared.async_file_io import AsyncFileIO
+
+DISK_LATENCY = 0.05
+
+
+class SlowAsyncFileIO(AsyncFileIO):
+    """AsyncFileIO that simulates a slow disk by blocking every read and write."""
+
+    def _read(self, file_descriptor: int, size: int, offset: int) -> bytes:
+        time.sleep(DISK_LATENCY)
+        return super()._read(file_descriptor, size, offset)
+
+    def _write(
+        self, file_descriptor: int, data: bytes, hasher: Optional[blake3]
+    ) -> None:
+        time.sleep(DISK_LATENCY)
+        super()._write(file_descriptor, data, hasher)
+
+
+async def iterate(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def measure_max_latency(until: "asyncio.Future[Any]") -> float:
+    """Simulates small RPCs by repeatedly yielding to the event loop and measures the longest wait.
+
+    Args:
+        until (asyncio.Future[Any]): Measuring stops when until is done.
+
+    Returns:
+        float: Longest time in seconds that the event loop was not able to resume a small RPC.
+    """
+    max_latency = 0.0
+    while not until.done():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        max_latency = max(max_latency, time.perf_counter() - start - 0.001)
+    return max_latency
+
+
+def test_read_and_write_chunks(tmp_path: Path) -> None:
+    """Tests that streamed reads and writes preserve the file contents.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    file_io = AsyncFileIO(buffer_count=2)
+    content = os.urandom(10**5)
+    local_path = tmp_path / "material.bin"
+
+    async def write_and_read() -> bytes:
+        file_descriptor = os.open(local_path, os.O_WRONLY | os.O_CREAT)
+        hasher = blake3()
+        try:
+            await file_io.write_chunks(
+                file_descriptor,
+                iterate(*[content[i : i + 999] for i in range(0, len(content), 999)]),
+                hasher,
+            )
+        finally:
+            os.close(file_descriptor)
+        assert hasher.hexdigest() == blake3(content).hexdigest()
+        return b"".join(
+            [chunk async for chunk in file_io.read_chunks(local_path, 4096)]
+        )
+
+    assert asyncio.run(write_and_read()) == content
+    file_io.shutdown()
+
+
+def test_streams_do_not_block_event_loop(tmp_path: Path) -> None:
+    """Tests that small RPCs keep a low latency, while large streams are read from and written to a slow disk.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    file_io = SlowAsyncFileIO()
+    local_path = tmp_path / "material.bin"
+    local_path.write_bytes(os.urandom(20 * 1024))
+
+    async def stream() -> None:
+        async for _ in file_io.read_chunks(local_path, 1024):
+            pass
+        file_descriptor = os.open(tmp_path / "upload.bin", os.O_WRONLY | os.O_CREAT)
+        try:
+            await file_io.write_chunks(file_descriptor, iterate(*[b"x" * 1024] * 10))
+        finally:
+            os.close(file_descriptor)
+
+    async def stream_and_measure() -> float:
+        streams = asyncio.ensure_future(asyncio.gather(stream(), stream()))
+        max_latency = await measure_max_latency(streams)
+        await streams
+        return max_latency
+
+    assert asyncio.run(stream_and_measure()) < DISK_LATENCY / 2
+    file_io.shutdown()
+
+
+def test_read_mapped_chunks(tmp_path: Path) -> None:
+    """Tests that memory-mapped streaming yields the file contents and supports empty files.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    file_io = AsyncFileIO(buffer_count=2)
+    content = os.urandom(10**5)
+    local_path = tmp_path / "material.bin"
+    local_path.write_bytes(content)
+    empty_path = tmp_path / "empty.bin"
+    empty_path.touch()
+
+    async def read(local_path: Path) -> list[bytes]:
+        return [
+            bytes(chunk) async for chunk in file_io.read_mapped_chunks(local_path, 4096)
+        ]
+
+    chunks = asyncio.run(read(local_path))
+    assert max(len(chunk) for chunk in chunks) == 4096
+    assert b"".join(chunks) == content
+    assert asyncio.run(read(empty_path)) == []
+    file_io.shutdown()
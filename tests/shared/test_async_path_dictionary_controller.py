@@ -0,0 +1,103 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator
+import pytest
+from blake3 import blake3
+from evalquiz_proto.shared.async_path_dictionary_controller import (
+    AsyncPathDictionaryController,
+)
+from evalquiz_proto.shared.path_dictionary_controller import PathDictionaryController
+
+mongomock = pytest.importorskip("mongomock")
+
+
+async def iterate(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+def test_material_lifecycle(tmp_path: Path) -> None:
+    """Tests uploading, streaming, naming and deleting a material with AsyncPathDictionaryController.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    controller = AsyncPathDictionaryController(mongomock.MongoClient())
+
+    async def lifecycle() -> None:
+        hash = await controller.add_content_addressed_file_async(
+            tmp_path, "text/x-rst", iterate(b"Lecture", b" 1"), "Lecture 1"
+        )
+        assert hash == blake3(b"Lecture 1").hexdigest()
+        mimetype, iterator = await controller.get_file_from_hash_async(hash, 4)
+        assert mimetype == "text/x-rst"
+        assert [chunk async for chunk in iterator] == [b"Lect", b"ure ", b"1"]
+        assert await controller.get_material_hashes() == [hash]
+        assert [
+            page async for page in controller.iterate_material_hashes(page_size=1)
+        ] == [[hash]]
+        assert await controller.get_material_names([hash, "other"]) == {
+            hash: "Lecture 1"
+        }
+        await controller.delete_file(hash)
+        with pytest.raises(KeyError):
+            await controller.get_material_name(hash)
+        await controller.close()
+
+    asyncio.run(lifecycle())
+    assert os.listdir(tmp_path) == []
+
+
+def test_shares_state_with_path_dictionary_controller(tmp_path: Path) -> None:
+    """Tests that modifications are visible between sync and async controllers on the same database.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    mongodb_client = mongomock.MongoClient()
+    controller = PathDictionaryController(mongodb_client)
+    async_controller = AsyncPathDictionaryController(mongodb_client)
+    controller.load_file(tmp_path / "lecture.rst", "hash", "Lecture")
+
+    async def modify() -> None:
+        assert await async_controller.get_file_path_from_hash("hash") == (
+            tmp_path / "lecture.rst"
+        )
+        await async_controller.load_files(
+            [(tmp_path / "renamed.rst", "hash", "Renamed lecture")]
+        )
+        results = await asyncio.gather(
+            *[async_controller.get_material_name("hash") for _ in range(10)]
+        )
+        assert results == ["Renamed lecture"] * 10
+        await async_controller.close()
+
+    asyncio.run(modify())
+    assert controller.get_material_name("hash") == "Renamed lecture"
+
+
+def test_close_does_not_block_event_loop(tmp_path: Path) -> None:
+    """Tests that closing waits for pending MongoDB operations without blocking the event loop.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    controller = AsyncPathDictionaryController(mongomock.MongoClient())
+    (tmp_path / "deck.md").write_bytes(b"# Slide 1\n\n---\nSlide 2\n")
+
+    async def close() -> None:
+        await controller.load_file(tmp_path / "deck.md", "deck")
+        assert await controller.get_page_offsets_async("deck") == [0, 15, 23]
+        pending = asyncio.ensure_future(controller._run(time.sleep, 0.2))
+        closing = asyncio.create_task(controller.close())
+        ticks = 0
+        while not closing.done():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        await closing
+        assert pending.done()
+        assert ticks >= 10
+
+    asyncio.run(close())
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from evalquiz_proto.shared.batch_scheduler import BatchScheduler, BatchStep, TokenBucket
+from evalquiz_proto.shared.exceptions import PipelineExecutionException
+from evalquiz_proto.shared.generated import (
+    Batch,
+    CacheStatistics,
+    Capability,
+    InternalConfig,
+    ModuleStatus,
+    PipelineModule,
+    PipelineStatus,
+)
+from evalquiz_proto.shared.result_cache import ResultCache
+
+
+def convert_material(batch: Batch) -> Batch:
+    """CPU-bound step, defined at module level to be picklable."""
+    batch.capabilites.append(Capability(keywords=["converted"]))
+    return batch
+
+
+def create_batches(count: int) -> list[Batch]:
+    return [Batch(capabilites=[Capability(keywords=[str(i)])]) for i in range(count)]
+
+
+def test_batches_run_concurrently_and_fail_independently() -> None:
+    """Tests that batches run concurrently within the limit and that a failing batch does not affect the others."""
+    running = 0
+    max_running = 0
+
+    async def generate(batch: Batch) -> Batch:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        if batch.capabilites[0].keywords == ["3"]:
+            raise TimeoutError()
+        return batch
+
+    scheduler = BatchScheduler(
+        [BatchStep(PipelineModule(name="generation"), generate)],
+        max_concurrent_batches=4,
+    )
+    start = time.monotonic()
+    results = asyncio.run(scheduler.run_batches(create_batches(16)))
+    assert time.monotonic() - start < 16 * 0.02
+    assert max_running == 4
+    assert isinstance(results[3], PipelineExecutionException)
+    assert isinstance(results[3].__cause__, TimeoutError)
+    assert all(
+        isinstance(result, Batch) for index, result in enumerate(results) if index != 3
+    )
+
+
+def test_pipeline_execution_exceptions_are_returned_unchanged() -> None:
+    """Tests that PipelineExecutionExceptions raised by a step keep their own cause instead of becoming their cause."""
+    timeout_error = TimeoutError()
+
+    async def generate(batch: Batch) -> Batch:
+        raise PipelineExecutionException("Generation failed.") from timeout_error
+
+    scheduler = BatchScheduler([BatchStep(PipelineModule(name="generation"), generate)])
+    (result,) = asyncio.run(scheduler.run_batches(create_batches(1)))
+    assert isinstance(result, PipelineExecutionException)
+    assert str(result) == "Generation failed."
+    assert result.__cause__ is timeout_error
+
+
+def test_priorities_and_rate_limits() -> None:
+    """Tests that batches start by priority and that model requests are rate limited."""
+    started: list[str] = []
+
+    async def generate(batch: Batch) -> Batch:
+        started.append(batch.capabilites[0].keywords[0])
+        return batch
+
+    scheduler = BatchScheduler(
+        [BatchStep(PipelineModule(name="generation"), generate, model="gpt")],
+        max_concurrent_batches=1,
+        rate_limits={"gpt": TokenBucket(rate=50.0, capacity=2.0)},
+    )
+    start = time.monotonic()
+    asyncio.run(scheduler.run_batches(create_batches(6), priorities=[0, 1, 2, 2, 0, 5]))
+    assert started == ["5", "2", "3", "1", "0", "4"]
+    assert time.monotonic() - start >= 3 / 50.0
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run_batches(create_batches(2), priorities=[1]))
+
+
+def test_iterate_config_reports_status() -> None:
+    """Tests that snapshots report module transitions and that the last snapshot contains the output batches."""
+
+    async def fail(batch: Batch) -> Batch:
+        if batch.capabilites[0].keywords[0] == "1":
+            raise ValueError("Not parsable")
+        return batch
+
+    internal_config = InternalConfig(
+        material_server_urls=["localhost:50051"], batches=create_batches(3)
+    )
+    with ProcessPoolExecutor(max_workers=2) as cpu_executor:
+        scheduler = BatchScheduler(
+            [
+                BatchStep(
+                    PipelineModule(name="conversion"),
+                    convert_material,
+                    cpu_bound=True,
+                ),
+                BatchStep(PipelineModule(name="generation"), fail),
+            ],
+            cpu_executor=cpu_executor,
+        )
+
+        async def collect() -> list[PipelineStatus]:
+            return [
+                status async for status in scheduler.iterate_config(internal_config)
+            ]
+
+        snapshots = asyncio.run(collect())
+    final_status = snapshots[-1]
+    assert final_status.result is not None
+    output_batches = final_status.result.internal_config.batches
+    assert output_batches[0].capabilites[-1].keywords == ["converted"]
+    assert output_batches[1] == internal_config.batches[1]
+    assert [status.module_status for status in final_status.batch_status] == [
+        ModuleStatus.SUCCESS,
+        ModuleStatus.FAILED,
+        ModuleStatus.SUCCESS,
+    ]
+    assert final_status.batch_status[1].pipeline_module.name == "generation"
+    assert "Not parsable" in (final_status.batch_status[1].error_message or "")
+    assert all(
+        status.module_status == ModuleStatus.IDLE
+        for status in snapshots[0].batch_status
+    )
+
+
+def test_iterate_config_reports_cache_statistics() -> None:
+    """Tests that snapshots contain the cache hits and misses of the run."""
+    mongomock = pytest.importorskip("mongomock")
+    result_cache = ResultCache(mongomock.MongoClient(), "generation_results")
+    result_cache.put("cached", b"result")
+    result_cache.get("cached")
+
+    async def generate(batch: Batch) -> Batch:
+        result_cache.get_many(["cached", batch.capabilites[0].keywords[0]])
+        return batch
+
+    scheduler = BatchScheduler(
+        [BatchStep(PipelineModule(name="generation"), generate)],
+        generation_result_cache=result_cache,
+    )
+
+    async def collect() -> list[PipelineStatus]:
+        return [
+            status
+            async for status in scheduler.iterate_config(
+                InternalConfig(batches=create_batches(3))
+            )
+        ]
+
+    snapshots = asyncio.run(collect())
+    assert snapshots[0].generation_cache_statistics == CacheStatistics()
+    assert snapshots[-1].generation_cache_statistics == CacheStatistics(
+        hits=3, misses=3
+    )
+    assert snapshots[-1].evaluation_cache_statistics is None
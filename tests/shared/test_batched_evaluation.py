@@ -0,0 +1,210 @@
+import asyncio
+import re
+import pytest
+from evalquiz_proto.shared.batched_evaluation import (
+    BatchedEvaluator,
+    parse_evaluation_result,
+)
+from evalquiz_proto.shared.exceptions import (
+    ResultSectionNotFoundException,
+    ResultSectionNotParsableException,
+)
+from evalquiz_proto.shared.generated import (
+    Batch,
+    Categorical,
+    Evaluation,
+    EvaluationResult,
+    EvaluationResultType,
+    GenerationEvaluationResult,
+    GenerationResult,
+    LanguageModelEvaluation,
+    Metric,
+    MultipleChoice,
+    Question,
+    ValueRange,
+)
+
+QUESTION_PATTERN = re.compile(
+    r"<question index=\"(\d+)\">\nQuestion: Q(\d+)\n.*?</question>", re.DOTALL
+)
+
+
+class StandInModel:
+    """Deterministic stand-in of a language model, that rates question Qn with n / 100."""
+
+    def __init__(self, omit_results: bool = False) -> None:
+        self.omit_results = omit_results
+        self.prompts: list[str] = []
+
+    async def complete(self, model: str, prompt: str) -> str:
+        self.prompts.append(prompt)
+        questions = QUESTION_PATTERN.findall(prompt)
+        if not questions:
+            number = int(prompt.rsplit("Question: Q", 1)[1].split("\n", 1)[0])
+            return f"The question is fine. <result>{number / 100}</result>"
+        if self.omit_results:
+            questions = questions[1:]
+        return "\n".join(
+            f'<result index="{index}">{int(number) / 100}</result>'
+            for index, number in questions
+        )
+
+
+def create_metric(reference: str) -> Metric:
+    return Metric(
+        reference=reference,
+        evaluation=Evaluation(
+            language_model_evaluation=LanguageModelEvaluation(
+                model="stand-in",
+                evaluation_description=f"Rate the {reference} of the question.",
+                few_shot_examples=[
+                    GenerationEvaluationResult(
+                        generation_result=GenerationResult(
+                            multiple_choice=MultipleChoice(question_text="Example")
+                        ),
+                        evaluation_result=EvaluationResult(float_value=0.5),
+                    )
+                ],
+                evaluation_result_type=EvaluationResultType(
+                    value_range=ValueRange(lower_bound=0.0, upper_bound=1.0)
+                ),
+            )
+        ),
+    )
+
+
+def create_batch(question_count: int) -> Batch:
+    return Batch(
+        question_to_generate=[
+            Question(
+                generation_result=GenerationResult(
+                    multiple_choice=MultipleChoice(
+                        question_text=f"Q{number}",
+                        answer_text="Answer",
+                        distractor_text=["Distractor"],
+                    )
+                )
+            )
+            for number in range(question_count)
+        ]
+    )
+
+
+def assert_evaluated(batch: Batch, metrics: list[Metric]) -> None:
+    for number, question in enumerate(batch.question_to_generate):
+        assert question.evaluation_results == {
+            metric.reference: EvaluationResult(float_value=number / 100)
+            for metric in metrics
+        }
+
+
+def test_questions_are_packed_per_metric() -> None:
+    """Tests that questions are packed into calls per metric and that the preamble is sent once per call."""
+    stand_in_model = StandInModel()
+    batched_evaluator = BatchedEvaluator(
+        stand_in_model.complete, max_questions_per_call=10
+    )
+    metrics = [create_metric(reference) for reference in ["clarity", "difficulty"]]
+    batch = create_batch(50)
+    asyncio.run(batched_evaluator.evaluate(batch, metrics))
+    assert batched_evaluator.calls == 10
+    assert batched_evaluator.fallback_calls == 0
+    assert all(
+        prompt.count("Question: Example") == 1 for prompt in stand_in_model.prompts
+    )
+    assert_evaluated(batch, metrics)
+
+
+def test_token_budget_bounds_calls() -> None:
+    """Tests that the token budget limits the amount of questions per call."""
+    metric = create_metric("clarity")
+    batched_evaluator = BatchedEvaluator(
+        StandInModel().complete, max_questions_per_call=10, max_prompt_tokens=100
+    )
+    batch = create_batch(10)
+    asyncio.run(batched_evaluator.evaluate(batch, [metric]))
+    assert 1 < batched_evaluator.calls < 10
+    assert_evaluated(batch, [metric])
+
+
+def test_fallback_to_single_evaluation() -> None:
+    """Tests that only questions with missing result sections are evaluated one at a time."""
+    metric = create_metric("clarity")
+    batched_evaluator = BatchedEvaluator(
+        StandInModel(omit_results=True).complete, max_questions_per_call=4
+    )
+    batch = create_batch(6)
+    failures = asyncio.run(
+        batched_evaluator.evaluate(
+            batch,
+            [metric],
+            [(1, metric), (2, metric), (3, metric), (4, metric), (5, metric)],
+        )
+    )
+    assert failures == {}
+    assert batched_evaluator.fallback_calls == 1
+    assert batched_evaluator.calls == 1 + 1 + 1
+    assert batch.question_to_generate[0].evaluation_results == {}
+    batch.question_to_generate[0].evaluation_results = {
+        "clarity": EvaluationResult(float_value=0.0)
+    }
+    assert_evaluated(batch, [metric])
+
+
+def test_failures_are_collected_per_question() -> None:
+    """Tests that valid sections of a packed response are kept and failed single evaluations do not discard other results."""
+
+    async def complete(model: str, prompt: str) -> str:
+        if QUESTION_PATTERN.search(prompt):
+            return '<result index="0">0.0</result>\n<result index="1">2.0</result>'
+        number = int(prompt.rsplit("Question: Q", 1)[1].split("\n", 1)[0])
+        if number == 2:
+            raise ConnectionError()
+        return f"<result>{number / 100}</result>"
+
+    metric = create_metric("clarity")
+    batched_evaluator = BatchedEvaluator(complete)
+    batch = create_batch(3)
+    failures = asyncio.run(batched_evaluator.evaluate(batch, [metric]))
+    assert list(failures) == [(2, "clarity")]
+    assert isinstance(failures[(2, "clarity")], ConnectionError)
+    assert batched_evaluator.fallback_calls == 2
+    assert batched_evaluator.calls == 3
+    assert batch.question_to_generate[2].evaluation_results == {}
+    batch.question_to_generate[2].evaluation_results = {
+        "clarity": EvaluationResult(float_value=0.02)
+    }
+    assert_evaluated(batch, [metric])
+
+
+def test_parse_evaluation_result() -> None:
+    """Tests that results are validated against the EvaluationResultType."""
+    value_range = EvaluationResultType(
+        value_range=ValueRange(lower_bound=0.0, upper_bound=1.0)
+    )
+    categorical = EvaluationResultType(
+        categorical=Categorical(categories=["easy", "hard"])
+    )
+    assert parse_evaluation_result(" 0.25\n", value_range) == EvaluationResult(
+        float_value=0.25
+    )
+    assert parse_evaluation_result("hard", categorical) == EvaluationResult(
+        str_value="hard"
+    )
+    for text, evaluation_result_type in [
+        ("1.5", value_range),
+        ("good", value_range),
+        ("medium", categorical),
+    ]:
+        with pytest.raises(ResultSectionNotParsableException):
+            parse_evaluation_result(text, evaluation_result_type)
+
+    async def respond_without_result(model: str, prompt: str) -> str:
+        return "0.5"
+
+    failures = asyncio.run(
+        BatchedEvaluator(respond_without_result).evaluate(
+            create_batch(1), [create_metric("clarity")]
+        )
+    )
+    assert isinstance(failures[(0, "clarity")], ResultSectionNotFoundException)
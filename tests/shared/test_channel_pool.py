@@ -0,0 +1,101 @@
+import asyncio
+import socket
+from typing import AsyncIterator
+import pytest
+from grpclib.server import Server
+from evalquiz_proto.shared.channel_pool import ChannelPool, parse_url
+from evalquiz_proto.shared.generated import (
+    MaterialRequest,
+    MaterialServerBase,
+    MaterialUploadData,
+    String,
+)
+
+
+class MaterialServer(MaterialServerBase):
+    """Answers GetMaterialName immediately and holds GetMaterialRange streams open until released."""
+
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+
+    async def get_material_name(self, string: String) -> String:
+        return String(value="Lecture " + string.value)
+
+    async def get_material_range(
+        self, material_request: MaterialRequest
+    ) -> AsyncIterator[MaterialUploadData]:
+        await self.release.wait()
+        yield MaterialUploadData(data=b"material")
+
+
+def get_free_port() -> int:
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        port: int = free_socket.getsockname()[1]
+        return port
+
+
+def test_parse_url() -> None:
+    """Tests parsing of remote urls with and without scheme."""
+    assert parse_url("localhost:50052") == ("localhost", 50052, False)
+    assert parse_url("localhost") == ("localhost", 50051, False)
+    assert parse_url("https://example.org") == ("example.org", 443, True)
+    with pytest.raises(ValueError):
+        parse_url("ftp://example.org")
+
+
+def test_channels_are_reused_and_evicted() -> None:
+    """Tests that channels are shared between requests, split by max_streams_per_channel, evicted when idle and checked for health."""
+
+    async def run() -> None:
+        material_server = MaterialServer()
+        server = Server([material_server])
+        port = get_free_port()
+        await server.start("127.0.0.1", port)
+        url = f"127.0.0.1:{port}"
+        pool = ChannelPool(max_streams_per_channel=2, max_channels_per_url=2)
+        for index in range(3):
+            name = await pool.material_server_stub(url).get_material_name(
+                String(value=str(index))
+            )
+            assert name.value == "Lecture " + str(index)
+        assert len(pool.channels[url]) == 1
+
+        async def get_material() -> list[MaterialUploadData]:
+            return [
+                message
+                async for message in pool.material_server_stub(url).get_material_range(
+                    MaterialRequest(hash="hash")
+                )
+            ]
+
+        streams = []
+        for _ in range(5):
+            streams.append(asyncio.create_task(get_material()))
+            await asyncio.sleep(0.05)
+        assert [channel.active_streams for channel in pool.channels[url]] == [3, 2]
+        assert pool.evict_idle_channels() == 0
+        material_server.release.set()
+        await asyncio.gather(*streams)
+        assert [channel.active_streams for channel in pool.channels[url]] == [0, 0]
+
+        await pool.check_health()
+        assert pool.is_healthy(url)
+        pool.idle_timeout = 0.0
+        assert pool.evict_idle_channels() == 2
+        assert url not in pool.channels
+
+        pool.get_channel(url)
+        server.close()
+        await server.wait_closed()
+        with pytest.raises(OSError):
+            await pool.material_server_stub(url).get_material_name(String(value="0"))
+        assert pool.channels[url][0].active_streams == 0
+        await pool.check_health()
+        assert not pool.is_healthy(url)
+        assert url not in pool.channels
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            pool.get_channel(url)
+
+    asyncio.run(run())
@@ -0,0 +1,171 @@
+import asyncio
+import random
+from pathlib import Path
+from typing import AsyncIterator, cast
+import pytest
+from blake3 import blake3
+from evalquiz_proto.shared.chunk_store import ChunkStore, ContentDefinedChunker
+from evalquiz_proto.shared.exceptions import ChunkDataNotValidException
+from evalquiz_proto.shared.generated import (
+    ChunkData,
+    ChunkManifest,
+    ChunkRequest,
+    MaterialServerStub,
+    String,
+)
+from evalquiz_proto.shared.path_dictionary_controller import PathDictionaryController
+
+mongomock = pytest.importorskip("mongomock")
+
+chunker = ContentDefinedChunker(min_size=2**10, average_size=2**12, max_size=2**14)
+first_version = random.Random(0).randbytes(2**18)
+second_version = first_version[: 2**17] + b"A changed slide" + first_version[2**17 :]
+
+
+class ChunkServerStub:
+    """Serves GetChunkManifest and GetChunks from a ChunkStore and records the requested chunks."""
+
+    def __init__(self, chunk_store: ChunkStore, corrupt: bool = False) -> None:
+        self.chunk_store = chunk_store
+        self.corrupt = corrupt
+        self.requested_chunk_hashes: list[str] = []
+
+    async def get_chunk_manifest(self, string: String) -> ChunkManifest:
+        return self.chunk_store.get_manifest(string.value)
+
+    async def get_chunks(self, chunk_request: ChunkRequest) -> AsyncIterator[ChunkData]:
+        self.requested_chunk_hashes += chunk_request.chunk_hashes
+        async for chunk_data in self.chunk_store.create_chunk_stream(chunk_request):
+            if self.corrupt:
+                chunk_data.data = chunk_data.data[::-1]
+            yield chunk_data
+
+
+def create_chunk_store() -> ChunkStore:
+    return ChunkStore(mongomock.MongoClient(), chunker=chunker)
+
+
+async def read_file(chunk_store: ChunkStore, hash: str) -> bytes:
+    return b"".join([chunk async for chunk in chunk_store.read_file_async(hash)])
+
+
+def test_chunk_boundaries_are_content_defined() -> None:
+    """Tests that chunk sizes are bounded and that an insertion only changes the chunks around it."""
+    first_chunk_sizes = chunker.split(first_version)
+    assert sum(first_chunk_sizes) == len(first_version)
+    assert all(size <= chunker.max_size for size in first_chunk_sizes)
+    assert all(size >= chunker.min_size for size in first_chunk_sizes[:-1])
+    partial_chunk_sizes = chunker.split(first_version, final=False)
+    assert first_chunk_sizes[: len(partial_chunk_sizes)] == partial_chunk_sizes
+    assert len(first_version) - sum(partial_chunk_sizes) < chunker.max_size
+
+    def chunk_hashes(data: bytes) -> set[str]:
+        offset = 0
+        hashes = set()
+        for size in chunker.split(data):
+            hashes.add(blake3(data[offset : offset + size]).hexdigest())
+            offset += size
+        return hashes
+
+    second_hashes = chunk_hashes(second_version)
+    assert len(second_hashes - chunk_hashes(first_version)) <= 2
+    with pytest.raises(ValueError):
+        ContentDefinedChunker(min_size=2**10, average_size=3000, max_size=2**14)
+
+
+def test_versions_share_chunks(tmp_path: Path) -> None:
+    """Tests that a modified version only adds its changed chunks and that chunks are removed with their last manifest.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    chunk_store = create_chunk_store()
+    (tmp_path / "1.pptx").write_bytes(first_version)
+    (tmp_path / "2.pptx").write_bytes(second_version)
+
+    async def add_versions() -> tuple[ChunkManifest, ChunkManifest]:
+        return (
+            await chunk_store.add_file_async(tmp_path / "1.pptx"),
+            await chunk_store.add_file_async(tmp_path / "2.pptx"),
+        )
+
+    first_manifest, second_manifest = asyncio.run(add_versions())
+    assert first_manifest.hash == blake3(first_version).hexdigest()
+    assert asyncio.run(read_file(chunk_store, second_manifest.hash)) == second_version
+    first_chunk_count = len(set(first_manifest.chunk_hashes))
+    assert chunk_store.chunks.count_documents({}) <= first_chunk_count + 2
+    assert asyncio.run(
+        chunk_store.add_file_async(tmp_path / "1.pptx", first_manifest.hash)
+    ) == chunk_store.get_manifest(first_manifest.hash)
+    chunk_store.delete_manifest(first_manifest.hash)
+    assert chunk_store.chunks.count_documents({}) == len(
+        set(second_manifest.chunk_hashes)
+    )
+    chunk_store.delete_manifest(second_manifest.hash)
+    assert chunk_store.chunks.count_documents({}) == 0
+
+
+def test_pull_transfers_missing_chunks(tmp_path: Path) -> None:
+    """Tests that pulling a new version only transfers its changed chunks and that corrupted chunks are rejected.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    remote_chunk_store = create_chunk_store()
+    chunk_store = create_chunk_store()
+    (tmp_path / "1.pptx").write_bytes(first_version)
+    (tmp_path / "2.pptx").write_bytes(second_version)
+    asyncio.run(remote_chunk_store.add_file_async(tmp_path / "1.pptx"))
+    hash = asyncio.run(remote_chunk_store.add_file_async(tmp_path / "2.pptx")).hash
+    asyncio.run(chunk_store.add_file_async(tmp_path / "1.pptx"))
+    chunk_count = chunk_store.chunks.count_documents({})
+
+    corrupt_stub = ChunkServerStub(remote_chunk_store, corrupt=True)
+    with pytest.raises(ChunkDataNotValidException):
+        asyncio.run(
+            chunk_store.pull_file_async(cast(MaterialServerStub, corrupt_stub), hash)
+        )
+    assert chunk_store.chunks.count_documents({}) == chunk_count
+
+    stub = ChunkServerStub(remote_chunk_store)
+    asyncio.run(chunk_store.pull_file_async(cast(MaterialServerStub, stub), hash))
+    assert 0 < len(stub.requested_chunk_hashes) <= 2
+    assert asyncio.run(read_file(chunk_store, hash)) == second_version
+
+
+def test_pull_content_addressed_file(tmp_path: Path) -> None:
+    """Tests synchronizing a material between two PathDictionaryController instances with chunk stores.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    remote_controller = PathDictionaryController(
+        mongomock.MongoClient(), chunk_store=create_chunk_store()
+    )
+    controller = PathDictionaryController(
+        mongomock.MongoClient(), chunk_store=create_chunk_store()
+    )
+    (tmp_path / "remote").mkdir()
+    (tmp_path / "local").mkdir()
+
+    async def iterate() -> AsyncIterator[bytes]:
+        yield second_version
+
+    hash = asyncio.run(
+        remote_controller.add_content_addressed_file_async(
+            tmp_path / "remote", "text/x-rst", iterate()
+        )
+    )
+    assert remote_controller.chunk_store is not None
+    stub = ChunkServerStub(remote_controller.chunk_store)
+    asyncio.run(
+        controller.pull_content_addressed_file_async(
+            tmp_path / "local", cast(MaterialServerStub, stub), hash, "Lecture 2"
+        )
+    )
+    local_path = controller.get_file_path_from_hash(hash)
+    assert local_path == tmp_path / "local" / (hash + ".rst")
+    assert local_path.read_bytes() == second_version
+    assert controller.get_material_name(hash) == "Lecture 2"
+    remote_controller.delete_file(hash)
+    assert remote_controller.chunk_store.chunks.count_documents({}) == 0
@@ -0,0 +1,104 @@
+import asyncio
+from typing import AsyncIterator
+import pytest
+from evalquiz_proto.shared.compression import (
+    compress_chunks,
+    compression_codecs,
+    decompress_chunks,
+    negotiate_compression,
+)
+from evalquiz_proto.shared.exceptions import (
+    CompressedDataNotValidException,
+    CompressionNotSupportedException,
+)
+
+material = b"# Lecture\n\nA *markdown* material that compresses well.\n" * 2**12
+
+
+async def iterate(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def collect(binary_iterator: AsyncIterator[bytes]) -> list[bytes]:
+    return [chunk async for chunk in binary_iterator]
+
+
+@pytest.mark.parametrize("compression", list(compression_codecs))
+def test_round_trip(compression: str) -> None:
+    """Tests that compressed chunks are bounded by content_partition_size and decompress to the original material.
+
+    Args:
+        compression (str): Name of the compression codec.
+    """
+    chunks = [material[i : i + 2**14] for i in range(0, len(material), 2**14)]
+    compressed_chunks = asyncio.run(
+        collect(compress_chunks(iterate(*chunks), compression, 2**10))
+    )
+    assert all(len(chunk) <= 2**10 for chunk in compressed_chunks)
+    assert sum(len(chunk) for chunk in compressed_chunks) < len(material) / 5
+    decompressed_chunks = asyncio.run(
+        collect(decompress_chunks(iterate(*compressed_chunks), compression))
+    )
+    assert b"".join(decompressed_chunks) == material
+
+
+@pytest.mark.parametrize("compression", list(compression_codecs))
+def test_truncated_stream_is_detected(compression: str) -> None:
+    """Tests that a stream that ends before the end of the compressed data is rejected.
+
+    Args:
+        compression (str): Name of the compression codec.
+    """
+    compressed = b"".join(
+        asyncio.run(collect(compress_chunks(iterate(material), compression, 2**20)))
+    )
+    with pytest.raises(CompressedDataNotValidException):
+        asyncio.run(collect(decompress_chunks(iterate(compressed[:-8]), compression)))
+    with pytest.raises(CompressedDataNotValidException):
+        asyncio.run(collect(decompress_chunks(iterate(b"not compressed"), compression)))
+
+
+def test_unsupported_compression() -> None:
+    with pytest.raises(CompressionNotSupportedException):
+        asyncio.run(collect(compress_chunks(iterate(material), "rar", 2**20)))
+    with pytest.raises(ValueError):
+        asyncio.run(collect(compress_chunks(iterate(material), "zlib", 2**20, 42)))
+
+
+def test_negotiate_compression() -> None:
+    assert negotiate_compression(["rar", "lzma", "zlib"]) == "lzma"
+    assert negotiate_compression(["rar"]) is None
+    assert negotiate_compression(["zlib"], "text/markdown") == "zlib"
+    assert (
+        negotiate_compression(
+            ["zlib"],
+            "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        )
+        is None
+    )
+
+
+@pytest.mark.parametrize("compression", list(compression_codecs))
+def test_decompression_is_bounded(compression: str) -> None:
+    """Tests that decompressed chunks are bounded and that streams expanding beyond max_size are rejected.
+
+    Args:
+        compression (str): Name of the compression codec.
+    """
+    bomb = asyncio.run(
+        collect(compress_chunks(iterate(bytes(2**24)), compression, 2**20))
+    )
+    assert sum(len(chunk) for chunk in bomb) < 2**20
+    decompressed_chunks = asyncio.run(
+        collect(decompress_chunks(iterate(*bomb), compression, max_chunk_size=2**18))
+    )
+    assert sum(len(chunk) for chunk in decompressed_chunks) == 2**24
+    assert max(len(chunk) for chunk in decompressed_chunks) <= 2**18 + 2**19
+    with pytest.raises(CompressedDataNotValidException):
+        asyncio.run(
+            collect(decompress_chunks(iterate(*bomb), compression, max_size=2**20))
+        )
+    assert asyncio.run(
+        collect(decompress_chunks(iterate(*bomb), compression, max_size=2**24))
+    )
@@ -0,0 +1,50 @@
+from pathlib import Path
+import pytest
+from blake3 import blake3
+from evalquiz_proto.shared.file_hasher import FileHasher
+
+
+@pytest.fixture(scope="session")
+def example_path() -> Path:
+    """Pytest fixture of the path to an example material.
+
+    Returns:
+        Path
+    """
+    return Path(__file__).parent / "example_materials/example.txt"
+
+
+@pytest.mark.parametrize(
+    "file_hasher",
+    [
+        FileHasher(chunk_size=1),
+        FileHasher(chunk_size=7),
+        FileHasher(use_mmap=True),
+        FileHasher(use_mmap=True, max_threads=blake3.AUTO),
+    ],
+)
+def test_hash_file_matches_whole_file_hash(
+    file_hasher: FileHasher, example_path: Path
+) -> None:
+    """Tests that chunked and memory-mapped hashing match hashing the whole file at once.
+
+    Args:
+        file_hasher (FileHasher): FileHasher configuration under test.
+        example_path (Path): Pytest fixture of the path to an example material.
+    """
+    with open(example_path, "rb") as example_file:
+        expected_hash = blake3(example_file.read()).hexdigest()
+    assert file_hasher.hash_file(example_path) == expected_hash
+
+
+def test_hash_empty_file(tmp_path: Path) -> None:
+    """Tests that empty files can be hashed, which cannot be memory-mapped.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    empty_path = tmp_path / "empty.txt"
+    empty_path.touch()
+    expected_hash = blake3(b"").hexdigest()
+    assert FileHasher().hash_file(empty_path) == expected_hash
+    assert FileHasher(use_mmap=True).hash_file(empty_path) == expected_hash
@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+import pytest
+from evalquiz_proto.shared.file_hasher import FileHasher
+from evalquiz_proto.shared.hash_cache import HashCache, MongoDBHashCache
+
+
+def test_unchanged_file_is_not_rehashed(tmp_path: Path) -> None:
+    """Tests that unchanged and renamed files are served from cache and modified files are rehashed.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    hash_cache = HashCache()
+    file_hasher = FileHasher()
+    local_path = tmp_path / "material.txt"
+    local_path.write_bytes(b"lecture material")
+    hash = hash_cache.get_hash(local_path, file_hasher)
+    assert hash_cache.get_hash(local_path, file_hasher) == hash
+    renamed_path = tmp_path / hash
+    os.rename(local_path, renamed_path)
+    assert hash_cache.get_hash(renamed_path, file_hasher) == hash
+    assert (hash_cache.hits, hash_cache.misses) == (2, 1)
+    renamed_path.write_bytes(b"modified lecture material")
+    assert hash_cache.get_hash(renamed_path, file_hasher) == file_hasher.hash_file(
+        renamed_path
+    )
+    assert hash_cache.misses == 2
+
+
+def test_invalidate(tmp_path: Path) -> None:
+    """Tests that explicitly invalidated files are rehashed, even if size and mtime_ns did not change.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    hash_cache = HashCache()
+    file_hasher = FileHasher()
+    local_path = tmp_path / "material.txt"
+    local_path.write_bytes(b"lecture material")
+    stat_result = os.stat(local_path)
+    hash_cache.get_hash(local_path, file_hasher)
+    local_path.write_bytes(b"Lecture material")
+    os.utime(local_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+    hash_cache.invalidate(local_path)
+    assert hash_cache.get_hash(local_path, file_hasher) == file_hasher.hash_file(
+        local_path
+    )
+    assert hash_cache.misses == 2
+
+
+def test_mongodb_hash_cache_persists_entries(tmp_path: Path) -> None:
+    """Tests that entries are shared between instances of the same namespace and stale entries are removed.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    mongodb_client = mongomock.MongoClient()
+    file_hasher = FileHasher()
+    local_path = tmp_path / "material.txt"
+    local_path.write_bytes(b"lecture material")
+    hash = MongoDBHashCache(mongodb_client, namespace="host").get_hash(
+        local_path, file_hasher
+    )
+    hash_cache = MongoDBHashCache(mongodb_client, namespace="host")
+    assert hash_cache.get_hash(local_path, file_hasher) == hash
+    assert (hash_cache.hits, hash_cache.misses) == (1, 0)
+    local_path.write_bytes(b"modified lecture material")
+    hash_cache = MongoDBHashCache(mongodb_client, namespace="host")
+    assert hash_cache.get_hash(local_path, file_hasher) == file_hasher.hash_file(
+        local_path
+    )
+    assert hash_cache.misses == 1
+
+
+def test_mongodb_hash_cache_separates_namespaces(tmp_path: Path) -> None:
+    """Tests that equal device and inode numbers of different hosts neither share entries nor are cleared together.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    mongodb_client = mongomock.MongoClient()
+    local_path = tmp_path / "material.txt"
+    local_path.write_bytes(b"lecture material")
+    first_hash_cache = MongoDBHashCache(mongodb_client, namespace="first_host")
+    second_hash_cache = MongoDBHashCache(mongodb_client, namespace="second_host")
+    first_hash_cache.add(local_path, "first_hash")
+    second_hash_cache.add(local_path, "second_hash")
+    assert (
+        MongoDBHashCache(mongodb_client, namespace="first_host").get_hash(
+            local_path, FileHasher()
+        )
+        == "first_hash"
+    )
+    second_hash_cache.clear()
+    assert (
+        MongoDBHashCache(mongodb_client, namespace="first_host").get_hash(
+            local_path, FileHasher()
+        )
+        == "first_hash"
+    )
+    assert MongoDBHashCache(mongodb_client, namespace="second_host").get_hash(
+        local_path, FileHasher()
+    ) == FileHasher().hash_file(local_path)
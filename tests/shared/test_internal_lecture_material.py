@@ -1,7 +1,8 @@
 from pathlib import Path
+import jsonpickle
 import pytest
 from evalquiz_proto.shared.internal_lecture_material import InternalLectureMaterial
-from evalquiz_proto.shared.generated import LectureMaterial
+from evalquiz_proto.shared.generated import LectureMaterial, PageFilter
 
 
 @pytest.fixture(scope="session")
@@ -33,3 +34,25 @@ def test_modification_and_verification(
     assert internal_lecture_material.verify_hash() == False
     internal_lecture_material.update_hash()
     assert internal_lecture_material.hash != hash
+
+
+def test_mongodb_document_round_trip() -> None:
+    """Tests that InternalLectureMaterial is restored from compact and from jsonpickle-encoded documents."""
+    material_metadata = LectureMaterial(
+        reference="Example textfile",
+        file_type="text/plain",
+        page_filter=PageFilter(lower_bound=1, upper_bound=3),
+    )
+    path = Path(__file__).parent / "example_materials/example.txt"
+    internal_lecture_material = InternalLectureMaterial(path, material_metadata)
+    legacy_document = {
+        "_id": internal_lecture_material.hash,
+        "internal_lecture_material": jsonpickle.encode(internal_lecture_material),
+    }
+    for document in [internal_lecture_material.to_mongodb_document(), legacy_document]:
+        decoded_material = InternalLectureMaterial.from_mongodb_document(document)
+        assert decoded_material.local_path == internal_lecture_material.local_path
+        assert (
+            decoded_material.cast_to_lecture_material()
+            == internal_lecture_material.cast_to_lecture_material()
+        )
@@ -0,0 +1,155 @@
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator, Optional, cast
+import pytest
+from blake3 import blake3
+from evalquiz_proto.shared.channel_pool import ChannelPool
+from evalquiz_proto.shared.exceptions import LectureMaterialNotFoundOnRemotesException
+from evalquiz_proto.shared.generated import (
+    LectureMaterial,
+    MaterialRequest,
+    MaterialServerStub,
+    MaterialUploadData,
+    Metadata,
+)
+from evalquiz_proto.shared.material_fetcher import HedgedMaterialFetcher
+from evalquiz_proto.shared.path_dictionary_controller import PathDictionaryController
+
+mongomock = pytest.importorskip("mongomock")
+
+material = b"Lecture 1\n=========\n\nA *reStructuredText* material.\n" * 2**10
+lecture_material = LectureMaterial(
+    reference="Lecture 1", hash=blake3(material).hexdigest(), file_type="text/x-rst"
+)
+
+
+class RemoteStub:
+    """Serves GetMaterialRange after a delay and records whether its stream was cancelled."""
+
+    def __init__(
+        self, delay: float, contents: Optional[bytes] = material, fail: bool = False
+    ) -> None:
+        self.delay = delay
+        self.contents = contents
+        self.fail = fail
+        self.requests = 0
+        self.cancelled = False
+
+    async def get_material_range(
+        self, material_request: MaterialRequest, timeout: Optional[float] = None
+    ) -> AsyncIterator[MaterialUploadData]:
+        self.requests += 1
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise ConnectionRefusedError()
+            yield MaterialUploadData(metadata=Metadata(mimetype="text/x-rst"))
+            yield MaterialUploadData(data=self.contents or b"")
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def create_fetcher(
+    remotes: dict[str, RemoteStub], directory: Path, fan_out: int = 2
+) -> HedgedMaterialFetcher:
+    return HedgedMaterialFetcher(
+        lambda url: cast(MaterialServerStub, remotes[url]),
+        PathDictionaryController(mongomock.MongoClient()),
+        directory,
+        fan_out=fan_out,
+        hedge_delay=0.01,
+    )
+
+
+def test_fastest_remote_wins(tmp_path: Path) -> None:
+    """Tests that a hedged request to a faster remote wins and is stored, the slower remote is cancelled and latencies order later fetches.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    remotes = {"slow": RemoteStub(1.0), "fast": RemoteStub(0.0)}
+    fetcher = create_fetcher(remotes, tmp_path)
+    hash = asyncio.run(fetcher.fetch_async(lecture_material, ["slow", "fast"]))
+    assert hash == lecture_material.hash
+    assert isinstance(fetcher.path_dictionary_controller, PathDictionaryController)
+    local_path = fetcher.path_dictionary_controller.get_file_path_from_hash(hash)
+    assert local_path == tmp_path / (hash + ".rst")
+    assert local_path.read_bytes() == material
+    assert [path.name for path in tmp_path.iterdir()] == [local_path.name]
+    assert remotes["slow"].cancelled
+    assert fetcher.order_remotes(["slow", "fast", "slow"]) == ["fast", "slow"]
+    asyncio.run(fetcher.fetch_async(lecture_material, ["slow", "fast"]))
+    assert remotes["fast"].requests == 2
+    assert remotes["slow"].requests == 1
+
+
+def test_cancelled_hedges_rank_behind_winner(tmp_path: Path) -> None:
+    """Tests that hedges, which are cancelled before their first message, are not ranked ahead of the winner.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    remotes = {
+        "winner": RemoteStub(0.05),
+        "hedge": RemoteStub(1.0),
+        "late_hedge": RemoteStub(1.0),
+    }
+    fetcher = create_fetcher(remotes, tmp_path, fan_out=3)
+    asyncio.run(fetcher.fetch_async(lecture_material, list(remotes)))
+    assert remotes["late_hedge"].cancelled
+    assert fetcher.latencies["late_hedge"] >= fetcher.latencies["winner"]
+    assert fetcher.order_remotes(list(remotes))[0] == "winner"
+
+
+def test_unhealthy_remotes_are_requested_last(tmp_path: Path) -> None:
+    """Tests that remotes, which failed the health check of channel_pool, are requested after healthy remotes.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    remotes = {"unhealthy": RemoteStub(0.0), "healthy": RemoteStub(0.0)}
+    channel_pool = ChannelPool()
+    channel_pool.unhealthy_urls.add("unhealthy")
+    fetcher = HedgedMaterialFetcher(
+        lambda url: cast(MaterialServerStub, remotes[url]),
+        PathDictionaryController(mongomock.MongoClient()),
+        tmp_path,
+        fan_out=1,
+        channel_pool=channel_pool,
+    )
+    assert fetcher.order_remotes(list(remotes)) == ["healthy", "unhealthy"]
+    asyncio.run(fetcher.fetch_async(lecture_material, list(remotes)))
+    assert (remotes["healthy"].requests, remotes["unhealthy"].requests) == (1, 0)
+    del remotes["healthy"]
+    asyncio.run(fetcher.fetch_async(lecture_material, list(remotes)))
+    assert remotes["unhealthy"].requests == 1
+
+
+def test_failed_and_corrupt_remotes_are_skipped(tmp_path: Path) -> None:
+    """Tests that failing remotes and remotes with contents that do not match the hash are skipped and not stored.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    remotes = {
+        "failing": RemoteStub(0.0, fail=True),
+        "corrupt": RemoteStub(0.0, contents=material[::-1]),
+        "healthy": RemoteStub(0.05),
+    }
+    fetcher = create_fetcher(remotes, tmp_path, fan_out=1)
+    hash = asyncio.run(fetcher.fetch_async(lecture_material, list(remotes)))
+    assert [path.name for path in tmp_path.iterdir()] == [hash + ".rst"]
+    assert all(remote.requests == 1 for remote in remotes.values())
+    assert fetcher.order_remotes(list(remotes))[0] == "healthy"
+
+    del remotes["healthy"]
+    with pytest.raises(LectureMaterialNotFoundOnRemotesException):
+        asyncio.run(fetcher.fetch_async(lecture_material, list(remotes)))
+    with pytest.raises(ValueError):
+        HedgedMaterialFetcher(
+            fetcher.stub_factory,
+            fetcher.path_dictionary_controller,
+            tmp_path,
+            fan_out=0,
+        )
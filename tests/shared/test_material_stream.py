@@ -0,0 +1,147 @@
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator, Optional, cast
+import pytest
+from evalquiz_proto.shared.exceptions import (
+    DataChunkNotBytesException,
+    FirstDataChunkNotMetadataException,
+)
+from evalquiz_proto.shared.generated import (
+    MaterialRequest,
+    MaterialServerStub,
+    MaterialUploadData,
+    Metadata,
+)
+from evalquiz_proto.shared.material_stream import (
+    create_material_download_stream,
+    create_material_upload_stream,
+    get_material,
+    read_material_upload_stream,
+)
+from evalquiz_proto.shared.path_dictionary_controller import PathDictionaryController
+
+material = b"Lecture 1\n=========\n\nA *reStructuredText* material.\n" * 2**10
+
+
+async def iterate(*items: bytes) -> AsyncIterator[bytes]:
+    for item in items:
+        yield item
+
+
+async def iterate_messages(
+    *messages: MaterialUploadData,
+) -> AsyncIterator[MaterialUploadData]:
+    for message in messages:
+        yield message
+
+
+async def read(
+    material_upload_data_iterator: AsyncIterator[MaterialUploadData],
+    require_metadata: bool = True,
+) -> tuple[Metadata, bytes]:
+    metadata, binary_iterator = await read_material_upload_stream(
+        material_upload_data_iterator, require_metadata
+    )
+    return (metadata, b"".join([chunk async for chunk in binary_iterator]))
+
+
+@pytest.mark.parametrize("compression", [None, "zlib", "lzma"])
+def test_upload_stream_round_trip(compression: Optional[str]) -> None:
+    """Tests that an upload stream is read back with its metadata and uncompressed contents.
+
+    Args:
+        compression (Optional[str]): Name of the compression codec, the stream is uncompressed if None.
+    """
+    metadata = Metadata(
+        mimetype="text/x-rst", name="Lecture 1", compression=compression
+    )
+    chunks = [material[i : i + 2**12] for i in range(0, len(material), 2**12)]
+    upload_stream = create_material_upload_stream(metadata, iterate(*chunks), 2**10)
+    assert asyncio.run(read(upload_stream)) == (metadata, material)
+
+
+def test_malformed_upload_streams() -> None:
+    with pytest.raises(FirstDataChunkNotMetadataException):
+        asyncio.run(read(iterate_messages(MaterialUploadData(data=b"Lecture"))))
+    with pytest.raises(FirstDataChunkNotMetadataException):
+        asyncio.run(read(iterate_messages()))
+    with pytest.raises(DataChunkNotBytesException):
+        asyncio.run(
+            read(
+                iterate_messages(
+                    MaterialUploadData(metadata=Metadata(mimetype="text/x-rst")),
+                    MaterialUploadData(metadata=Metadata(mimetype="text/x-rst")),
+                )
+            )
+        )
+    assert asyncio.run(
+        read(iterate_messages(MaterialUploadData(data=b"Lecture")), False)
+    ) == (Metadata(), b"Lecture")
+
+
+def test_download_stream(tmp_path: Path) -> None:
+    """Tests that a download stream is compressed with a negotiated codec and covers the requested range.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    path_dictionary_controller = PathDictionaryController(mongomock.MongoClient())
+    local_path = tmp_path / "lecture.rst"
+    local_path.write_bytes(material)
+    path_dictionary_controller.load_file(local_path, "hash")
+    material_request = MaterialRequest(
+        hash="hash", offset=10, length=2**14, accepted_compressions=["rar", "zlib"]
+    )
+    metadata, data = asyncio.run(
+        read(
+            create_material_download_stream(
+                path_dictionary_controller, material_request
+            )
+        )
+    )
+    assert metadata == Metadata(mimetype="text/x-rst", compression="zlib")
+    assert data == material[10 : 10 + 2**14]
+
+
+class MaterialRangeServerStub:
+    """Serves GetMaterialRange from a PathDictionaryController and records the received requests."""
+
+    def __init__(self, path_dictionary_controller: PathDictionaryController) -> None:
+        self.path_dictionary_controller = path_dictionary_controller
+        self.material_requests: list[MaterialRequest] = []
+
+    def get_material_range(
+        self, material_request: MaterialRequest
+    ) -> AsyncIterator[MaterialUploadData]:
+        self.material_requests.append(material_request)
+        return create_material_download_stream(
+            self.path_dictionary_controller, material_request
+        )
+
+
+def test_get_material_does_not_modify_request(tmp_path: Path) -> None:
+    """Tests that accepted_compressions is offered to the server without modifying the request of the caller.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    path_dictionary_controller = PathDictionaryController(mongomock.MongoClient())
+    local_path = tmp_path / "lecture.rst"
+    local_path.write_bytes(material)
+    path_dictionary_controller.load_file(local_path, "hash")
+    material_server_stub = MaterialRangeServerStub(path_dictionary_controller)
+    material_request = MaterialRequest(hash="hash", offset=10, length=2**14)
+
+    async def download() -> tuple[Metadata, bytes]:
+        metadata, binary_iterator = await get_material(
+            cast(MaterialServerStub, material_server_stub), material_request, ["zlib"]
+        )
+        return (metadata, b"".join([chunk async for chunk in binary_iterator]))
+
+    metadata, data = asyncio.run(download())
+    assert metadata == Metadata(mimetype="text/x-rst", compression="zlib")
+    assert data == material[10 : 10 + 2**14]
+    assert material_server_stub.material_requests[0].accepted_compressions == ["zlib"]
+    assert material_request == MaterialRequest(hash="hash", offset=10, length=2**14)
@@ -1,4 +1,11 @@
-from evalquiz_proto.shared.mimetype_resolver import MimetypeResolver
+import mimetypes
+import zipfile
+from pathlib import Path
+import pytest
+from evalquiz_proto.shared.mimetype_resolver import (
+    MimetypeResolver,
+    mimetype_extension_mappings,
+)
 
 allowed_extensions = [
     ".md",
@@ -29,3 +36,83 @@ def test_resolve_allowed_extensions() -> None:
         if type is None:
             raise Exception
         MimetypeResolver.fixed_guess_extension(type)
+
+
+def test_suffix_table_matches_mimetypes_library() -> None:
+    for suffix in [*allowed_extensions, ".PDF", ".tgz", ".svgz", ".unknown", ""]:
+        expected_type = mimetype_extension_mappings.get(suffix)
+        if expected_type is None:
+            expected_type, _ = mimetypes.guess_type("misc" + suffix, strict=False)
+        assert MimetypeResolver.fixed_guess_type(suffix) == expected_type
+        assert MimetypeResolver.fixed_guess_type(suffix) == expected_type
+
+
+def create_zip_file(local_path: Path, member_names: list[str]) -> None:
+    with zipfile.ZipFile(local_path, "w") as zip_file:
+        for member_name in member_names:
+            zip_file.writestr(member_name, member_contents[member_name])
+
+
+member_contents = {
+    "mimetype": "application/epub+zip",
+    "[Content_Types].xml": "<Types></Types>",
+    "docProps/thumbnail.jpeg": "\xff" * 2**14,
+    "word/document.xml": "<document></document>",
+    "ppt/presentation.xml": "<presentation></presentation>",
+    "readme.txt": "readme",
+}
+
+
+@pytest.mark.parametrize(
+    "member_names,expected_type",
+    [
+        (["mimetype", "readme.txt"], "application/epub+zip"),
+        (
+            ["[Content_Types].xml", "word/document.xml"],
+            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        ),
+        (
+            ["[Content_Types].xml", "docProps/thumbnail.jpeg", "ppt/presentation.xml"],
+            "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        ),
+        (["readme.txt"], "application/zip"),
+    ],
+)
+def test_sniff_zip_based_formats(
+    tmp_path: Path, member_names: list[str], expected_type: str
+) -> None:
+    """Tests that zip based formats are told apart by their contents, regardless of their suffix.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        member_names (list[str]): Members of the zip file.
+        expected_type (str): The mimetype of the zip file.
+    """
+    local_path = tmp_path / "6c9f7e5b"
+    create_zip_file(local_path, member_names)
+    assert MimetypeResolver.sniff_file_type(local_path) == expected_type
+    assert MimetypeResolver.guess_file_type(local_path) == expected_type
+
+
+def test_guess_file_type(tmp_path: Path) -> None:
+    """Tests that contents take precedence over suffixes and that suffixes are used for undetected formats.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    docx_type = (
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    )
+    misnamed_path = tmp_path / "lecture.pptx"
+    create_zip_file(misnamed_path, ["[Content_Types].xml", "word/document.xml"])
+    assert MimetypeResolver.guess_file_type(misnamed_path) == docx_type
+    zip_path = tmp_path / "lecture.docx"
+    create_zip_file(zip_path, ["readme.txt"])
+    assert MimetypeResolver.guess_file_type(zip_path) == docx_type
+    pdf_path = tmp_path / "lecture"
+    pdf_path.write_bytes(b"%PDF-1.7\n")
+    assert MimetypeResolver.guess_file_type(pdf_path) == "application/pdf"
+    markdown_path = tmp_path / "lecture.md"
+    markdown_path.write_text("# Lecture")
+    assert MimetypeResolver.guess_file_type(markdown_path) == "text/markdown"
+    assert MimetypeResolver.sniff_type(b"# Lecture") is None
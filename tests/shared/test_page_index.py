@@ -0,0 +1,69 @@
+from pathlib import Path
+import pytest
+from evalquiz_proto.shared.generated import PageFilter
+from evalquiz_proto.shared.page_index import (
+    DEFAULT_SCAN_BLOCK_SIZE,
+    build_page_offsets,
+    get_page_byte_range,
+)
+
+
+def split_pages(
+    local_path: Path, mimetype: str, block_size: int = DEFAULT_SCAN_BLOCK_SIZE
+) -> list[bytes]:
+    contents = local_path.read_bytes()
+    page_offsets = build_page_offsets(local_path, mimetype, block_size)
+    assert page_offsets is not None
+    return [contents[start:end] for start, end in zip(page_offsets, page_offsets[1:])]
+
+
+@pytest.mark.parametrize("block_size", [DEFAULT_SCAN_BLOCK_SIZE, 3])
+def test_markdown_slides(tmp_path: Path, block_size: int) -> None:
+    """Tests that markdown decks are split at slide separators, but not at front matter, setext headings or code blocks.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        block_size (int): Size of the blocks the deck is read in, lines span multiple small blocks.
+    """
+    pages = [
+        b"---\nmarp: true\n---\n\n# Slide 1\n\n---\n",
+        b"Slide 2\n---\n\n```\n\n---\n```\n\n---\n",
+        b"# Slide 3\n",
+    ]
+    (tmp_path / "deck.md").write_bytes(b"".join(pages))
+    assert split_pages(tmp_path / "deck.md", "text/markdown", block_size) == pages
+
+
+@pytest.mark.parametrize("block_size", [DEFAULT_SCAN_BLOCK_SIZE, 3])
+def test_tex_frames_and_plain_text_pages(tmp_path: Path, block_size: int) -> None:
+    """Tests that beamer frames, page breaks and form feeds start new pages.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        block_size (int): Size of the blocks the files are read in, lines span multiple small blocks.
+    """
+    pages = [
+        b"\\documentclass{beamer}\n\\begin{frame}\nFirst\n\\end{frame}\n",
+        b"\\begin{frame}\nSecond\n\\end{frame}\n\\newpage\n",
+        b"Appendix\n",
+    ]
+    (tmp_path / "slides.tex").write_bytes(b"".join(pages))
+    assert (
+        split_pages(tmp_path / "slides.tex", "application/x-tex", block_size) == pages
+    )
+    (tmp_path / "extracted.txt").write_bytes(b"First page\fSecond page\f")
+    assert split_pages(tmp_path / "extracted.txt", "text/plain", block_size) == [
+        b"First page\f",
+        b"Second page\f",
+    ]
+    assert build_page_offsets(tmp_path / "extracted.txt", "application/pdf") is None
+
+
+def test_get_page_byte_range() -> None:
+    """Tests resolving 1-based inclusive page ranges to byte ranges."""
+    page_offsets = [0, 10, 25, 40]
+    assert get_page_byte_range(page_offsets, PageFilter(1, 1)) == (0, 10)
+    assert get_page_byte_range(page_offsets, PageFilter(2, 10)) == (10, 30)
+    for page_filter in [PageFilter(0, 1), PageFilter(3, 2), PageFilter(4, 4)]:
+        with pytest.raises(ValueError):
+            get_page_byte_range(page_offsets, page_filter)
@@ -0,0 +1,509 @@
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Optional
+import jsonpickle
+import pytest
+from blake3 import blake3
+from evalquiz_proto.shared.chunk_store import ChunkStore
+from evalquiz_proto.shared.exceptions import (
+    MaterialHashNotValidException,
+    PageFilterNotSupportedException,
+    UploadOffsetNotValidException,
+)
+from evalquiz_proto.shared.generated import ChunkManifest, PageFilter
+from evalquiz_proto.shared.path_dictionary_controller import (
+    LOCAL_PATHS_SCHEMA_VERSION,
+    PathDictionaryController,
+)
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def path_dictionary_controller() -> PathDictionaryController:
+    """Pytest fixture of PathDictionaryController, backed by an in-memory MongoDB stand-in.
+
+    Returns:
+        PathDictionaryController
+    """
+    return PathDictionaryController(mongomock.MongoClient())
+
+
+async def iterate(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def iterate_and_fail(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+    raise ConnectionError()
+
+
+def test_add_content_addressed_file_deduplicates(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that uploads are named after their hash and identical uploads are stored once.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    hash = asyncio.run(
+        path_dictionary_controller.add_content_addressed_file_async(
+            tmp_path, "text/x-rst", iterate(b"# Lecture", b" 1"), "Lecture 1"
+        )
+    )
+    assert hash == blake3(b"# Lecture 1").hexdigest()
+    local_path = path_dictionary_controller.get_file_path_from_hash(hash)
+    assert local_path == tmp_path / (hash + ".rst")
+    assert local_path.read_bytes() == b"# Lecture 1"
+    second_hash = asyncio.run(
+        path_dictionary_controller.add_content_addressed_file_async(
+            tmp_path, "text/x-rst", iterate(b"# Lecture 1"), "Copy"
+        )
+    )
+    assert second_hash == hash
+    assert os.listdir(tmp_path) == [hash + ".rst"]
+    assert path_dictionary_controller.get_material_name(hash) == "Copy"
+    with pytest.raises(MaterialHashNotValidException):
+        asyncio.run(
+            path_dictionary_controller.add_content_addressed_file_async(
+                tmp_path, "text/x-rst", iterate(b"# Lecture 2"), "", expected_hash=hash
+            )
+        )
+    assert os.listdir(tmp_path) == [hash + ".rst"]
+
+
+def test_failing_chunk_store_keeps_committed_file(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Tests that failures of chunk_store are logged without failing the commit and are retried on the next upload.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        monkeypatch (pytest.MonkeyPatch): Pytest fixture to make chunk_store fail once.
+        caplog (pytest.LogCaptureFixture): Pytest fixture to capture the logged failure.
+    """
+    mongodb_client = mongomock.MongoClient()
+    chunk_store = ChunkStore(mongodb_client)
+    path_dictionary_controller = PathDictionaryController(
+        mongodb_client, chunk_store=chunk_store
+    )
+    add_file_async = chunk_store.add_file_async
+    failures = [ConnectionError()]
+
+    async def fail_add_file_async(*args: Any) -> ChunkManifest:
+        if failures:
+            raise failures.pop()
+        return await add_file_async(*args)
+
+    monkeypatch.setattr(chunk_store, "add_file_async", fail_add_file_async)
+    hash = asyncio.run(
+        path_dictionary_controller.add_content_addressed_file_async(
+            tmp_path, "text/x-rst", iterate(b"# Lecture 1")
+        )
+    )
+    assert path_dictionary_controller.get_file_path_from_hash(hash).exists()
+    assert hash in caplog.text
+    with pytest.raises(KeyError):
+        chunk_store.get_manifest(hash)
+    asyncio.run(
+        path_dictionary_controller.add_content_addressed_file_async(
+            tmp_path, "text/x-rst", iterate(b"# Lecture 1")
+        )
+    )
+    assert chunk_store.get_manifest(hash).hash == hash
+
+
+def test_interrupted_upload_leaves_no_file(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that interrupted uploads neither leave temporary files nor modify the present file.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    local_path = tmp_path / "lecture.md"
+    local_path.write_bytes(b"# Lecture 1")
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            path_dictionary_controller.add_file_async(
+                local_path, "hash", iterate_and_fail(b"# Lec")
+            )
+        )
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            path_dictionary_controller.add_content_addressed_file_async(
+                tmp_path, "text/x-rst", iterate_and_fail(b"# Lec")
+            )
+        )
+    assert os.listdir(tmp_path) == ["lecture.md"]
+    assert local_path.read_bytes() == b"# Lecture 1"
+
+
+def test_uploaded_files_follow_umask(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that uploaded files get the permissions of files created with open instead of owner-only permissions.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    umask = os.umask(0o022)
+    os.umask(umask)
+    hash = asyncio.run(
+        path_dictionary_controller.add_content_addressed_file_async(
+            tmp_path, "text/x-rst", iterate(b"# Lecture 1")
+        )
+    )
+    resumed_hash = asyncio.run(
+        path_dictionary_controller.add_resumable_file_async(
+            tmp_path, "upload", 0, "text/x-rst", iterate(b"# Lecture 2")
+        )
+    )
+    for local_hash in [hash, resumed_hash]:
+        local_path = path_dictionary_controller.get_file_path_from_hash(local_hash)
+        assert local_path.stat().st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_add_file_builds_page_index_off_event_loop(
+    path_dictionary_controller: PathDictionaryController,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that uploaded files are indexed with file_io instead of on the event loop and that the index is stored.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        monkeypatch (pytest.MonkeyPatch): Pytest fixture to record the indexing threads.
+    """
+    build_page_offsets = PathDictionaryController._build_page_offsets
+    indexing_threads = []
+
+    def record_build_page_offsets(local_path: Path) -> Optional[list[int]]:
+        indexing_threads.append(threading.current_thread())
+        return build_page_offsets(local_path)
+
+    monkeypatch.setattr(
+        PathDictionaryController,
+        "_build_page_offsets",
+        staticmethod(record_build_page_offsets),
+    )
+    asyncio.run(
+        path_dictionary_controller.add_file_async(
+            tmp_path / "deck.md", "hash", iterate(b"# Slide 1\n\n---\n", b"Slide 2\n")
+        )
+    )
+    assert indexing_threads and threading.main_thread() not in indexing_threads
+    assert path_dictionary_controller.get_page_offsets("hash") == [0, 15, 23]
+
+
+def test_resume_interrupted_upload(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that an interrupted upload is resumed at the received offset and committed under its hash.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            path_dictionary_controller.add_resumable_file_async(
+                tmp_path, "upload", 0, "text/x-rst", iterate_and_fail(b"Lecture", b" 1")
+            )
+        )
+    offset = path_dictionary_controller.get_upload_offset("upload")
+    assert offset == len(b"Lecture 1")
+    with pytest.raises(UploadOffsetNotValidException):
+        asyncio.run(
+            path_dictionary_controller.add_resumable_file_async(
+                tmp_path, "upload", offset + 1, "text/x-rst", iterate(b"")
+            )
+        )
+    hash = asyncio.run(
+        path_dictionary_controller.add_resumable_file_async(
+            tmp_path, "upload", 7, "text/x-rst", iterate(b" 2: Resumed")
+        )
+    )
+    assert hash == blake3(b"Lecture 2: Resumed").hexdigest()
+    assert os.listdir(tmp_path) == [hash + ".rst"]
+    assert path_dictionary_controller.get_upload_offset("upload") == 0
+
+
+def test_get_file_range_from_hash(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that byte ranges of a file are streamed in packets of the requested size.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    local_path = tmp_path / "lecture.rst"
+    local_path.write_bytes(b"0123456789")
+    path_dictionary_controller.load_file(local_path, "hash")
+
+    async def read_range(offset: int, length: Optional[int]) -> list[bytes]:
+        mimetype, iterator = (
+            await path_dictionary_controller.get_file_range_from_hash_async(
+                "hash", offset, length, 3
+            )
+        )
+        assert mimetype == "text/x-rst"
+        return [chunk async for chunk in iterator]
+
+    assert asyncio.run(read_range(2, 5)) == [b"234", b"56"]
+    assert asyncio.run(read_range(8, None)) == [b"89"]
+    assert asyncio.run(read_range(12, 5)) == []
+
+
+def test_get_page_range_from_hash(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that only the selected pages of a file are streamed and that page indexes are built on demand.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    slides = [f"# Slide {i}\n\nContent {i}\n\n---\n".encode() for i in range(1, 6)]
+    (tmp_path / "deck.md").write_bytes(b"".join(slides))
+    (tmp_path / "lecture.pdf").write_bytes(b"%PDF-1.7")
+    path_dictionary_controller.load_file(tmp_path / "deck.md", "deck")
+    path_dictionary_controller.load_files([(tmp_path / "lecture.pdf", "pdf", "")])
+    page_offsets = path_dictionary_controller.local_paths.find_one({"_id": "deck"})
+    assert page_offsets is not None and len(page_offsets["page_offsets"]) == 6
+
+    async def read_pages(hash: str, page_filter: PageFilter, offset: int = 0) -> bytes:
+        _, iterator = await path_dictionary_controller.get_page_range_from_hash_async(
+            hash, page_filter, offset
+        )
+        return b"".join([chunk async for chunk in iterator])
+
+    assert asyncio.run(read_pages("deck", PageFilter(2, 3))) == b"".join(slides[1:3])
+    assert asyncio.run(read_pages("deck", PageFilter(4, 9), 2)) == (
+        b"".join(slides[3:])[2:]
+    )
+    with pytest.raises(ValueError):
+        asyncio.run(read_pages("deck", PageFilter(6, 6)))
+    with pytest.raises(PageFilterNotSupportedException):
+        asyncio.run(read_pages("pdf", PageFilter(1, 1)))
+
+    (tmp_path / "deck.md").write_bytes(b"".join(slides[:2]))
+    assert path_dictionary_controller.get_page_offsets("deck") == [
+        0,
+        len(slides[0]),
+        len(slides[0]) + len(slides[1]),
+    ]
+
+
+def test_cache_stays_coherent_across_instances(tmp_path: Path) -> None:
+    """Tests that repeated lookups are cached and modifications by another instance invalidate the cache.
+
+    Args:
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    mongodb_client = mongomock.MongoClient()
+    first_controller = PathDictionaryController(mongodb_client)
+    second_controller = PathDictionaryController(mongodb_client, max_staleness=0.0)
+    first_controller.load_file(tmp_path / "lecture.rst", "hash", "Lecture")
+    assert second_controller.get_material_name("hash") == "Lecture"
+    assert second_controller.get_file_path_from_hash("hash") == tmp_path / "lecture.rst"
+    assert (second_controller.cache.hits, second_controller.cache.misses) == (1, 1)
+    first_controller.load_file(tmp_path / "renamed.rst", "hash", "Renamed lecture")
+    assert second_controller.get_material_name("hash") == "Renamed lecture"
+    first_controller.unload_material("hash")
+    with pytest.raises(KeyError):
+        second_controller.get_file_path_from_hash("hash")
+
+
+def test_cache_hits_within_max_staleness_skip_version_check(
+    path_dictionary_controller: PathDictionaryController,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that cache hits within the default max_staleness are served without a MongoDB round trip.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        monkeypatch (pytest.MonkeyPatch): Pytest fixture to patch the collections.
+    """
+    path_dictionary_controller.load_file(tmp_path / "lecture.rst", "hash", "Lecture")
+    assert path_dictionary_controller.get_material_name("hash") == "Lecture"
+
+    def fail(*args: Any, **kwargs: Any) -> Any:
+        raise AssertionError("Cache hits must not query MongoDB.")
+
+    monkeypatch.setattr(path_dictionary_controller.versions, "find_one", fail)
+    monkeypatch.setattr(path_dictionary_controller.local_paths, "find_one", fail)
+    for _ in range(10):
+        assert path_dictionary_controller.get_material_name("hash") == "Lecture"
+
+
+def test_concurrent_invalidation_discards_stale_lookup(
+    path_dictionary_controller: PathDictionaryController,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that a lookup, that read a document before a concurrent modification invalidated it, does not cache the stale document.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        monkeypatch (pytest.MonkeyPatch): Pytest fixture to patch the collection.
+    """
+    path_dictionary_controller.load_file(tmp_path / "lecture.rst", "hash", "Lecture")
+    find_one = path_dictionary_controller.local_paths.find_one
+
+    def find_one_and_modify(*args: Any, **kwargs: Any) -> Any:
+        mongodb_document = find_one(*args, **kwargs)
+        monkeypatch.undo()
+        path_dictionary_controller.load_file(
+            tmp_path / "renamed.rst", "hash", "Renamed lecture"
+        )
+        return mongodb_document
+
+    monkeypatch.setattr(
+        path_dictionary_controller.local_paths, "find_one", find_one_and_modify
+    )
+    assert path_dictionary_controller.get_material_name("hash") == "Lecture"
+    assert path_dictionary_controller.get_material_name("hash") == "Renamed lecture"
+
+
+def test_bulk_operations(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests loading, looking up and unloading multiple files at once.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    files = [(tmp_path / f"{i}.rst", f"hash_{i}", f"Lecture {i}") for i in range(5)]
+    assert path_dictionary_controller.load_files(files) == {}
+    path_dictionary_controller.get_material_name("hash_0")
+    names = path_dictionary_controller.get_material_names(["hash_0", "hash_4", "other"])
+    assert names == {"hash_0": "Lecture 0", "hash_4": "Lecture 4"}
+    path_dictionary_controller.unload_materials(["hash_0", "hash_1"])
+    assert path_dictionary_controller.get_file_paths_from_hashes(
+        ["hash_0", "hash_2"]
+    ) == {"hash_2": tmp_path / "2.rst"}
+
+
+def test_failing_bulk_operations_invalidate_written_batches(
+    path_dictionary_controller: PathDictionaryController,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Tests that batches written before a failing batch are invalidated in the cache.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+        monkeypatch (pytest.MonkeyPatch): Pytest fixture to patch the batch size and collection.
+    """
+    monkeypatch.setattr(
+        "evalquiz_proto.shared.path_dictionary_controller.BULK_BATCH_SIZE", 2
+    )
+    files = [(tmp_path / f"{i}.rst", f"hash_{i}", f"Lecture {i}") for i in range(4)]
+    path_dictionary_controller.load_files(files)
+    assert path_dictionary_controller.get_material_name("hash_0") == "Lecture 0"
+    local_paths = path_dictionary_controller.local_paths
+    calls = 0
+
+    def fail_after_first_batch(original: Callable[..., Any]) -> Callable[..., Any]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            nonlocal calls
+            calls += 1
+            if calls > 1:
+                raise ConnectionError()
+            return original(*args, **kwargs)
+
+        return call
+
+    monkeypatch.setattr(
+        local_paths, "bulk_write", fail_after_first_batch(local_paths.bulk_write)
+    )
+    with pytest.raises(ConnectionError):
+        path_dictionary_controller.load_files(
+            [(tmp_path / f"{i}.md", f"hash_{i}", f"Renamed {i}") for i in range(4)]
+        )
+    assert path_dictionary_controller.get_material_name("hash_0") == "Renamed 0"
+    calls = 0
+    monkeypatch.setattr(
+        local_paths, "delete_many", fail_after_first_batch(local_paths.delete_many)
+    )
+    with pytest.raises(ConnectionError):
+        path_dictionary_controller.unload_materials([hash for (_, hash, _) in files])
+    with pytest.raises(KeyError):
+        path_dictionary_controller.get_material_name("hash_0")
+
+
+def test_migrate_local_paths(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that jsonpickle-encoded documents are readable and migrated to the current schema version.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    path_dictionary_controller.local_paths.insert_many(
+        [
+            {
+                "_id": f"hash_{i}",
+                "name": f"Lecture {i}",
+                "local_path": jsonpickle.encode(tmp_path / f"{i}.rst"),
+            }
+            for i in range(5)
+        ]
+    )
+    path_dictionary_controller.load_file(tmp_path / "5.rst", "hash_5", "Lecture 5")
+    assert path_dictionary_controller.get_file_path_from_hash("hash_0") == (
+        tmp_path / "0.rst"
+    )
+    assert path_dictionary_controller.migrate_local_paths(batch_size=2) == 5
+    assert path_dictionary_controller.local_paths.find_one({"_id": "hash_4"}) == {
+        "_id": "hash_4",
+        "name": "Lecture 4",
+        "local_path": str(tmp_path / "4.rst"),
+        "page_offsets": None,
+        "schema_version": LOCAL_PATHS_SCHEMA_VERSION,
+    }
+    assert path_dictionary_controller.migrate_local_paths() == 0
+
+
+def test_iterate_material_hashes(
+    path_dictionary_controller: PathDictionaryController, tmp_path: Path
+) -> None:
+    """Tests that hashes are listed page by page in ascending order and that listings can be resumed.
+
+    Args:
+        path_dictionary_controller (PathDictionaryController): Pytest fixture of PathDictionaryController.
+        tmp_path (Path): Pytest fixture of a temporary directory.
+    """
+    files = [(tmp_path / f"{i}.rst", f"hash_{i}", "") for i in range(5)]
+    assert path_dictionary_controller.load_files(files) == {}
+    assert list(path_dictionary_controller.iterate_material_hashes(page_size=2)) == [
+        ["hash_0", "hash_1"],
+        ["hash_2", "hash_3"],
+        ["hash_4"],
+    ]
+    assert path_dictionary_controller.get_material_hashes_page("hash_2", 10) == [
+        "hash_3",
+        "hash_4",
+    ]
+    assert path_dictionary_controller.get_material_hashes_page("hash_4") == []
+    assert path_dictionary_controller.get_material_hashes() == [
+        f"hash_{i}" for i in range(5)
+    ]
+    with pytest.raises(ValueError):
+        path_dictionary_controller.get_material_hashes_page(page_size=0)
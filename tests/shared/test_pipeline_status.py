@@ -0,0 +1,119 @@
+import asyncio
+from typing import AsyncIterator, Optional
+import pytest
+from evalquiz_proto.shared.generated import (
+    BatchStatus,
+    CacheStatistics,
+    InternalConfig,
+    ModuleStatus,
+    PipelineModule,
+    PipelineResult,
+    PipelineStatus,
+    PipelineStatusUpdate,
+)
+from evalquiz_proto.shared.pipeline_status import (
+    PipelineStatusEncoder,
+    PipelineStatusReconstructor,
+    create_incremental_status_stream,
+)
+
+
+def create_snapshots(batch_count: int) -> list[PipelineStatus]:
+    """Creates the snapshots of a pipeline that runs two modules on every batch, one batch after another.
+
+    Args:
+        batch_count (int): The amount of batches.
+
+    Returns:
+        list[PipelineStatus]: Snapshots after every transition, the last one contains the result.
+    """
+    batch_statuses = [BatchStatus() for _ in range(batch_count)]
+    snapshots = [PipelineStatus(batch_status=list(batch_statuses))]
+    for batch_index in range(batch_count):
+        for module_name in ["generation", "evaluation"]:
+            for module_status in [ModuleStatus.RUNNING, ModuleStatus.SUCCESS]:
+                batch_statuses[batch_index] = BatchStatus(
+                    pipeline_module=PipelineModule(name=module_name),
+                    module_status=module_status,
+                )
+                snapshots.append(PipelineStatus(batch_status=list(batch_statuses)))
+    snapshots[-1].result = PipelineResult(internal_config=InternalConfig())
+    return snapshots
+
+
+async def iterate(
+    snapshots: list[PipelineStatus], delay: float = 0.0
+) -> AsyncIterator[PipelineStatus]:
+    for snapshot in snapshots:
+        await asyncio.sleep(delay)
+        yield snapshot
+
+
+async def collect(
+    snapshots: list[PipelineStatus],
+    max_emission_rate: Optional[float],
+    delay: float = 0.0,
+) -> list[PipelineStatusUpdate]:
+    return [
+        pipeline_status_update
+        async for pipeline_status_update in create_incremental_status_stream(
+            iterate(snapshots, delay), max_emission_rate
+        )
+    ]
+
+
+def test_updates_contain_changed_batches() -> None:
+    """Tests that updates only contain changed batches and that the client reconstructs every snapshot."""
+    snapshots = create_snapshots(20)
+    encoder = PipelineStatusEncoder()
+    reconstructor = PipelineStatusReconstructor()
+    for snapshot in snapshots:
+        pipeline_status_update = encoder.encode(snapshot)
+        assert pipeline_status_update is not None
+        assert bytes(reconstructor.apply(pipeline_status_update)) == bytes(snapshot)
+        if snapshot is not snapshots[0]:
+            assert len(pipeline_status_update.batch_status_updates) == 1
+        assert (pipeline_status_update.result is None) == (
+            snapshot is not snapshots[-1]
+        )
+    assert encoder.encode(snapshots[-1]) is None
+
+
+def test_updates_are_coalesced() -> None:
+    """Tests that snapshots arriving faster than the emission rate are coalesced and that the final snapshot is sent."""
+    snapshots = create_snapshots(20)
+    assert len(asyncio.run(collect(snapshots, None))) == len(snapshots)
+    pipeline_status_updates = asyncio.run(collect(snapshots, 20.0, delay=0.005))
+    assert len(pipeline_status_updates) < len(snapshots) // 2
+    reconstructor = PipelineStatusReconstructor()
+    for pipeline_status_update in pipeline_status_updates:
+        pipeline_status = reconstructor.apply(pipeline_status_update)
+    assert bytes(pipeline_status) == bytes(snapshots[-1])
+    assert pipeline_status_updates[-1].result is not None
+    with pytest.raises(ValueError):
+        asyncio.run(collect(snapshots, 0.0))
+
+
+def test_cache_statistics_are_sent_when_changed() -> None:
+    """Tests that CacheStatistics are only part of updates in which they changed."""
+    encoder = PipelineStatusEncoder()
+    reconstructor = PipelineStatusReconstructor()
+    snapshots = [
+        PipelineStatus(
+            batch_status=[BatchStatus()],
+            generation_cache_statistics=CacheStatistics(hits=hits, misses=1),
+        )
+        for hits in [0, 0, 1]
+    ]
+    pipeline_status_updates = [encoder.encode(snapshot) for snapshot in snapshots]
+    assert pipeline_status_updates[1] is None
+    last_update = pipeline_status_updates[2]
+    assert last_update is not None
+    assert last_update.batch_status_updates == []
+    assert last_update.evaluation_cache_statistics is None
+    for pipeline_status_update in pipeline_status_updates:
+        if pipeline_status_update is not None:
+            pipeline_status = reconstructor.apply(pipeline_status_update)
+    assert pipeline_status.generation_cache_statistics == CacheStatistics(
+        hits=1, misses=1
+    )
@@ -0,0 +1,133 @@
+import os
+import pytest
+from evalquiz_proto.shared.generated import (
+    Batch,
+    Capability,
+    CourseSettings,
+    EducationalObjective,
+    Evaluation,
+    EvaluationResultType,
+    LanguageModelEvaluation,
+    Metric,
+    QuestionType,
+    Relationship,
+    ValueRange,
+)
+from evalquiz_proto.shared.prompt_templates import (
+    GENERATION_INSTRUCTIONS,
+    PromptCompiler,
+    estimate_token_count,
+    render_capability,
+)
+
+course_settings = CourseSettings(
+    course_goals=[Capability(keywords=["algorithms"])],
+    required_capabilites=[Capability(keywords=["programming"])],
+)
+
+
+def create_batch(keyword: str) -> Batch:
+    return Batch(
+        capabilites=[
+            Capability(
+                keywords=[keyword, "complexity"],
+                educational_objective=EducationalObjective.KNOW_AND_UNDERSTAND,
+                relationship=Relationship.DIFFERENCES,
+            )
+        ]
+    )
+
+
+def test_generation_prompts_share_prefixes() -> None:
+    """Tests that the prefix of a batch is rendered once and that prompts of different batches share the course prefix."""
+    prompt_compiler = PromptCompiler()
+    multiple_choice_prompt = prompt_compiler.compile_generation_prompt(
+        create_batch("sorting"), QuestionType.MULTIPLE_CHOICE, course_settings
+    )
+    multiple_response_prompt = prompt_compiler.compile_generation_prompt(
+        create_batch("sorting"), QuestionType.MULTIPLE_RESPONSE, course_settings
+    )
+    other_batch_prompt = prompt_compiler.compile_generation_prompt(
+        create_batch("hashing"), QuestionType.MULTIPLE_CHOICE, course_settings
+    )
+    assert (prompt_compiler.prefixes.hits, prompt_compiler.prefixes.misses) == (1, 2)
+    batch_prefix = prompt_compiler.get_generation_prefix(
+        create_batch("sorting"), course_settings
+    ).text
+    assert multiple_choice_prompt.startswith(batch_prefix)
+    assert multiple_response_prompt.startswith(batch_prefix)
+    shared_prefix = os.path.commonprefix([multiple_choice_prompt, other_batch_prompt])
+    assert shared_prefix.startswith(GENERATION_INSTRUCTIONS)
+    assert "algorithms" in shared_prefix and "programming" in shared_prefix
+    assert (
+        "- sorting, complexity (educational objective: know and understand, relationship: differences)"
+        in batch_prefix
+    )
+    assert prompt_compiler.prompt_count == 3
+    assert prompt_compiler.prefix_tokens == 2 * estimate_token_count(
+        batch_prefix
+    ) + estimate_token_count(
+        prompt_compiler.get_generation_prefix(
+            create_batch("hashing"), course_settings
+        ).text
+    )
+    assert prompt_compiler.rendered_prefix_tokens < prompt_compiler.prefix_tokens
+    assert prompt_compiler.suffix_tokens > 0
+
+
+def test_evaluation_prefix_per_batch_and_metric() -> None:
+    """Tests that evaluation prefixes start with the metric definition and are cached per batch and metric."""
+    metric = Metric(
+        reference="clarity",
+        evaluation=Evaluation(
+            language_model_evaluation=LanguageModelEvaluation(
+                model="gpt-3.5-turbo",
+                evaluation_description="Rate the clarity.",
+                evaluation_result_type=EvaluationResultType(
+                    value_range=ValueRange(lower_bound=0.0, upper_bound=1.0)
+                ),
+            )
+        ),
+    )
+    prompt_compiler = PromptCompiler()
+    sorting_prefix = prompt_compiler.get_evaluation_prefix(
+        create_batch("sorting"), metric
+    )
+    assert sorting_prefix.text.startswith("Rate the clarity.")
+    assert (
+        render_capability(create_batch("sorting").capabilites[0]) in sorting_prefix.text
+    )
+    assert (
+        prompt_compiler.get_evaluation_prefix(create_batch("sorting"), metric)
+        is sorting_prefix
+    )
+    assert (
+        prompt_compiler.get_evaluation_prefix(create_batch("hashing"), metric)
+        is not sorting_prefix
+    )
+    renamed_metric = Metric(reference="readability", evaluation=metric.evaluation)
+    assert (
+        prompt_compiler.get_evaluation_prefix(create_batch("sorting"), renamed_metric)
+        is sorting_prefix
+    )
+    rescaled_metric = Metric(
+        reference="clarity",
+        evaluation=Evaluation(
+            language_model_evaluation=LanguageModelEvaluation(
+                model="gpt-3.5-turbo",
+                evaluation_description="Rate the clarity.",
+                evaluation_result_type=EvaluationResultType(
+                    value_range=ValueRange(lower_bound=0.0, upper_bound=10.0)
+                ),
+            )
+        ),
+    )
+    assert "10.0" in (
+        prompt_compiler.get_evaluation_prefix(
+            create_batch("sorting"), rescaled_metric
+        ).text
+    )
+    with pytest.raises(ValueError):
+        prompt_compiler.get_evaluation_prefix(
+            create_batch("sorting"), Metric(reference="none")
+        )
@@ -0,0 +1,251 @@
+import time
+import pytest
+from evalquiz_proto.shared.generated import (
+    Batch,
+    Capability,
+    Complete,
+    EducationalObjective,
+    Evaluation,
+    EvaluationResult,
+    EvaluationResultType,
+    GenerationResult,
+    GenerationSettings,
+    LanguageModelEvaluation,
+    LectureMaterial,
+    Metric,
+    Mode,
+    MultipleChoice,
+    Overwrite,
+    PageFilter,
+    Question,
+    QuestionType,
+    Relationship,
+    ValueRange,
+)
+from evalquiz_proto.shared.result_cache import (
+    EvaluationResultCache,
+    GenerationResultCache,
+    ResultCache,
+    uses_cache,
+)
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def result_cache() -> ResultCache:
+    """Pytest fixture of ResultCache, backed by an in-memory MongoDB stand-in.
+
+    Returns:
+        ResultCache
+    """
+    return ResultCache(mongomock.MongoClient(), "generation_results")
+
+
+def create_batch(*question_types: QuestionType) -> Batch:
+    return Batch(
+        lecture_materials=[
+            LectureMaterial(reference="Slides", hash="a" * 64),
+            LectureMaterial(
+                reference="Script",
+                hash="b" * 64,
+                page_filter=PageFilter(lower_bound=2, upper_bound=5),
+            ),
+        ],
+        question_to_generate=[
+            Question(question_type=question_type) for question_type in question_types
+        ],
+        capabilites=[
+            Capability(
+                keywords=["hashing"],
+                educational_objective=EducationalObjective.KNOW_AND_UNDERSTAND,
+                relationship=Relationship.SIMILARITY,
+            )
+        ],
+    )
+
+
+def test_generation_digest_is_canonical() -> None:
+    """Tests that the digest ignores the order and references of lecture materials, but not the model or page filters."""
+    batch = create_batch(QuestionType.MULTIPLE_CHOICE)
+    digest = GenerationResultCache.get_generation_digest(
+        batch.lecture_materials,
+        batch.capabilites,
+        QuestionType.MULTIPLE_CHOICE,
+        "gpt-3.5-turbo",
+    )
+    reordered_materials = list(reversed(batch.lecture_materials))
+    reordered_materials[0].reference = "Renamed script"
+    assert digest == GenerationResultCache.get_generation_digest(
+        reordered_materials,
+        batch.capabilites,
+        QuestionType.MULTIPLE_CHOICE,
+        "gpt-3.5-turbo",
+    )
+    assert digest != GenerationResultCache.get_generation_digest(
+        batch.lecture_materials,
+        batch.capabilites,
+        QuestionType.MULTIPLE_CHOICE,
+        "gpt-4",
+    )
+    reordered_materials[0].page_filter = PageFilter(lower_bound=2, upper_bound=6)
+    assert digest != GenerationResultCache.get_generation_digest(
+        reordered_materials,
+        batch.capabilites,
+        QuestionType.MULTIPLE_CHOICE,
+        "gpt-3.5-turbo",
+    )
+    assert digest != GenerationResultCache.get_generation_digest(
+        batch.lecture_materials,
+        batch.capabilites,
+        QuestionType.MULTIPLE_CHOICE,
+        "gpt-3.5-turbo",
+        occurrence=1,
+    )
+
+
+def test_result_cache_front_and_collection(result_cache: ResultCache) -> None:
+    """Tests that results are found in the front and, after the front was cleared, in the collection."""
+    result_cache.put("digest", b"result")
+    assert result_cache.get("digest") == b"result"
+    result_cache.front.clear()
+    assert result_cache.get_many(["digest", "unknown", "digest"]) == {
+        "digest": b"result"
+    }
+    assert result_cache.front.get("digest") is not None
+    assert (result_cache.hits, result_cache.misses) == (3, 1)
+    result_cache.invalidate(["digest"])
+    assert result_cache.get("digest") is None
+
+
+def test_result_cache_expiry_and_eviction() -> None:
+    """Tests that expired entries are not returned and that the least recently used entries are evicted."""
+    mongodb_client = mongomock.MongoClient()
+    expiring_cache = ResultCache(mongodb_client, "expiring", ttl=0.01)
+    expiring_cache.put("digest", b"result")
+    time.sleep(0.02)
+    assert expiring_cache.get("digest") is None
+    expiring_cache.front.clear()
+    assert expiring_cache.get("digest") is None
+
+    bounded_cache = ResultCache(
+        mongodb_client, "bounded", max_entries=2, front_size=1, eviction_interval=3
+    )
+    bounded_cache.put_many({"first": b"1", "second": b"2"})
+    time.sleep(0.01)
+    bounded_cache.front.clear()
+    assert bounded_cache.get("first") == b"1"
+    bounded_cache.front.clear()
+    time.sleep(0.01)
+    bounded_cache.put("third", b"3")
+    assert bounded_cache.results.count_documents({}) == 2
+    assert bounded_cache.get("second") is None
+    assert bounded_cache.get("first") == b"1"
+
+
+def test_generation_result_cache_modes(result_cache: ResultCache) -> None:
+    """Tests that `Complete` mode fills cached results and that `Overwrite` mode bypasses the cache, but stores results."""
+    assert uses_cache(None)
+    assert uses_cache(Mode(complete=Complete()))
+    assert not uses_cache(Mode(overwrite=Overwrite()))
+    generation_result_cache = GenerationResultCache(result_cache)
+    complete_settings = GenerationSettings(
+        mode=Mode(complete=Complete()), model="gpt-3.5-turbo"
+    )
+    overwrite_settings = GenerationSettings(
+        mode=Mode(overwrite=Overwrite()), model="gpt-3.5-turbo"
+    )
+    batch = create_batch(
+        QuestionType.MULTIPLE_CHOICE,
+        QuestionType.MULTIPLE_CHOICE,
+        QuestionType.MULTIPLE_RESPONSE,
+    )
+    assert generation_result_cache.fill_from_cache(batch, complete_settings) == [
+        0,
+        1,
+        2,
+    ]
+    for index, question in enumerate(batch.question_to_generate[:2]):
+        question.generation_result = GenerationResult(
+            multiple_choice=MultipleChoice(question_text=f"Question {index}")
+        )
+    generation_result_cache.store(batch, overwrite_settings)
+
+    cached_batch = create_batch(
+        QuestionType.MULTIPLE_CHOICE,
+        QuestionType.MULTIPLE_CHOICE,
+        QuestionType.MULTIPLE_RESPONSE,
+    )
+    assert generation_result_cache.fill_from_cache(
+        cached_batch, overwrite_settings
+    ) == [0, 1, 2]
+    assert generation_result_cache.fill_from_cache(cached_batch, complete_settings) == [
+        2
+    ]
+    assert [
+        question.generation_result for question in cached_batch.question_to_generate[:2]
+    ] == [question.generation_result for question in batch.question_to_generate[:2]]
+    assert cached_batch.question_to_generate[2].generation_result is None
+
+
+def create_metric(reference: str, mode: Mode, evaluation_description: str) -> Metric:
+    return Metric(
+        reference=reference,
+        mode=mode,
+        evaluation=Evaluation(
+            language_model_evaluation=LanguageModelEvaluation(
+                model="gpt-3.5-turbo",
+                evaluation_description=evaluation_description,
+                evaluation_result_type=EvaluationResultType(
+                    value_range=ValueRange(lower_bound=0.0, upper_bound=1.0)
+                ),
+            )
+        ),
+    )
+
+
+def test_evaluation_result_cache(result_cache: ResultCache) -> None:
+    """Tests that cached EvaluationResults are filled per metric and that the mode of each metric is respected."""
+    evaluation_result_cache = EvaluationResultCache(result_cache)
+    clarity = create_metric("clarity", Mode(complete=Complete()), "How clear?")
+    difficulty = create_metric(
+        "difficulty", Mode(overwrite=Overwrite()), "How difficult?"
+    )
+    assert evaluation_result_cache.get_metric_digest(
+        clarity
+    ) == evaluation_result_cache.get_metric_digest(
+        create_metric("renamed", Mode(overwrite=Overwrite()), "How clear?")
+    )
+    assert evaluation_result_cache.get_metric_digest(Metric(reference="none")) is None
+    batch = create_batch(QuestionType.MULTIPLE_CHOICE, QuestionType.MULTIPLE_CHOICE)
+    batch.question_to_generate[0].generation_result = GenerationResult(
+        multiple_choice=MultipleChoice(question_text="Question")
+    )
+    assert evaluation_result_cache.fill_from_cache(batch, [clarity, difficulty]) == [
+        (0, clarity),
+        (0, difficulty),
+    ]
+    batch.question_to_generate[0].evaluation_results = {
+        "clarity": EvaluationResult(float_value=0.75),
+        "difficulty": EvaluationResult(float_value=0.25),
+    }
+    evaluation_result_cache.store(batch, [clarity, difficulty])
+
+    cached_batch = create_batch(
+        QuestionType.MULTIPLE_CHOICE, QuestionType.MULTIPLE_CHOICE
+    )
+    cached_batch.question_to_generate = [
+        Question().parse(bytes(question)) for question in batch.question_to_generate
+    ]
+    cached_batch.question_to_generate[0].evaluation_results = {}
+    cached_batch.question_to_generate[1].generation_result = GenerationResult(
+        multiple_choice=MultipleChoice(question_text="Question")
+    )
+    assert evaluation_result_cache.fill_from_cache(
+        cached_batch, [clarity, difficulty]
+    ) == [(0, difficulty), (1, difficulty)]
+    for question in cached_batch.question_to_generate:
+        assert question.evaluation_results == {
+            "clarity": EvaluationResult(float_value=0.75)
+        }
+    assert result_cache.get_statistics().hits == 2
@@ -0,0 +1,117 @@
+import asyncio
+from typing import AsyncIterator
+import pytest
+from evalquiz_proto.shared.exceptions import (
+    ResultSectionNotFoundException,
+    ResultSectionNotParsableException,
+)
+from evalquiz_proto.shared.generated import (
+    GenerationResult,
+    MultipleChoice,
+    MultipleResponse,
+    QuestionType,
+)
+from evalquiz_proto.shared.result_section import (
+    ResultSectionParser,
+    parse_result_section,
+    parse_result_stream,
+)
+
+MULTIPLE_CHOICE_OUTPUT = (
+    "Sure, here is the question.\n<result>\nQuestion: Which structure has O(1) lookups?\n"
+    "Answer: Hash table\nDistractor: Linked list\nDistractor: Sorted array\n"
+    "binary searched\n</result>\nI hope this helps, let me know if you need more questions."
+)
+
+
+class TokenStream:
+    """Streams text in tokens of three characters and counts the consumed tokens."""
+
+    def __init__(self, text: str) -> None:
+        self.tokens = [text[i : i + 3] for i in range(0, len(text), 3)]
+        self.consumed_tokens = 0
+        self.closed = False
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        try:
+            for token in self.tokens:
+                self.consumed_tokens += 1
+                yield token
+        finally:
+            self.closed = True
+
+
+def test_stream_stops_at_end_tag() -> None:
+    """Tests that the stream is parsed across token boundaries and closed as soon as the end tag is seen."""
+    token_stream = TokenStream(MULTIPLE_CHOICE_OUTPUT)
+    generation_result = asyncio.run(
+        parse_result_stream(aiter(token_stream), QuestionType.MULTIPLE_CHOICE)
+    )
+    assert generation_result == GenerationResult(
+        multiple_choice=MultipleChoice(
+            question_text="Which structure has O(1) lookups?",
+            answer_text="Hash table",
+            distractor_text=["Linked list", "Sorted array\nbinary searched"],
+        )
+    )
+    assert token_stream.closed
+    end = MULTIPLE_CHOICE_OUTPUT.index("</result>") + len("</result>")
+    assert token_stream.consumed_tokens == -(-end // 3)
+    assert token_stream.consumed_tokens < len(token_stream.tokens)
+    assert (
+        parse_result_section(MULTIPLE_CHOICE_OUTPUT, QuestionType.MULTIPLE_CHOICE)
+        == generation_result
+    )
+
+
+def test_multiple_response() -> None:
+    """Tests that multiple response questions accept several answers."""
+    assert parse_result_section(
+        "<result>Question: Which are prime?\nAnswer: 2\nAnswer: 3\nDistractor: 4</result>",
+        QuestionType.MULTIPLE_RESPONSE,
+    ) == GenerationResult(
+        multiple_response=MultipleResponse(
+            question_text="Which are prime?",
+            answer_texts=["2", "3"],
+            distractor_texts=["4"],
+        )
+    )
+
+
+def test_invalid_output_aborts_early() -> None:
+    """Tests that structurally invalid output raises as soon as the offending line is complete."""
+    token_stream = TokenStream(
+        "<result>\nQuestion: Which are prime?\nAnswer: 2\nAnswer: 3\n"
+        + "Distractor: 4\n" * 100
+        + "</result>"
+    )
+    with pytest.raises(ResultSectionNotParsableException):
+        asyncio.run(
+            parse_result_stream(aiter(token_stream), QuestionType.MULTIPLE_CHOICE)
+        )
+    assert token_stream.closed
+    assert token_stream.consumed_tokens < 20
+    parser = ResultSectionParser(QuestionType.MULTIPLE_CHOICE)
+    with pytest.raises(ResultSectionNotParsableException):
+        parser.feed("<result>\nAnswer: 2\n")
+    parser = ResultSectionParser(QuestionType.MULTIPLE_CHOICE, max_preamble_length=10)
+    with pytest.raises(ResultSectionNotFoundException):
+        parser.feed("I cannot generate a question about this topic.")
+    parser = ResultSectionParser(QuestionType.MULTIPLE_CHOICE, max_section_length=50)
+    with pytest.raises(ResultSectionNotParsableException):
+        parser.feed("<result>\nQuestion: " + "very " * 20)
+
+
+def test_incomplete_output() -> None:
+    """Tests that output without complete result section or without distractors is rejected."""
+    with pytest.raises(ResultSectionNotFoundException):
+        parse_result_section(
+            "<result>\nQuestion: Q\nAnswer: A\nDistractor: D",
+            QuestionType.MULTIPLE_CHOICE,
+        )
+    with pytest.raises(ResultSectionNotFoundException):
+        parse_result_section("Question: Q", QuestionType.MULTIPLE_CHOICE)
+    with pytest.raises(ResultSectionNotParsableException):
+        parse_result_section(
+            "<result>Question: Q\nAnswer: A</result>", QuestionType.MULTIPLE_CHOICE
+        )